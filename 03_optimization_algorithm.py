@@ -15,6 +15,8 @@ import random
 import time
 import traceback
 
+import scheduler
+
 # Configuration de la page
 st.set_page_config(
     page_title="Plateforme d'Examens Universitaires",
@@ -107,8 +109,9 @@ class ExamPlatform:
         start_time = time.time()
         
         try:
-            # Désactiver temporairement les contraintes
-            self.cursor.execute("SET session_replication_role = 'replica';")
+            # Chargement en bloc: triggers de ligne sautés, lot validé au COMMIT
+            # (07_chargement_en_bloc.sql, sans droits superutilisateur contrairement à 'replica')
+            self.cursor.execute("SELECT debut_chargement_en_bloc();")
             
             # Récupérer les modules sans examen
             success, error = self.safe_execute("""
@@ -155,41 +158,82 @@ class ExamPlatform:
             echecs_count = 0
             echecs_details = []
             
-            for module in modules:
+            # Tirer la date de chaque module, puis affecter les salles créneau par créneau
+            # (couplage de coût minimal au lieu de la première salle assez grande)
+            dates_modules = [random.choice(dates_possibles) for _ in modules]
+            salle_ids = [s[0] for s in salles]
+            salle_capacites = [s[1] for s in salles]
+            salle_types = [s[2] for s in salles]
+            salle_max = max(salles, key=lambda x: x[1])[0]
+            
+            salles_modules = {}
+            repartitions = {}
+            for date_heure in set(dates_modules):
+                indices = [i for i, d in enumerate(dates_modules) if d == date_heure]
+                affectation = scheduler.match_rooms(
+                    np.array([modules[i][2] for i in indices]), salle_types, salle_capacites
+                )
+                libres = np.setdiff1d(np.arange(len(salles)), affectation[affectation >= 0])
+                for i, r in zip(indices, affectation):
+                    if r >= 0:
+                        salles_modules[i] = salle_ids[r]
+                        continue
+                    # Aucune salle assez grande: répartir l'examen sur plusieurs salles libres
+                    repartition = scheduler.split_rooms(modules[i][2], salle_types, salle_capacites, libres)
+                    if repartition:
+                        libres = np.setdiff1d(libres, [r2 for r2, _ in repartition])
+                        repartitions[i] = [(salle_ids[r2], n) for r2, n in repartition]
+                        salles_modules[i] = repartitions[i][0][0]
+                    else:
+                        salles_modules[i] = salle_max
+            
+            # Surveillants en une passe (flot de coût minimal): même département
+            # de préférence, 3 examens par jour au plus, charges équilibrées
+            jours = sorted({d[:10] for d in dates_modules})
+            heures = sorted({d[11:] for d in dates_modules})
+            surveillants = scheduler.invigilator_flow(
+                [(module[3], jours.index(d[:10]), heures.index(d[11:]))
+                 for module, d in zip(modules, dates_modules)],
+                [p[1] for p in professeurs], len(jours)
+            )
+            
+            for i, module in enumerate(modules):
                 module_id, module_nom, nb_etudiants, dept_id = module
                 
                 try:
-                    # Trouver une salle adaptée
-                    salle_trouvee = None
-                    for salle in salles:
-                        if salle[1] >= nb_etudiants:
-                            salle_trouvee = salle
-                            break
-                    
-                    if not salle_trouvee:
-                        # Prendre la plus grande salle
-                        salle_trouvee = max(salles, key=lambda x: x[1])
-                    
-                    salle_id = salle_trouvee[0]
+                    salle_id = salles_modules[i]
                     
-                    # Trouver un professeur
-                    prof_id = None
-                    profs_dept = [p for p in professeurs if p[1] == dept_id]
-                    if profs_dept:
-                        prof_id = random.choice(profs_dept)[0]
-                    else:
-                        prof_id = random.choice(professeurs)[0]
+                    if surveillants[i] < 0:
+                        echecs_count += 1
+                        echecs_details.append(f"Module {module_nom}: aucun professeur disponible")
+                        continue
+                    prof_id = professeurs[surveillants[i]][0]
                     
-                    # Date aléatoire
-                    date_heure = random.choice(dates_possibles)
+                    date_heure = dates_modules[i]
                     
                     # Insérer l'examen
+                    repartition = repartitions.get(i, [])
                     success, error = self.safe_execute("""
                         INSERT INTO examens_planifiques 
                         (module_id, prof_id, salle_id, date_heure, 
-                         duree_minutes, mode_generation, statut, priorite)
-                        VALUES (%s, %s, %s, %s, %s, %s, 'PROPOSE', 1)
-                    """, (module_id, prof_id, salle_id, date_heure, duree_minutes, mode))
+                         duree_minutes, mode_generation, statut, priorite, nb_salles)
+                        VALUES (%s, %s, %s, %s, %s, %s, 'PROPOSE', 1, %s)
+                        RETURNING id
+                    """, (module_id, prof_id, salle_id, date_heure, duree_minutes, mode,
+                          max(len(repartition), 1)))
+                    
+                    if success and repartition:
+                        # Salles de l'examen réparti et répartition des étudiants
+                        examen_id = self.cursor.fetchone()[0]
+                        success, error = self.safe_execute("""
+                            INSERT INTO examens_salles (examen_id, salle_id, nb_places)
+                            SELECT %s, salle_id, nb_places
+                            FROM unnest(%s::int[], %s::int[]) AS s(salle_id, nb_places)
+                        """, (examen_id, [r for r, _ in repartition], [n for _, n in repartition]))
+                        if success:
+                            success, error = self.safe_execute(
+                                "SELECT repartir_etudiants(%s)", (examen_id,)
+                            )
                     
                     if success:
                         succes_count += 1
@@ -202,9 +246,10 @@ class ExamPlatform:
                     echecs_details.append(f"Module {module_nom}: {str(e)[:50]}")
                     continue
             
-            # Réactiver les contraintes et commit
-            self.cursor.execute("SET session_replication_role = 'origin';")
-            self.conn.commit()
+            # Commit: validation ensembliste du lot (trg_verifier_lot_examens)
+            success, error = self.safe_commit()
+            if not success:
+                return False, f"Lot rejeté par la validation: {error[:200]}", 0, {}
             
             end_time = time.time()
             temps_execution = round(end_time - start_time, 2)
@@ -326,7 +371,7 @@ class ExamPlatform:
                 JOIN examens_planifies e2 ON e1.id != e2.id
                 WHERE e1.statut = 'VALIDE' AND e2.statut = 'VALIDE'
                 AND e1.salle_id = e2.salle_id 
-                AND e1.date_heure = e2.date_heure
+                AND e1.periode && e2.periode
                 ORDER BY e1.date_heure
             """)
             
@@ -345,12 +390,12 @@ class ExamPlatform:
                         AND NOT EXISTS (
                             SELECT 1 FROM examens_planifies ep
                             WHERE ep.salle_id = l.id
-                            AND ep.date_heure = %s
-                            AND ep.statut = 'VALIDE'
+                            AND ep.periode && (SELECT periode FROM examens_planifies WHERE id = %s)
+                            AND ep.statut IN ('PROPOSE', 'VALIDE')
                         )
                         ORDER BY l.capacite ASC
                         LIMIT 1
-                    """, (salle_id, nb_etudiants, date_heure))
+                    """, (salle_id, nb_etudiants, examen_id))
                     
                     if success and self.cursor.rowcount > 0:
                         nouvelle_salle = self.cursor.fetchone()
@@ -0,0 +1,64 @@
+#!/usr/bin/env bash
+# ============================================
+# FICHIER: 05_deployment_setup.sh
+# DESCRIPTION: Installation et mise à jour de la base exam_platform
+# Schéma de base (01) si la base est vide, puis contraintes (02) et scripts de
+# migration 06 à 13 dans l'ordre (chacun dépend du précédent). Tous sont rejouables
+# (IF NOT EXISTS, CREATE OR REPLACE) sauf le schéma de base, installé une seule fois.
+# Chaque script s'exécute dans une transaction, sauf 12_index_actifs.sql
+# (CREATE INDEX CONCURRENTLY, interdit en transaction).
+# Connexion: variables PGHOST, PGPORT, PGUSER, PGPASSWORD, PGDATABASE
+# Usage: ./05_deployment_setup.sh [--donnees]
+#   --donnees: génère les données de base (01_generate_base_data.py) à la création
+# ============================================
+
+set -euo pipefail
+cd "$(dirname "$0")"
+
+export PGHOST="${PGHOST:-localhost}"
+export PGPORT="${PGPORT:-5432}"
+export PGUSER="${PGUSER:-postgres}"
+export PGDATABASE="${PGDATABASE:-exam_platform}"
+
+PSQL=(psql -X -q -v ON_ERROR_STOP=1)
+
+# executer <script> [options psql]
+executer() {
+    echo "▶ $1"
+    "${PSQL[@]}" "${@:2}" -f "$1"
+}
+
+# -------------------------------------------------
+# 1. SCHÉMA DE BASE (base vide uniquement)
+# -------------------------------------------------
+
+if [ "$("${PSQL[@]}" -tA -c "SELECT to_regclass('examens_planifies') IS NULL")" = "t" ]; then
+    executer 01_schema_base_v2.sql --single-transaction
+    executer 02_constraints_triggers_v2.sql --single-transaction
+    if [ "${1:-}" = "--donnees" ]; then
+        echo "▶ 01_generate_base_data.py"
+        python3 01_generate_base_data.py
+    fi
+else
+    executer 02_constraints_triggers_v2.sql --single-transaction
+fi
+
+# -------------------------------------------------
+# 2. MIGRATIONS
+# -------------------------------------------------
+
+for script in \
+    06_examens_salles.sql \
+    07_chargement_en_bloc.sql \
+    08_triggers_instruction.sql \
+    09_module_conflicts.sql \
+    10_conflits_actifs.sql \
+    11_exclusion_salles.sql
+do
+    executer "$script" --single-transaction
+done
+
+executer 12_index_actifs.sql
+executer 13_vues_kpi.sql --single-transaction
+
+echo "✅ Base ${PGDATABASE} à jour"
@@ -0,0 +1,262 @@
+-- ============================================
+-- FICHIER: 06_examens_salles.sql
+-- DESCRIPTION: Examens répartis sur plusieurs salles d'un même créneau
+-- (modules plus grands que la plus grande salle)
+-- À exécuter après 02_constraints_triggers_v2.sql
+-- ============================================
+
+-- -------------------------------------------------
+-- 1. TABLES
+-- -------------------------------------------------
+
+-- Nombre de salles de l'examen (1 = salle unique, examens_planifies.salle_id)
+ALTER TABLE examens_planifies
+    ADD COLUMN IF NOT EXISTS nb_salles INTEGER NOT NULL DEFAULT 1 CHECK (nb_salles >= 1);
+
+-- Salles d'un examen réparti (la salle principale salle_id en fait partie)
+CREATE TABLE IF NOT EXISTS examens_salles (
+    id SERIAL PRIMARY KEY,
+    examen_id INTEGER NOT NULL REFERENCES examens_planifies(id) ON DELETE CASCADE,
+    salle_id INTEGER NOT NULL REFERENCES lieu_examen(id) ON DELETE CASCADE,
+    nb_places INTEGER NOT NULL CHECK (nb_places > 0),
+
+    CONSTRAINT uq_examen_salle UNIQUE (examen_id, salle_id)
+);
+
+-- Salle de chaque étudiant pour les examens répartis
+CREATE TABLE IF NOT EXISTS repartition_etudiants (
+    examen_id INTEGER NOT NULL REFERENCES examens_planifies(id) ON DELETE CASCADE,
+    etudiant_id INTEGER NOT NULL REFERENCES etudiants(id) ON DELETE CASCADE,
+    salle_id INTEGER NOT NULL REFERENCES lieu_examen(id) ON DELETE CASCADE,
+
+    PRIMARY KEY (examen_id, etudiant_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_examens_salles_salle ON examens_salles(salle_id);
+CREATE INDEX IF NOT EXISTS idx_repartition_salle ON repartition_etudiants(examen_id, salle_id);
+
+-- Occupation de toutes les salles (salle principale + salles supplémentaires)
+CREATE OR REPLACE VIEW v_occupation_salles AS
+SELECT ep.id AS examen_id, ep.salle_id, ep.date_heure, ep.duree_minutes, ep.statut
+FROM examens_planifies ep
+UNION
+SELECT ep.id, es.salle_id, ep.date_heure, ep.duree_minutes, ep.statut
+FROM examens_salles es
+JOIN examens_planifies ep ON es.examen_id = ep.id;
+
+-- -------------------------------------------------
+-- 2. CONTRAINTES
+-- -------------------------------------------------
+
+-- Capacité: un examen réparti est vérifié en fin de transaction (check_examen_salles)
+CREATE OR REPLACE FUNCTION check_salle_capacity()
+RETURNS TRIGGER AS $$
+DECLARE
+    salle_capacity INTEGER;
+    etudiants_count INTEGER;
+    salle_type VARCHAR(20);
+BEGIN
+    IF NEW.nb_salles > 1 THEN
+        RETURN NEW;
+    END IF;
+
+    -- Récupérer la capacité et le type de la salle
+    SELECT capacite, type INTO salle_capacity, salle_type
+    FROM lieu_examen WHERE id = NEW.salle_id;
+
+    -- Compter le nombre d'étudiants inscrits au module
+    SELECT COUNT(*) INTO etudiants_count
+    FROM inscriptions WHERE module_id = NEW.module_id;
+
+    -- Vérification de la capacité
+    -- Les amphithéâtres (AMPHI) peuvent accueillir plus de 20
+    -- Les salles normales (SALLE, LABO) maximum 20
+    IF salle_type != 'AMPHI' AND etudiants_count > 20 THEN
+        -- Au lieu d'une erreur, on accepte avec un avertissement
+        NEW.modifie_par := COALESCE(NEW.modifie_par, 'system') ||
+                          ' [Salle ' || salle_type || ' capacity=' || salle_capacity ||
+                          ' students=' || etudiants_count || ' (max 20)]';
+    ELSIF etudiants_count > salle_capacity THEN
+        RAISE EXCEPTION 'ERREUR: La salle % a une capacité de % étudiants, alors que le module a % étudiants',
+            NEW.salle_id, salle_capacity, etudiants_count;
+    END IF;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Disponibilité: aucune salle de l'examen (principale ou supplémentaire) ne doit être occupée
+CREATE OR REPLACE FUNCTION check_salle_disponibilite()
+RETURNS TRIGGER AS $$
+DECLARE
+    salle_occupee INTEGER;
+BEGIN
+    SELECT o.salle_id INTO salle_occupee
+    FROM v_occupation_salles o
+    WHERE o.examen_id != COALESCE(NEW.id, 0)
+    AND o.statut IN ('PROPOSE', 'VALIDE')
+    AND o.salle_id IN (
+        SELECT NEW.salle_id
+        UNION
+        SELECT salle_id FROM examens_salles WHERE examen_id = NEW.id
+    )
+    AND (NEW.date_heure, NEW.date_heure + (NEW.duree_minutes || ' minutes')::INTERVAL)
+        OVERLAPS
+        (o.date_heure, o.date_heure + (o.duree_minutes || ' minutes')::INTERVAL)
+    LIMIT 1;
+
+    IF salle_occupee IS NOT NULL THEN
+        RAISE EXCEPTION 'ERREUR: La salle % est occupée à cette heure', salle_occupee;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Disponibilité d'une salle supplémentaire au créneau de son examen
+CREATE OR REPLACE FUNCTION check_examen_salle_disponibilite()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF EXISTS (
+        SELECT 1
+        FROM examens_planifies ep
+        JOIN v_occupation_salles o ON o.salle_id = NEW.salle_id
+        WHERE ep.id = NEW.examen_id
+        AND ep.statut IN ('PROPOSE', 'VALIDE')
+        AND o.examen_id != NEW.examen_id
+        AND o.statut IN ('PROPOSE', 'VALIDE')
+        AND (ep.date_heure, ep.date_heure + (ep.duree_minutes || ' minutes')::INTERVAL)
+            OVERLAPS
+            (o.date_heure, o.date_heure + (o.duree_minutes || ' minutes')::INTERVAL)
+    ) THEN
+        RAISE EXCEPTION 'ERREUR: La salle % est occupée à cette heure', NEW.salle_id;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Cohérence d'un examen réparti, vérifiée en fin de transaction:
+-- nb_salles lignes, salle principale incluse, places suffisantes, règle des 20 places hors amphi
+CREATE OR REPLACE FUNCTION check_examen_salles()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_examen_id INTEGER;
+    v_examen RECORD;
+    etudiants_count INTEGER;
+    salles_count INTEGER;
+    places_total INTEGER;
+    principale_incluse BOOLEAN;
+    salle_trop_petite INTEGER;
+BEGIN
+    IF TG_TABLE_NAME = 'examens_salles' THEN
+        v_examen_id := CASE WHEN TG_OP = 'DELETE' THEN OLD.examen_id ELSE NEW.examen_id END;
+    ELSE
+        v_examen_id := NEW.id;
+    END IF;
+
+    SELECT id, module_id, salle_id, nb_salles, statut INTO v_examen
+    FROM examens_planifies WHERE id = v_examen_id;
+
+    IF NOT FOUND OR v_examen.nb_salles = 1 OR v_examen.statut NOT IN ('PROPOSE', 'VALIDE') THEN
+        RETURN NULL;
+    END IF;
+
+    SELECT COUNT(*), COALESCE(SUM(es.nb_places), 0), COALESCE(BOOL_OR(es.salle_id = v_examen.salle_id), FALSE)
+    INTO salles_count, places_total, principale_incluse
+    FROM examens_salles es
+    WHERE es.examen_id = v_examen_id;
+
+    IF salles_count != v_examen.nb_salles OR NOT principale_incluse THEN
+        RAISE EXCEPTION 'ERREUR: L''examen % doit avoir % salles dont sa salle principale (% trouvées)',
+            v_examen_id, v_examen.nb_salles, salles_count;
+    END IF;
+
+    SELECT es.salle_id INTO salle_trop_petite
+    FROM examens_salles es
+    JOIN lieu_examen l ON es.salle_id = l.id
+    WHERE es.examen_id = v_examen_id
+    AND (es.nb_places > l.capacite OR (l.type != 'AMPHI' AND es.nb_places > 20))
+    LIMIT 1;
+
+    IF salle_trop_petite IS NOT NULL THEN
+        RAISE EXCEPTION 'ERREUR: La salle % ne peut pas accueillir les places attribuées à l''examen %',
+            salle_trop_petite, v_examen_id;
+    END IF;
+
+    SELECT COUNT(*) INTO etudiants_count
+    FROM inscriptions WHERE module_id = v_examen.module_id;
+
+    IF places_total < etudiants_count THEN
+        RAISE EXCEPTION 'ERREUR: Les salles de l''examen % offrent % places, alors que le module a % étudiants',
+            v_examen_id, places_total, etudiants_count;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_check_examen_salle_disponibilite ON examens_salles;
+CREATE TRIGGER trg_check_examen_salle_disponibilite
+BEFORE INSERT OR UPDATE ON examens_salles
+FOR EACH ROW
+EXECUTE FUNCTION check_examen_salle_disponibilite();
+
+DROP TRIGGER IF EXISTS trg_check_examen_salles ON examens_planifies;
+CREATE CONSTRAINT TRIGGER trg_check_examen_salles
+AFTER INSERT OR UPDATE ON examens_planifies
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW
+WHEN (NEW.nb_salles > 1)
+EXECUTE FUNCTION check_examen_salles();
+
+DROP TRIGGER IF EXISTS trg_check_examen_salles_lignes ON examens_salles;
+CREATE CONSTRAINT TRIGGER trg_check_examen_salles_lignes
+AFTER INSERT OR UPDATE OR DELETE ON examens_salles
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW
+EXECUTE FUNCTION check_examen_salles();
+
+-- -------------------------------------------------
+-- 3. RÉPARTITION DES ÉTUDIANTS
+-- -------------------------------------------------
+
+-- Répartir en une requête les inscrits du module dans les salles de l'examen,
+-- par ordre alphabétique: la salle k reçoit les rangs ]places avant k, places jusqu'à k]
+CREATE OR REPLACE FUNCTION repartir_etudiants(p_examen_id INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    nb_repartis INTEGER;
+BEGIN
+    DELETE FROM repartition_etudiants WHERE examen_id = p_examen_id;
+
+    WITH salles AS (
+        SELECT salle_id,
+               SUM(nb_places) OVER (ORDER BY nb_places DESC, salle_id) AS borne_haute,
+               SUM(nb_places) OVER (ORDER BY nb_places DESC, salle_id) - nb_places AS borne_basse
+        FROM examens_salles
+        WHERE examen_id = p_examen_id
+    ),
+    inscrits AS (
+        SELECT i.etudiant_id,
+               ROW_NUMBER() OVER (ORDER BY e.nom, e.prenom, e.id) AS rang
+        FROM examens_planifies ep
+        JOIN inscriptions i ON i.module_id = ep.module_id
+        JOIN etudiants e ON i.etudiant_id = e.id
+        WHERE ep.id = p_examen_id
+    )
+    INSERT INTO repartition_etudiants (examen_id, etudiant_id, salle_id)
+    SELECT p_examen_id, ins.etudiant_id, s.salle_id
+    FROM inscrits ins
+    JOIN salles s ON ins.rang > s.borne_basse AND ins.rang <= s.borne_haute;
+
+    GET DIAGNOSTICS nb_repartis = ROW_COUNT;
+    RETURN nb_repartis;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    RAISE NOTICE '✅ EXAMENS MULTI-SALLES INSTALLÉS';
+    RAISE NOTICE '   - Tables: examens_salles, repartition_etudiants';
+    RAISE NOTICE '   - Triggers: trg_check_examen_salle_disponibilite, trg_check_examen_salles (différé)';
+    RAISE NOTICE '   - Fonction: repartir_etudiants(examen_id)';
+END $$;
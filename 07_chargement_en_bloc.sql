@@ -0,0 +1,289 @@
+-- ============================================
+-- FICHIER: 07_chargement_en_bloc.sql
+-- DESCRIPTION: Chargement en bloc des examens avec validation différée
+-- Les triggers de ligne sont sautés pendant le chargement; au COMMIT, une requête
+-- ensembliste par famille de contraintes valide tous les examens de la transaction
+-- (le lot: identifiants notés dans la table temporaire examens_lot à l'écriture)
+-- À exécuter après 06_examens_salles.sql
+--
+-- Utilisation:
+--   BEGIN;
+--   SELECT debut_chargement_en_bloc();
+--   INSERT INTO examens_planifies ... (autant de lignes que nécessaire)
+--   COMMIT;  -- échoue (et tout est annulé) si une contrainte est violée
+-- Rapport sans échec: SELECT * FROM valider_examens_lot(); avant le COMMIT
+-- ============================================
+
+-- -------------------------------------------------
+-- 1. MODE CHARGEMENT EN BLOC
+-- -------------------------------------------------
+
+-- Mode limité à la transaction courante (set_config local): il disparaît au COMMIT/ROLLBACK,
+-- comme la table temporaire du lot (ON COMMIT DROP, supprimée après les triggers différés)
+CREATE OR REPLACE FUNCTION debut_chargement_en_bloc()
+RETURNS VOID AS $$
+BEGIN
+    PERFORM set_config('examens.chargement_en_bloc', 'on', true);
+    CREATE TEMP TABLE IF NOT EXISTS examens_lot (
+        id INTEGER PRIMARY KEY
+    ) ON COMMIT DROP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION chargement_en_bloc()
+RETURNS BOOLEAN AS $$
+    SELECT COALESCE(current_setting('examens.chargement_en_bloc', true), '') = 'on';
+$$ LANGUAGE sql STABLE;
+
+-- Note un examen écrit pendant le chargement (trg_noter_lot_examens). Une ligne écrite dans
+-- un SAVEPOINT annulé disparaît aussi du lot; une sous-transaction validée y reste
+CREATE OR REPLACE FUNCTION noter_examen_lot()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO examens_lot (id) VALUES (NEW.id) ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Examens actifs écrits (insérés ou modifiés) par la transaction courante: jointure sur
+-- le lot, sans parcourir examens_planifies (PL/pgSQL: examens_lot n'existe qu'en chargement)
+CREATE OR REPLACE FUNCTION examens_du_lot()
+RETURNS SETOF examens_planifies AS $$
+BEGIN
+    IF to_regclass('pg_temp.examens_lot') IS NULL THEN
+        RETURN;
+    END IF;
+
+    RETURN QUERY
+    SELECT e.*
+    FROM examens_lot l
+    JOIN examens_planifies e ON e.id = l.id
+    WHERE e.statut IN ('PROPOSE', 'VALIDE');
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- -------------------------------------------------
+-- 2. VALIDATION ENSEMBLISTE
+-- -------------------------------------------------
+
+CREATE OR REPLACE FUNCTION examens_par_ids(p_ids INTEGER[])
+RETURNS SETOF examens_planifies AS $$
+    SELECT *
+    FROM examens_planifies
+    WHERE id = ANY(p_ids)
+    AND statut IN ('PROPOSE', 'VALIDE');
+$$ LANGUAGE sql STABLE;
+
+-- Étudiants: un examen par jour (check_etudiant_daily_limit)
+-- Remplacée par une lecture de module_conflicts dans 09_module_conflicts.sql
+CREATE OR REPLACE FUNCTION valider_etudiants_examens(p_ids INTEGER[])
+RETURNS TABLE (contrainte VARCHAR, examen_id INTEGER, detail TEXT) AS $$
+    SELECT 'etudiants'::VARCHAR, n.id,
+           format('%s étudiant(s) ont un autre examen le %s', COUNT(DISTINCT i.etudiant_id), DATE(n.date_heure))
+    FROM examens_par_ids(p_ids) n
+    JOIN inscriptions i ON i.module_id = n.module_id
+    JOIN inscriptions i2 ON i2.etudiant_id = i.etudiant_id AND i2.module_id != n.module_id
+    JOIN examens_planifies e ON e.module_id = i2.module_id
+    WHERE e.id != n.id
+    AND e.statut IN ('PROPOSE', 'VALIDE')
+    AND DATE(e.date_heure) = DATE(n.date_heure)
+    GROUP BY n.id, DATE(n.date_heure);
+$$ LANGUAGE sql STABLE;
+
+-- Salles: aucun chevauchement, salles supplémentaires comprises (check_salle_disponibilite)
+-- Remplacée dans 11_exclusion_salles.sql (salles principales: contrainte d'exclusion)
+CREATE OR REPLACE FUNCTION valider_salles_examens(p_ids INTEGER[])
+RETURNS TABLE (contrainte VARCHAR, examen_id INTEGER, detail TEXT) AS $$
+    SELECT 'salle'::VARCHAR, n.id,
+           format('La salle %s est aussi occupée par l''examen %s', o.salle_id, o.examen_id)
+    FROM examens_par_ids(p_ids) n
+    JOIN v_occupation_salles s ON s.examen_id = n.id
+    JOIN v_occupation_salles o ON o.salle_id = s.salle_id
+    WHERE o.examen_id != n.id
+    AND o.statut IN ('PROPOSE', 'VALIDE')
+    AND (n.date_heure, n.date_heure + (n.duree_minutes || ' minutes')::INTERVAL)
+        OVERLAPS
+        (o.date_heure, o.date_heure + (o.duree_minutes || ' minutes')::INTERVAL);
+$$ LANGUAGE sql STABLE;
+
+-- Une requête par famille de contraintes, sur les seuls examens donnés (actifs)
+CREATE OR REPLACE FUNCTION valider_examens(p_ids INTEGER[])
+RETURNS TABLE (contrainte VARCHAR, examen_id INTEGER, detail TEXT) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT * FROM valider_etudiants_examens(p_ids);
+
+    -- Professeurs: 3 examens par jour au plus (check_professeur_daily_limit)
+    RETURN QUERY
+    WITH charges AS (
+        SELECT e.prof_id, DATE(e.date_heure) AS jour, COUNT(*) AS nb
+        FROM examens_planifies e
+        WHERE e.statut IN ('PROPOSE', 'VALIDE')
+        AND (e.prof_id, DATE(e.date_heure)) IN (SELECT prof_id, DATE(date_heure) FROM examens_par_ids(p_ids))
+        GROUP BY e.prof_id, DATE(e.date_heure)
+        HAVING COUNT(*) > 3
+    )
+    SELECT 'professeur'::VARCHAR, n.id,
+           format('Le professeur %s a %s examens le %s (maximum 3)', c.prof_id, c.nb, c.jour)
+    FROM examens_par_ids(p_ids) n
+    JOIN charges c ON c.prof_id = n.prof_id AND c.jour = DATE(n.date_heure);
+
+    RETURN QUERY
+    SELECT * FROM valider_salles_examens(p_ids);
+
+    -- Capacité d'un examen en salle unique (check_salle_capacity: plus de 20 étudiants
+    -- hors amphithéâtre n'est qu'un avertissement; les examens répartis sont vérifiés
+    -- par check_examen_salles)
+    RETURN QUERY
+    SELECT 'capacite'::VARCHAR, n.id,
+           format('La salle %s a une capacité de %s étudiants, alors que le module a %s étudiants',
+                  l.id, l.capacite, c.nb)
+    FROM examens_par_ids(p_ids) n
+    JOIN lieu_examen l ON l.id = n.salle_id
+    JOIN (
+        SELECT i.module_id, COUNT(*) AS nb
+        FROM inscriptions i
+        WHERE i.module_id IN (SELECT module_id FROM examens_par_ids(p_ids))
+        GROUP BY i.module_id
+    ) c ON c.module_id = n.module_id
+    WHERE n.nb_salles = 1
+    AND c.nb > l.capacite
+    AND (l.type = 'AMPHI' OR c.nb <= 20);
+
+    -- Un seul examen actif par module (check_module_unique_examen)
+    RETURN QUERY
+    SELECT 'module'::VARCHAR, n.id,
+           format('Le module %s a %s examens actifs', n.module_id, c.nb)
+    FROM examens_par_ids(p_ids) n
+    JOIN (
+        SELECT e.module_id, COUNT(*) AS nb
+        FROM examens_planifies e
+        WHERE e.statut IN ('PROPOSE', 'VALIDE')
+        AND e.module_id IN (SELECT module_id FROM examens_par_ids(p_ids))
+        GROUP BY e.module_id
+        HAVING COUNT(*) > 1
+    ) c ON c.module_id = n.module_id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION valider_examens_lot()
+RETURNS TABLE (contrainte VARCHAR, examen_id INTEGER, detail TEXT) AS $$
+    SELECT * FROM valider_examens(ARRAY(SELECT id FROM examens_du_lot()));
+$$ LANGUAGE sql;
+
+-- Validation au COMMIT: le trigger différé est mis en file pour chaque ligne du lot,
+-- mais la validation ne s'exécute qu'une fois par transaction
+CREATE OR REPLACE FUNCTION verifier_lot_examens()
+RETURNS TRIGGER AS $$
+DECLARE
+    nb_violations INTEGER;
+    resume TEXT;
+BEGIN
+    IF COALESCE(current_setting('examens.lot_valide', true), '') = 'on' THEN
+        RETURN NULL;
+    END IF;
+    PERFORM set_config('examens.lot_valide', 'on', true);
+
+    SELECT COUNT(*), string_agg(v.contrainte || ' (examen ' || v.examen_id || '): ' || v.detail, '; ')
+    INTO nb_violations, resume
+    FROM (SELECT * FROM valider_examens_lot() LIMIT 5) v;
+
+    IF nb_violations > 0 THEN
+        SELECT COUNT(*) INTO nb_violations FROM valider_examens_lot();
+        RAISE EXCEPTION 'ERREUR: % violation(s) dans le chargement en bloc: %', nb_violations, resume;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_noter_lot_examens ON examens_planifies;
+CREATE TRIGGER trg_noter_lot_examens
+AFTER INSERT OR UPDATE ON examens_planifies
+FOR EACH ROW
+WHEN (NEW.statut IN ('PROPOSE', 'VALIDE') AND chargement_en_bloc())
+EXECUTE FUNCTION noter_examen_lot();
+
+DROP TRIGGER IF EXISTS trg_verifier_lot_examens ON examens_planifies;
+CREATE CONSTRAINT TRIGGER trg_verifier_lot_examens
+AFTER INSERT OR UPDATE ON examens_planifies
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW
+WHEN (NEW.statut IN ('PROPOSE', 'VALIDE') AND chargement_en_bloc())
+EXECUTE FUNCTION verifier_lot_examens();
+
+-- -------------------------------------------------
+-- 3. TRIGGERS DE LIGNE SAUTÉS PENDANT UN CHARGEMENT EN BLOC
+-- -------------------------------------------------
+
+DROP TRIGGER IF EXISTS trg_check_etudiant_daily_limit ON examens_planifies;
+CREATE TRIGGER trg_check_etudiant_daily_limit
+BEFORE INSERT OR UPDATE ON examens_planifies
+FOR EACH ROW
+WHEN (NEW.statut IN ('PROPOSE', 'VALIDE') AND NOT chargement_en_bloc())
+EXECUTE FUNCTION check_etudiant_daily_limit();
+
+DROP TRIGGER IF EXISTS trg_check_professeur_daily_limit ON examens_planifies;
+CREATE TRIGGER trg_check_professeur_daily_limit
+BEFORE INSERT OR UPDATE ON examens_planifies
+FOR EACH ROW
+WHEN (NEW.statut IN ('PROPOSE', 'VALIDE') AND NOT chargement_en_bloc())
+EXECUTE FUNCTION check_professeur_daily_limit();
+
+DROP TRIGGER IF EXISTS trg_check_salle_capacity ON examens_planifies;
+CREATE TRIGGER trg_check_salle_capacity
+BEFORE INSERT OR UPDATE ON examens_planifies
+FOR EACH ROW
+WHEN (NEW.statut IN ('PROPOSE', 'VALIDE') AND NOT chargement_en_bloc())
+EXECUTE FUNCTION check_salle_capacity();
+
+DROP TRIGGER IF EXISTS trg_check_professeur_departement ON examens_planifies;
+CREATE TRIGGER trg_check_professeur_departement
+BEFORE INSERT OR UPDATE ON examens_planifies
+FOR EACH ROW
+WHEN (NEW.statut IN ('PROPOSE', 'VALIDE') AND NOT chargement_en_bloc())
+EXECUTE FUNCTION check_professeur_departement();
+
+DROP TRIGGER IF EXISTS trg_check_salle_disponibilite ON examens_planifies;
+CREATE TRIGGER trg_check_salle_disponibilite
+BEFORE INSERT OR UPDATE ON examens_planifies
+FOR EACH ROW
+WHEN (NEW.statut IN ('PROPOSE', 'VALIDE') AND NOT chargement_en_bloc())
+EXECUTE FUNCTION check_salle_disponibilite();
+
+DROP TRIGGER IF EXISTS trg_check_equite_surveillance ON examens_planifies;
+CREATE TRIGGER trg_check_equite_surveillance
+AFTER INSERT OR UPDATE ON examens_planifies
+FOR EACH ROW
+WHEN (NEW.statut IN ('PROPOSE', 'VALIDE') AND NOT chargement_en_bloc())
+EXECUTE FUNCTION check_equite_surveillance();
+
+DROP TRIGGER IF EXISTS trg_check_duree_creneau ON examens_planifies;
+CREATE TRIGGER trg_check_duree_creneau
+BEFORE INSERT OR UPDATE ON examens_planifies
+FOR EACH ROW
+WHEN (NEW.creneau_id IS NOT NULL AND NEW.statut IN ('PROPOSE', 'VALIDE') AND NOT chargement_en_bloc())
+EXECUTE FUNCTION check_duree_creneau();
+
+DROP TRIGGER IF EXISTS trg_check_module_unique_examen ON examens_planifies;
+CREATE TRIGGER trg_check_module_unique_examen
+BEFORE INSERT OR UPDATE ON examens_planifies
+FOR EACH ROW
+WHEN (NEW.statut IN ('PROPOSE', 'VALIDE') AND NOT chargement_en_bloc())
+EXECUTE FUNCTION check_module_unique_examen();
+
+-- Salles supplémentaires: la disponibilité est vérifiée par valider_examens_lot
+DROP TRIGGER IF EXISTS trg_check_examen_salle_disponibilite ON examens_salles;
+CREATE TRIGGER trg_check_examen_salle_disponibilite
+BEFORE INSERT OR UPDATE ON examens_salles
+FOR EACH ROW
+WHEN (NOT chargement_en_bloc())
+EXECUTE FUNCTION check_examen_salle_disponibilite();
+
+DO $$
+BEGIN
+    RAISE NOTICE '✅ CHARGEMENT EN BLOC INSTALLÉ';
+    RAISE NOTICE '   - Mode: SELECT debut_chargement_en_bloc() (transaction courante)';
+    RAISE NOTICE '   - Lot: table temporaire examens_lot (trg_noter_lot_examens)';
+    RAISE NOTICE '   - Validation au COMMIT: trg_verifier_lot_examens (différé)';
+    RAISE NOTICE '   - Rapport: SELECT * FROM valider_examens_lot()';
+END $$;
@@ -0,0 +1,169 @@
+-- ============================================
+-- FICHIER: 08_triggers_instruction.sql
+-- DESCRIPTION: Triggers par instruction (FOR EACH STATEMENT) avec tables de transition
+-- Remplacent les huit triggers de ligne trg_check_* de examens_planifies:
+-- un INSERT de 1 000 lignes ou un UPDATE de l'optimiseur est validé en une passe
+-- ensembliste (valider_examens) au lieu de 1 000 exécutions de chaque trigger
+-- À exécuter après 07_chargement_en_bloc.sql
+-- Retour aux triggers de ligne: réexécuter la section 3 de 07_chargement_en_bloc.sql
+-- ============================================
+
+-- -------------------------------------------------
+-- 1. VALIDATION D'UNE INSTRUCTION
+-- -------------------------------------------------
+
+-- Durée compatible avec le créneau (check_duree_creneau)
+CREATE OR REPLACE FUNCTION valider_durees_creneaux(p_ids INTEGER[])
+RETURNS TABLE (contrainte VARCHAR, examen_id INTEGER, detail TEXT) AS $$
+    SELECT 'duree'::VARCHAR, n.id,
+           format('La durée de l''examen (%s minutes) dépasse le créneau horaire (%s - %s)',
+                  n.duree_minutes, c.heure_debut, c.heure_fin)
+    FROM examens_par_ids(p_ids) n
+    JOIN creneaux_horaires c ON c.id = n.creneau_id
+    WHERE EXTRACT(EPOCH FROM (c.heure_fin - c.heure_debut)) / 60 < n.duree_minutes;
+$$ LANGUAGE sql STABLE;
+
+-- Avertissements (département, équité, capacité): la moyenne des surveillances et les
+-- effectifs des modules sont calculés une fois par instruction au lieu d'une fois par ligne
+CREATE OR REPLACE FUNCTION avertir_examens(p_ids INTEGER[])
+RETURNS VOID AS $$
+DECLARE
+    nb_hors_departement INTEGER;
+    moyenne DECIMAL;
+    surcharges TEXT;
+    salles_depassees TEXT;
+BEGIN
+    SELECT COUNT(*) INTO nb_hors_departement
+    FROM examens_par_ids(p_ids) n
+    JOIN professeurs p ON p.id = n.prof_id
+    JOIN modules m ON m.id = n.module_id
+    JOIN formations f ON f.id = m.formation_id
+    WHERE p.dept_id != f.dept_id;
+
+    IF nb_hors_departement > 0 THEN
+        RAISE WARNING 'ATTENTION: % examen(s) surveillé(s) hors du département du module', nb_hors_departement;
+    END IF;
+
+    WITH charges AS (
+        SELECT prof_id, COUNT(*) AS nb
+        FROM examens_planifies
+        WHERE statut IN ('PROPOSE', 'VALIDE')
+        GROUP BY prof_id
+    )
+    SELECT AVG(nb), string_agg(prof_id || ' (' || nb || ')', ', ')
+        FILTER (WHERE prof_id IN (SELECT prof_id FROM examens_par_ids(p_ids)) AND nb > 1.5 * (SELECT AVG(nb) FROM charges))
+    INTO moyenne, surcharges
+    FROM charges;
+
+    IF surcharges IS NOT NULL THEN
+        RAISE WARNING 'ATTENTION: professeurs au-delà de 1,5 fois la moyenne (%) des surveillances: %',
+            round(moyenne, 2), surcharges;
+    END IF;
+
+    -- Capacité (check_salle_capacity de 02 et 06): plus de 20 étudiants dans une salle
+    -- SALLE ou LABO est accepté avec un avertissement (examens en salle unique;
+    -- les examens répartis sont vérifiés par check_examen_salles)
+    SELECT string_agg(format('examen %s (salle %s %s, %s étudiants)', n.id, l.id, l.type, c.nb), ', ')
+    INTO salles_depassees
+    FROM examens_par_ids(p_ids) n
+    JOIN lieu_examen l ON l.id = n.salle_id
+    JOIN (
+        SELECT i.module_id, COUNT(*) AS nb
+        FROM inscriptions i
+        WHERE i.module_id IN (SELECT module_id FROM examens_par_ids(p_ids))
+        GROUP BY i.module_id
+    ) c ON c.module_id = n.module_id
+    WHERE n.nb_salles = 1
+    AND l.type != 'AMPHI'
+    AND c.nb > 20;
+
+    IF salles_depassees IS NOT NULL THEN
+        RAISE WARNING 'ATTENTION: plus de 20 étudiants hors amphithéâtre (max 20): %', left(salles_depassees, 1000);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger d'instruction: les lignes écrites sont lues dans la table de transition "nouveaux"
+-- (et "anciens" pour un UPDATE, pour ne revalider que les examens réellement modifiés)
+CREATE OR REPLACE FUNCTION verifier_examens_instruction()
+RETURNS TRIGGER AS $$
+DECLARE
+    ids INTEGER[];
+    nb_violations INTEGER;
+    resume TEXT;
+BEGIN
+    -- Chargement en bloc: validation différée au COMMIT (trg_verifier_lot_examens)
+    IF chargement_en_bloc() THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'UPDATE' THEN
+        SELECT array_agg(n.id) INTO ids
+        FROM nouveaux n
+        JOIN anciens a ON a.id = n.id
+        WHERE n.statut IN ('PROPOSE', 'VALIDE')
+        AND (a.statut NOT IN ('PROPOSE', 'VALIDE')
+             OR (n.module_id, n.prof_id, n.salle_id, n.date_heure, n.duree_minutes, n.nb_salles, n.creneau_id)
+                IS DISTINCT FROM
+                (a.module_id, a.prof_id, a.salle_id, a.date_heure, a.duree_minutes, a.nb_salles, a.creneau_id));
+    ELSE
+        SELECT array_agg(id) INTO ids
+        FROM nouveaux
+        WHERE statut IN ('PROPOSE', 'VALIDE');
+    END IF;
+
+    IF ids IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    SELECT COUNT(*), string_agg(v.contrainte || ' (examen ' || v.examen_id || '): ' || v.detail, '; ')
+    INTO nb_violations, resume
+    FROM (
+        SELECT * FROM valider_examens(ids)
+        UNION ALL
+        SELECT * FROM valider_durees_creneaux(ids)
+    ) v;
+
+    IF nb_violations > 0 THEN
+        RAISE EXCEPTION 'ERREUR: % violation(s): %', nb_violations, left(resume, 1000);
+    END IF;
+
+    PERFORM avertir_examens(ids);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- -------------------------------------------------
+-- 2. REMPLACEMENT DES TRIGGERS DE LIGNE
+-- -------------------------------------------------
+
+DROP TRIGGER IF EXISTS trg_check_etudiant_daily_limit ON examens_planifies;
+DROP TRIGGER IF EXISTS trg_check_professeur_daily_limit ON examens_planifies;
+DROP TRIGGER IF EXISTS trg_check_salle_capacity ON examens_planifies;
+DROP TRIGGER IF EXISTS trg_check_professeur_departement ON examens_planifies;
+DROP TRIGGER IF EXISTS trg_check_salle_disponibilite ON examens_planifies;
+DROP TRIGGER IF EXISTS trg_check_equite_surveillance ON examens_planifies;
+DROP TRIGGER IF EXISTS trg_check_duree_creneau ON examens_planifies;
+DROP TRIGGER IF EXISTS trg_check_module_unique_examen ON examens_planifies;
+
+-- Une table de transition n'est permise que pour un seul événement: un trigger par événement
+DROP TRIGGER IF EXISTS trg_verifier_examens_insert ON examens_planifies;
+CREATE TRIGGER trg_verifier_examens_insert
+AFTER INSERT ON examens_planifies
+REFERENCING NEW TABLE AS nouveaux
+FOR EACH STATEMENT
+EXECUTE FUNCTION verifier_examens_instruction();
+
+DROP TRIGGER IF EXISTS trg_verifier_examens_update ON examens_planifies;
+CREATE TRIGGER trg_verifier_examens_update
+AFTER UPDATE ON examens_planifies
+REFERENCING OLD TABLE AS anciens NEW TABLE AS nouveaux
+FOR EACH STATEMENT
+EXECUTE FUNCTION verifier_examens_instruction();
+
+DO $$
+BEGIN
+    RAISE NOTICE '✅ TRIGGERS PAR INSTRUCTION INSTALLÉS';
+    RAISE NOTICE '   - trg_verifier_examens_insert, trg_verifier_examens_update (tables de transition)';
+    RAISE NOTICE '   - Triggers de ligne trg_check_* supprimés';
+END $$;
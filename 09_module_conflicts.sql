@@ -0,0 +1,359 @@
+-- ============================================
+-- FICHIER: 09_module_conflicts.sql
+-- DESCRIPTION: Table matérialisée des conflits entre modules (étudiants communs)
+-- module_conflicts(module_a, module_b, shared_students) remplace l'auto-jointure de
+-- inscriptions (~130 000 lignes) faite à chaque vérification: le test "un examen par
+-- jour et par étudiant" devient une lecture par clé primaire jointe aux examens du jour
+-- Construite en bloc ici, puis tenue à jour par des triggers d'instruction sur inscriptions
+-- À exécuter après 08_triggers_instruction.sql
+-- Reconstruction complète (après un chargement massif): SELECT reconstruire_module_conflicts();
+-- ============================================
+
+-- -------------------------------------------------
+-- 1. TABLE DES CONFLITS
+-- -------------------------------------------------
+
+-- Une ligne par sens (a, b) et (b, a): la recherche des voisins d'un module
+-- n'utilise que le préfixe module_a de la clé primaire
+CREATE TABLE IF NOT EXISTS module_conflicts (
+    module_a INTEGER NOT NULL REFERENCES modules(id) ON DELETE CASCADE,
+    module_b INTEGER NOT NULL REFERENCES modules(id) ON DELETE CASCADE,
+    shared_students INTEGER NOT NULL CHECK (shared_students > 0),
+    PRIMARY KEY (module_a, module_b),
+    CHECK (module_a != module_b)
+);
+
+-- Jointures des triggers sur le module (la clé primaire commence par etudiant_id)
+CREATE INDEX IF NOT EXISTS idx_inscriptions_module ON inscriptions(module_id, etudiant_id);
+
+-- Construction en bloc: une seule auto-jointure groupée
+CREATE OR REPLACE FUNCTION reconstruire_module_conflicts()
+RETURNS INTEGER AS $$
+DECLARE
+    nb_paires INTEGER;
+BEGIN
+    TRUNCATE module_conflicts;
+
+    INSERT INTO module_conflicts (module_a, module_b, shared_students)
+    SELECT i1.module_id, i2.module_id, COUNT(*)
+    FROM inscriptions i1
+    JOIN inscriptions i2 ON i2.etudiant_id = i1.etudiant_id AND i2.module_id != i1.module_id
+    GROUP BY i1.module_id, i2.module_id;
+
+    GET DIAGNOSTICS nb_paires = ROW_COUNT;
+    RETURN nb_paires;
+END;
+$$ LANGUAGE plpgsql;
+
+-- -------------------------------------------------
+-- 2. MISE À JOUR INCRÉMENTALE
+-- -------------------------------------------------
+
+-- Nouvelles inscriptions: paires (nouvelle, toute inscription de l'étudiant) dans les deux
+-- sens; le sens inverse n'est compté que si l'autre inscription n'est pas elle-même
+-- nouvelle (sinon la paire est déjà comptée des deux côtés)
+CREATE OR REPLACE FUNCTION module_conflicts_inserer()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO module_conflicts AS mc (module_a, module_b, shared_students)
+    SELECT a, b, COUNT(*)
+    FROM (
+        SELECT n.module_id AS a, i.module_id AS b
+        FROM nouveaux n
+        JOIN inscriptions i ON i.etudiant_id = n.etudiant_id AND i.module_id != n.module_id
+        UNION ALL
+        SELECT i.module_id, n.module_id
+        FROM nouveaux n
+        JOIN inscriptions i ON i.etudiant_id = n.etudiant_id AND i.module_id != n.module_id
+        WHERE NOT EXISTS (
+            SELECT 1 FROM nouveaux n2
+            WHERE n2.etudiant_id = i.etudiant_id AND n2.module_id = i.module_id
+        )
+    ) paires
+    GROUP BY a, b
+    ON CONFLICT (module_a, module_b)
+    DO UPDATE SET shared_students = mc.shared_students + EXCLUDED.shared_students;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Inscriptions supprimées: mêmes paires, calculées sur l'état d'avant (restantes + supprimées);
+-- une paire qui n'a plus d'étudiant commun disparaît
+CREATE OR REPLACE FUNCTION module_conflicts_supprimer()
+RETURNS TRIGGER AS $$
+BEGIN
+    WITH paires AS (
+        SELECT a, b, COUNT(*) AS nb
+        FROM (
+            SELECT o.module_id AS a, x.module_id AS b
+            FROM anciens o
+            JOIN (
+                SELECT etudiant_id, module_id FROM inscriptions
+                UNION ALL
+                SELECT etudiant_id, module_id FROM anciens
+            ) x ON x.etudiant_id = o.etudiant_id AND x.module_id != o.module_id
+            UNION ALL
+            SELECT i.module_id, o.module_id
+            FROM anciens o
+            JOIN inscriptions i ON i.etudiant_id = o.etudiant_id AND i.module_id != o.module_id
+        ) p
+        GROUP BY a, b
+    ),
+    videes AS (
+        DELETE FROM module_conflicts mc
+        USING paires p
+        WHERE mc.module_a = p.a AND mc.module_b = p.b
+        AND mc.shared_students <= p.nb
+    )
+    UPDATE module_conflicts mc
+    SET shared_students = mc.shared_students - p.nb
+    FROM paires p
+    WHERE mc.module_a = p.a AND mc.module_b = p.b
+    AND mc.shared_students > p.nb;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Inscriptions modifiées: seules les lignes dont le couple (étudiant, module) change
+-- comptent (une saisie de note ne touche pas la table); les modules concernés sont recalculés
+CREATE OR REPLACE FUNCTION module_conflicts_modifier()
+RETURNS TRIGGER AS $$
+DECLARE
+    modules_touches INTEGER[];
+BEGIN
+    SELECT array_agg(DISTINCT module_id) INTO modules_touches
+    FROM (
+        (SELECT etudiant_id, module_id FROM anciens
+         EXCEPT ALL
+         SELECT etudiant_id, module_id FROM nouveaux)
+        UNION ALL
+        (SELECT etudiant_id, module_id FROM nouveaux
+         EXCEPT ALL
+         SELECT etudiant_id, module_id FROM anciens)
+    ) changements;
+
+    IF modules_touches IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    DELETE FROM module_conflicts
+    WHERE module_a = ANY(modules_touches)
+    OR module_b = ANY(modules_touches);
+
+    WITH paires AS (
+        SELECT i1.module_id AS a, i2.module_id AS b, COUNT(*) AS nb
+        FROM inscriptions i1
+        JOIN inscriptions i2 ON i2.etudiant_id = i1.etudiant_id AND i2.module_id != i1.module_id
+        WHERE i1.module_id = ANY(modules_touches)
+        GROUP BY i1.module_id, i2.module_id
+    )
+    INSERT INTO module_conflicts (module_a, module_b, shared_students)
+    SELECT a, b, nb FROM paires
+    UNION ALL
+    SELECT b, a, nb FROM paires
+    WHERE NOT (b = ANY(modules_touches));
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION module_conflicts_vider()
+RETURNS TRIGGER AS $$
+BEGIN
+    TRUNCATE module_conflicts;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Une table de transition n'est permise que pour un seul événement: un trigger par événement
+DROP TRIGGER IF EXISTS trg_module_conflicts_insert ON inscriptions;
+CREATE TRIGGER trg_module_conflicts_insert
+AFTER INSERT ON inscriptions
+REFERENCING NEW TABLE AS nouveaux
+FOR EACH STATEMENT
+EXECUTE FUNCTION module_conflicts_inserer();
+
+DROP TRIGGER IF EXISTS trg_module_conflicts_delete ON inscriptions;
+CREATE TRIGGER trg_module_conflicts_delete
+AFTER DELETE ON inscriptions
+REFERENCING OLD TABLE AS anciens
+FOR EACH STATEMENT
+EXECUTE FUNCTION module_conflicts_supprimer();
+
+DROP TRIGGER IF EXISTS trg_module_conflicts_update ON inscriptions;
+CREATE TRIGGER trg_module_conflicts_update
+AFTER UPDATE ON inscriptions
+REFERENCING OLD TABLE AS anciens NEW TABLE AS nouveaux
+FOR EACH STATEMENT
+EXECUTE FUNCTION module_conflicts_modifier();
+
+DROP TRIGGER IF EXISTS trg_module_conflicts_truncate ON inscriptions;
+CREATE TRIGGER trg_module_conflicts_truncate
+AFTER TRUNCATE ON inscriptions
+FOR EACH STATEMENT
+EXECUTE FUNCTION module_conflicts_vider();
+
+-- -------------------------------------------------
+-- 3. VÉRIFICATIONS PAR LECTURE DE LA TABLE
+-- -------------------------------------------------
+
+-- Trigger de ligne (si 08 n'est pas installé): modules en conflit qui ont un examen ce jour-là
+CREATE OR REPLACE FUNCTION check_etudiant_daily_limit()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF EXISTS (
+        SELECT 1
+        FROM module_conflicts mc
+        JOIN examens_planifies e ON e.module_id = mc.module_b
+        WHERE mc.module_a = NEW.module_id
+        AND e.id != COALESCE(NEW.id, 0)
+        AND DATE(e.date_heure) = DATE(NEW.date_heure)
+        AND e.statut IN ('PROPOSE', 'VALIDE')
+    ) THEN
+        RAISE EXCEPTION 'ERREUR: Un étudiant ne peut pas avoir plus d''un examen par jour';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Validation ensembliste (valider_examens, triggers d'instruction et chargement en bloc)
+CREATE OR REPLACE FUNCTION valider_etudiants_examens(p_ids INTEGER[])
+RETURNS TABLE (contrainte VARCHAR, examen_id INTEGER, detail TEXT) AS $$
+    SELECT 'etudiants'::VARCHAR, n.id,
+           format('Étudiants communs avec %s autre(s) examen(s) le %s (modules %s)',
+                  COUNT(*), DATE(n.date_heure), string_agg(mc.module_b::TEXT, ', ' ORDER BY mc.module_b))
+    FROM examens_par_ids(p_ids) n
+    JOIN module_conflicts mc ON mc.module_a = n.module_id
+    JOIN examens_planifies e ON e.module_id = mc.module_b
+    WHERE e.id != n.id
+    AND e.statut IN ('PROPOSE', 'VALIDE')
+    AND DATE(e.date_heure) = DATE(n.date_heure)
+    GROUP BY n.id, DATE(n.date_heure);
+$$ LANGUAGE sql STABLE;
+
+-- Recherche de créneau: même fonction, test étudiant lu dans module_conflicts
+CREATE OR REPLACE FUNCTION planifier_examen_auto(
+    p_module_id INTEGER,
+    p_duree_minutes INTEGER DEFAULT 120
+) RETURNS INTEGER AS $$
+DECLARE
+    v_examen_id INTEGER;
+    v_prof_id INTEGER;
+    v_salle_id INTEGER;
+    v_creneau_id INTEGER;
+    v_date_heure TIMESTAMP;
+    v_nb_etudiants INTEGER;
+    v_departement_id INTEGER;
+    v_trouve BOOLEAN := FALSE;
+BEGIN
+    -- Récupérer le département du module
+    SELECT f.dept_id INTO v_departement_id
+    FROM modules m
+    JOIN formations f ON m.formation_id = f.id
+    WHERE m.id = p_module_id;
+    
+    -- Trouver un professeur du même département avec le moins de surveillances
+    SELECT p.id INTO v_prof_id
+    FROM professeurs p
+    LEFT JOIN (
+        SELECT prof_id, COUNT(*) as nb_surveillances
+        FROM examens_planifies
+        WHERE statut IN ('PROPOSE', 'VALIDE')
+        GROUP BY prof_id
+    ) s ON p.id = s.prof_id
+    WHERE p.dept_id = v_departement_id
+    ORDER BY COALESCE(s.nb_surveillances, 0)
+    LIMIT 1;
+    
+    -- Si pas de professeur du même département, prendre un au hasard
+    IF v_prof_id IS NULL THEN
+        SELECT id INTO v_prof_id
+        FROM professeurs
+        ORDER BY RANDOM()
+        LIMIT 1;
+    END IF;
+    
+    -- Trouver une salle adaptée
+    SELECT l.id INTO v_salle_id
+    FROM lieu_examen l
+    WHERE l.capacite >= (
+        SELECT COUNT(*) FROM inscriptions WHERE module_id = p_module_id
+    )
+    AND (l.type = 'AMPHI' OR (
+        l.type != 'AMPHI' AND l.capacite >= 20 AND (
+            SELECT COUNT(*) FROM inscriptions WHERE module_id = p_module_id
+        ) <= 20
+    ))
+    ORDER BY l.capacite ASC, l.type DESC
+    LIMIT 1;
+    
+    -- Trouver un créneau disponible
+    FOR v_creneau_id IN 
+        SELECT c.id
+        FROM creneaux_horaires c
+        WHERE c.est_disponible = TRUE
+        AND NOT EXISTS (
+            SELECT 1 FROM examens_planifies e
+            WHERE e.creneau_id = c.id
+            AND e.statut IN ('PROPOSE', 'VALIDE')
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM examens_planifies e
+            WHERE e.prof_id = v_prof_id
+            AND DATE(e.date_heure) = c.date_creneau
+            AND e.statut IN ('PROPOSE', 'VALIDE')
+            HAVING COUNT(*) >= 3
+        )
+        AND NOT EXISTS (
+            SELECT 1
+            FROM module_conflicts mc
+            JOIN examens_planifies e ON e.module_id = mc.module_b
+            WHERE mc.module_a = p_module_id
+            AND DATE(e.date_heure) = c.date_creneau
+            AND e.statut IN ('PROPOSE', 'VALIDE')
+        )
+        ORDER BY c.date_creneau, c.heure_debut
+    LOOP
+        v_trouve := TRUE;
+        EXIT;
+    END LOOP;
+    
+    IF NOT v_trouve THEN
+        RAISE EXCEPTION 'Aucun créneau disponible pour le module %', p_module_id;
+    END IF;
+    
+    -- Récupérer la date et l'heure du créneau
+    SELECT date_creneau + heure_debut INTO v_date_heure
+    FROM creneaux_horaires WHERE id = v_creneau_id;
+    
+    -- Insérer l'examen
+    INSERT INTO examens_planifies (
+        module_id, prof_id, salle_id, creneau_id,
+        date_heure, duree_minutes, mode_generation, statut
+    ) VALUES (
+        p_module_id, v_prof_id, v_salle_id, v_creneau_id,
+        v_date_heure, p_duree_minutes, 'AUTO', 'PROPOSE'
+    ) RETURNING id INTO v_examen_id;
+    
+    -- Marquer le créneau comme indisponible
+    UPDATE creneaux_horaires 
+    SET est_disponible = FALSE 
+    WHERE id = v_creneau_id;
+    
+    RETURN v_examen_id;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT reconstruire_module_conflicts();
+
+DO $$
+DECLARE
+    nb_paires INTEGER;
+BEGIN
+    SELECT COUNT(*) INTO nb_paires FROM module_conflicts;
+    RAISE NOTICE '✅ TABLE module_conflicts CONSTRUITE: % paires de modules', nb_paires;
+    RAISE NOTICE '   - Triggers trg_module_conflicts_* sur inscriptions';
+    RAISE NOTICE '   - check_etudiant_daily_limit, valider_etudiants_examens, planifier_examen_auto';
+END $$;
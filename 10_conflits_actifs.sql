@@ -0,0 +1,252 @@
+-- ============================================
+-- FICHIER: 10_conflits_actifs.sql
+-- DESCRIPTION: Conflits actifs de l'emploi du temps, tenus à jour par triggers
+-- Une ligne par paire d'examens en conflit et par ressource, mêmes règles que conflicts.py:
+-- salle et professeur = chevauchement des durées, étudiant = modules avec des étudiants
+-- communs (module_conflicts) le même jour. Seuls les examens touchés par une instruction
+-- sont recalculés; le tableau de bord lit le nombre de lignes au lieu de rebalayer
+-- examens_planifies à chaque affichage
+-- À exécuter après 09_module_conflicts.sql
+-- Reconstruction complète: SELECT reconstruire_conflits_actifs();
+-- ============================================
+
+-- -------------------------------------------------
+-- 1. TABLE DES CONFLITS
+-- -------------------------------------------------
+
+-- examen1 < examen2; ressource_id = salle_id (salle), prof_id (professeur), 0 (etudiant)
+CREATE TABLE IF NOT EXISTS conflits_actifs (
+    type_conflit VARCHAR(20) NOT NULL CHECK (type_conflit IN ('salle', 'professeur', 'etudiant')),
+    ressource_id INTEGER NOT NULL,
+    examen1 INTEGER NOT NULL REFERENCES examens_planifies(id) ON DELETE CASCADE,
+    examen2 INTEGER NOT NULL REFERENCES examens_planifies(id) ON DELETE CASCADE,
+    nb_etudiants INTEGER NOT NULL DEFAULT 0,
+    detecte_le TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (type_conflit, ressource_id, examen1, examen2),
+    CHECK (examen1 < examen2)
+);
+
+-- Suppression des conflits d'un examen (examen1 ou examen2)
+CREATE INDEX IF NOT EXISTS idx_conflits_actifs_examen1 ON conflits_actifs(examen1);
+CREATE INDEX IF NOT EXISTS idx_conflits_actifs_examen2 ON conflits_actifs(examen2);
+
+-- Recherche des examens du même professeur (idx_examens_module_prof commence par module_id)
+CREATE INDEX IF NOT EXISTS idx_examens_prof_date ON examens_planifies(prof_id, date_heure);
+
+-- -------------------------------------------------
+-- 2. CALCUL DES CONFLITS D'UN ENSEMBLE D'EXAMENS
+-- -------------------------------------------------
+
+-- Conflits où intervient au moins un des examens donnés (actifs)
+CREATE OR REPLACE FUNCTION conflits_des_examens(p_ids INTEGER[])
+RETURNS TABLE (type_conflit VARCHAR, ressource_id INTEGER, examen1 INTEGER, examen2 INTEGER,
+               nb_etudiants INTEGER) AS $$
+    -- Salles principales et supplémentaires
+    SELECT 'salle'::VARCHAR, s.salle_id, LEAST(n.id, o.examen_id), GREATEST(n.id, o.examen_id), 0
+    FROM examens_par_ids(p_ids) n
+    JOIN v_occupation_salles s ON s.examen_id = n.id
+    JOIN v_occupation_salles o ON o.salle_id = s.salle_id
+    WHERE o.examen_id != n.id
+    AND o.statut IN ('PROPOSE', 'VALIDE')
+    AND (n.date_heure, n.date_heure + (n.duree_minutes || ' minutes')::INTERVAL)
+        OVERLAPS
+        (o.date_heure, o.date_heure + (o.duree_minutes || ' minutes')::INTERVAL)
+    UNION
+    -- Professeur surveillant deux examens à la fois
+    SELECT 'professeur'::VARCHAR, n.prof_id, LEAST(n.id, o.id), GREATEST(n.id, o.id), 0
+    FROM examens_par_ids(p_ids) n
+    JOIN examens_planifies o ON o.prof_id = n.prof_id
+    WHERE o.id != n.id
+    AND o.statut IN ('PROPOSE', 'VALIDE')
+    AND (n.date_heure, n.date_heure + (n.duree_minutes || ' minutes')::INTERVAL)
+        OVERLAPS
+        (o.date_heure, o.date_heure + (o.duree_minutes || ' minutes')::INTERVAL)
+    UNION
+    -- Étudiants avec deux examens le même jour
+    SELECT 'etudiant'::VARCHAR, 0, LEAST(n.id, o.id), GREATEST(n.id, o.id), mc.shared_students
+    FROM examens_par_ids(p_ids) n
+    JOIN module_conflicts mc ON mc.module_a = n.module_id
+    JOIN examens_planifies o ON o.module_id = mc.module_b
+    WHERE o.id != n.id
+    AND o.statut IN ('PROPOSE', 'VALIDE')
+    AND DATE(o.date_heure) = DATE(n.date_heure);
+$$ LANGUAGE sql STABLE;
+
+-- Remplace les conflits des examens donnés par leur état courant
+-- (un examen annulé ou supprimé n'a plus de conflit)
+CREATE OR REPLACE FUNCTION actualiser_conflits(p_ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    IF p_ids IS NULL OR cardinality(p_ids) = 0 THEN
+        RETURN;
+    END IF;
+
+    DELETE FROM conflits_actifs
+    WHERE examen1 = ANY(p_ids)
+    OR examen2 = ANY(p_ids);
+
+    INSERT INTO conflits_actifs (type_conflit, ressource_id, examen1, examen2, nb_etudiants)
+    SELECT * FROM conflits_des_examens(p_ids)
+    ON CONFLICT DO NOTHING;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION reconstruire_conflits_actifs()
+RETURNS INTEGER AS $$
+DECLARE
+    nb_conflits INTEGER;
+BEGIN
+    TRUNCATE conflits_actifs;
+    PERFORM actualiser_conflits(ARRAY(
+        SELECT id FROM examens_planifies WHERE statut IN ('PROPOSE', 'VALIDE')
+    ));
+    SELECT COUNT(*) INTO nb_conflits FROM conflits_actifs;
+    RETURN nb_conflits;
+END;
+$$ LANGUAGE plpgsql;
+
+-- -------------------------------------------------
+-- 3. TRIGGERS
+-- -------------------------------------------------
+
+-- Examens: insérés, ou modifiés sur une colonne qui change les conflits
+-- (les suppressions passent par ON DELETE CASCADE)
+CREATE OR REPLACE FUNCTION conflits_actifs_examens()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        PERFORM actualiser_conflits(ARRAY(
+            SELECT n.id
+            FROM nouveaux n
+            JOIN anciens a ON a.id = n.id
+            WHERE (n.module_id, n.prof_id, n.salle_id, n.date_heure, n.duree_minutes, n.statut)
+                  IS DISTINCT FROM
+                  (a.module_id, a.prof_id, a.salle_id, a.date_heure, a.duree_minutes, a.statut)
+        ));
+    ELSE
+        PERFORM actualiser_conflits(ARRAY(SELECT id FROM nouveaux));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Salles supplémentaires d'un examen réparti
+CREATE OR REPLACE FUNCTION conflits_actifs_salles()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM actualiser_conflits(ARRAY(SELECT DISTINCT examen_id FROM anciens));
+    ELSE
+        PERFORM actualiser_conflits(ARRAY(SELECT DISTINCT examen_id FROM nouveaux));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Paires de modules (inscriptions modifiées): examens actifs des modules touchés
+CREATE OR REPLACE FUNCTION conflits_actifs_modules()
+RETURNS TRIGGER AS $$
+DECLARE
+    modules_touches INTEGER[];
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM conflits_actifs WHERE type_conflit = 'etudiant';
+        RETURN NULL;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(DISTINCT module_a) INTO modules_touches FROM anciens;
+    ELSE
+        SELECT array_agg(DISTINCT module_a) INTO modules_touches FROM nouveaux;
+    END IF;
+
+    PERFORM actualiser_conflits(ARRAY(
+        SELECT id
+        FROM examens_planifies
+        WHERE module_id = ANY(modules_touches)
+        AND statut IN ('PROPOSE', 'VALIDE')
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Une table de transition n'est permise que pour un seul événement: un trigger par événement
+DROP TRIGGER IF EXISTS trg_conflits_actifs_insert ON examens_planifies;
+CREATE TRIGGER trg_conflits_actifs_insert
+AFTER INSERT ON examens_planifies
+REFERENCING NEW TABLE AS nouveaux
+FOR EACH STATEMENT
+EXECUTE FUNCTION conflits_actifs_examens();
+
+DROP TRIGGER IF EXISTS trg_conflits_actifs_update ON examens_planifies;
+CREATE TRIGGER trg_conflits_actifs_update
+AFTER UPDATE ON examens_planifies
+REFERENCING OLD TABLE AS anciens NEW TABLE AS nouveaux
+FOR EACH STATEMENT
+EXECUTE FUNCTION conflits_actifs_examens();
+
+DROP TRIGGER IF EXISTS trg_conflits_actifs_salles_insert ON examens_salles;
+CREATE TRIGGER trg_conflits_actifs_salles_insert
+AFTER INSERT ON examens_salles
+REFERENCING NEW TABLE AS nouveaux
+FOR EACH STATEMENT
+EXECUTE FUNCTION conflits_actifs_salles();
+
+DROP TRIGGER IF EXISTS trg_conflits_actifs_salles_update ON examens_salles;
+CREATE TRIGGER trg_conflits_actifs_salles_update
+AFTER UPDATE ON examens_salles
+REFERENCING NEW TABLE AS nouveaux
+FOR EACH STATEMENT
+EXECUTE FUNCTION conflits_actifs_salles();
+
+DROP TRIGGER IF EXISTS trg_conflits_actifs_salles_delete ON examens_salles;
+CREATE TRIGGER trg_conflits_actifs_salles_delete
+AFTER DELETE ON examens_salles
+REFERENCING OLD TABLE AS anciens
+FOR EACH STATEMENT
+EXECUTE FUNCTION conflits_actifs_salles();
+
+DROP TRIGGER IF EXISTS trg_conflits_actifs_modules_insert ON module_conflicts;
+CREATE TRIGGER trg_conflits_actifs_modules_insert
+AFTER INSERT ON module_conflicts
+REFERENCING NEW TABLE AS nouveaux
+FOR EACH STATEMENT
+EXECUTE FUNCTION conflits_actifs_modules();
+
+DROP TRIGGER IF EXISTS trg_conflits_actifs_modules_update ON module_conflicts;
+CREATE TRIGGER trg_conflits_actifs_modules_update
+AFTER UPDATE ON module_conflicts
+REFERENCING NEW TABLE AS nouveaux
+FOR EACH STATEMENT
+EXECUTE FUNCTION conflits_actifs_modules();
+
+DROP TRIGGER IF EXISTS trg_conflits_actifs_modules_delete ON module_conflicts;
+CREATE TRIGGER trg_conflits_actifs_modules_delete
+AFTER DELETE ON module_conflicts
+REFERENCING OLD TABLE AS anciens
+FOR EACH STATEMENT
+EXECUTE FUNCTION conflits_actifs_modules();
+
+DROP TRIGGER IF EXISTS trg_conflits_actifs_modules_truncate ON module_conflicts;
+CREATE TRIGGER trg_conflits_actifs_modules_truncate
+AFTER TRUNCATE ON module_conflicts
+FOR EACH STATEMENT
+EXECUTE FUNCTION conflits_actifs_modules();
+
+-- -------------------------------------------------
+-- 4. LECTURE
+-- -------------------------------------------------
+
+CREATE OR REPLACE VIEW v_conflits_actifs_par_type AS
+SELECT type_conflit, COUNT(*) AS nb_conflits
+FROM conflits_actifs
+GROUP BY type_conflit;
+
+SELECT reconstruire_conflits_actifs();
+
+DO $$
+DECLARE
+    nb_conflits INTEGER;
+BEGIN
+    SELECT COUNT(*) INTO nb_conflits FROM conflits_actifs;
+    RAISE NOTICE '✅ TABLE conflits_actifs CONSTRUITE: % conflit(s)', nb_conflits;
+    RAISE NOTICE '   - Triggers trg_conflits_actifs_* sur examens_planifies, examens_salles, module_conflicts';
+END $$;
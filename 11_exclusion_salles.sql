@@ -0,0 +1,129 @@
+-- ============================================
+-- FICHIER: 11_exclusion_salles.sql
+-- DESCRIPTION: Occupation des salles principales par contrainte d'exclusion GiST
+-- Colonne générée periode = [date_heure, date_heure + durée[ et contrainte
+-- EXCLUDE (salle_id WITH =, periode WITH &&) sur les examens actifs: le chevauchement
+-- est refusé par le moteur via l'index, sans parcours PL/pgSQL par ligne insérée.
+-- Les salles supplémentaires (examens_salles) restent vérifiées par requête.
+-- À exécuter après 10_conflits_actifs.sql (nécessite l'extension btree_gist)
+-- ============================================
+
+-- Égalité sur salle_id dans un index GiST
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+-- -------------------------------------------------
+-- 1. PÉRIODE D'OCCUPATION
+-- -------------------------------------------------
+
+-- Intervalle semi-ouvert '[)': un examen qui commence à la fin d'un autre ne le chevauche pas
+ALTER TABLE examens_planifies
+    ADD COLUMN IF NOT EXISTS periode TSRANGE
+    GENERATED ALWAYS AS (tsrange(date_heure, date_heure + duree_minutes * INTERVAL '1 minute')) STORED;
+
+-- -------------------------------------------------
+-- 2. CONTRAINTE D'EXCLUSION
+-- -------------------------------------------------
+
+-- Les chevauchements existants empêcheraient la création de la contrainte
+DO $$
+DECLARE
+    nb_chevauchements INTEGER;
+BEGIN
+    SELECT COUNT(*) INTO nb_chevauchements
+    FROM examens_planifies e1
+    JOIN examens_planifies e2 ON e2.salle_id = e1.salle_id AND e2.id > e1.id
+    WHERE e1.statut IN ('PROPOSE', 'VALIDE')
+    AND e2.statut IN ('PROPOSE', 'VALIDE')
+    AND e1.periode && e2.periode;
+
+    IF nb_chevauchements > 0 THEN
+        RAISE EXCEPTION 'ERREUR: % paire(s) d''examens se chevauchent dans la même salle; les résoudre (optimisation) avant d''installer la contrainte', nb_chevauchements;
+    END IF;
+END $$;
+
+-- Vérifiée en fin d'instruction (DEFERRABLE INITIALLY IMMEDIATE): un UPDATE qui décale
+-- plusieurs examens d'une même salle n'échoue pas sur un état intermédiaire
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'excl_salle_periode') THEN
+        ALTER TABLE examens_planifies
+            ADD CONSTRAINT excl_salle_periode
+            EXCLUDE USING gist (salle_id WITH =, periode WITH &&)
+            WHERE (statut IN ('PROPOSE', 'VALIDE'))
+            DEFERRABLE INITIALLY IMMEDIATE;
+    END IF;
+END $$;
+
+-- -------------------------------------------------
+-- 3. VÉRIFICATIONS RESTANTES (SALLES SUPPLÉMENTAIRES)
+-- -------------------------------------------------
+
+-- Paires où une des deux salles n'est pas la salle principale de son examen
+-- (salle principale contre salle principale: excl_salle_periode)
+CREATE OR REPLACE FUNCTION valider_salles_examens(p_ids INTEGER[])
+RETURNS TABLE (contrainte VARCHAR, examen_id INTEGER, detail TEXT) AS $$
+    SELECT 'salle'::VARCHAR, n.id,
+           format('La salle %s est aussi occupée par l''examen %s', o.salle_id, o.examen_id)
+    FROM examens_par_ids(p_ids) n
+    JOIN v_occupation_salles s ON s.examen_id = n.id
+    JOIN v_occupation_salles o ON o.salle_id = s.salle_id
+    JOIN examens_planifies oe ON oe.id = o.examen_id
+    WHERE o.examen_id != n.id
+    AND o.statut IN ('PROPOSE', 'VALIDE')
+    AND NOT (s.salle_id = n.salle_id AND o.salle_id = oe.salle_id)
+    AND n.periode && oe.periode;
+$$ LANGUAGE sql STABLE;
+
+-- Trigger de ligne (sans 08, ou retour aux triggers de 07): paires où une des deux
+-- salles est une salle supplémentaire; salle principale contre salle principale: excl_salle_periode
+CREATE OR REPLACE FUNCTION check_salle_disponibilite()
+RETURNS TRIGGER AS $$
+DECLARE
+    salle_occupee INTEGER;
+BEGIN
+    SELECT o.salle_id INTO salle_occupee
+    FROM v_occupation_salles o
+    JOIN examens_planifies oe ON oe.id = o.examen_id
+    WHERE o.examen_id != COALESCE(NEW.id, 0)
+    AND o.statut IN ('PROPOSE', 'VALIDE')
+    AND o.salle_id IN (
+        SELECT NEW.salle_id
+        UNION
+        SELECT salle_id FROM examens_salles WHERE examen_id = NEW.id
+    )
+    AND NOT (o.salle_id = NEW.salle_id AND oe.salle_id = NEW.salle_id)
+    AND oe.periode && tsrange(NEW.date_heure, NEW.date_heure + NEW.duree_minutes * INTERVAL '1 minute')
+    LIMIT 1;
+
+    IF salle_occupee IS NOT NULL THEN
+        RAISE EXCEPTION 'ERREUR: La salle % est occupée à cette heure', salle_occupee;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Avec 08, les triggers par instruction vérifient les salles supplémentaires
+-- (valider_salles_examens) et le trigger de ligne a été supprimé. Sans 08, il reste
+-- nécessaire: un UPDATE de date_heure ou duree_minutes d'un examen réparti doit
+-- revérifier ses salles supplémentaires
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger
+                   WHERE tgname = 'trg_verifier_examens_insert'
+                   AND tgrelid = 'examens_planifies'::regclass) THEN
+        DROP TRIGGER IF EXISTS trg_check_salle_disponibilite ON examens_planifies;
+        CREATE TRIGGER trg_check_salle_disponibilite
+        BEFORE INSERT OR UPDATE ON examens_planifies
+        FOR EACH ROW
+        WHEN (NEW.statut IN ('PROPOSE', 'VALIDE') AND NOT chargement_en_bloc())
+        EXECUTE FUNCTION check_salle_disponibilite();
+    END IF;
+END $$;
+
+DO $$
+BEGIN
+    RAISE NOTICE '✅ CONTRAINTE D''EXCLUSION INSTALLÉE';
+    RAISE NOTICE '   - examens_planifies.periode (tsrange générée)';
+    RAISE NOTICE '   - excl_salle_periode: EXCLUDE USING gist (salle_id WITH =, periode WITH &&)';
+    RAISE NOTICE '   - check_salle_disponibilite: salles supplémentaires seulement (trigger de ligne sans 08)';
+END $$;
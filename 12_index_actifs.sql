@@ -0,0 +1,52 @@
+-- ============================================
+-- FICHIER: 12_index_actifs.sql
+-- DESCRIPTION: Index partiels et couvrants sur les examens actifs
+-- Presque toutes les requêtes de l'application filtrent sur statut IN ('PROPOSE', 'VALIDE'):
+-- ces index ne contiennent que les examens actifs (les annulés n'y entrent pas) et sont
+-- clés sur les accès réels (salle/date, professeur/jour, module, plages de dates).
+-- Le prédicat doit rester identique à celui des requêtes pour que le planificateur
+-- puisse utiliser l'index (statut = 'VALIDE' seul l'implique aussi).
+-- Migration sans verrou bloquant (CONCURRENTLY): à exécuter hors transaction, par psql
+--   psql -d exam_platform -f 12_index_actifs.sql
+-- Mesure avec/sans index (session en lecture seule, mêmes variables PG* que psql):
+--   python benchmark_index.py
+-- ============================================
+
+-- -------------------------------------------------
+-- 1. INDEX PARTIELS
+-- -------------------------------------------------
+
+-- Occupation d'une salle (v_occupation_salles, taux d'occupation, recherche de salle libre)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_examens_actifs_salle_date
+    ON examens_planifies (salle_id, date_heure)
+    INCLUDE (duree_minutes)
+    WHERE statut IN ('PROPOSE', 'VALIDE');
+
+-- Examens d'un professeur par jour (3 par jour au plus, charge de surveillance)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_examens_actifs_prof_jour
+    ON examens_planifies (prof_id, DATE(date_heure))
+    INCLUDE (duree_minutes)
+    WHERE statut IN ('PROPOSE', 'VALIDE');
+
+-- Examen d'un module (module unique, module_conflicts joint aux examens du jour)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_examens_actifs_module
+    ON examens_planifies (module_id)
+    INCLUDE (date_heure)
+    WHERE statut IN ('PROPOSE', 'VALIDE');
+
+-- Plages de dates et répartition par jour (emploi du temps, statistiques, tableaux de bord)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_examens_actifs_date
+    ON examens_planifies (date_heure)
+    INCLUDE (module_id, prof_id, salle_id, duree_minutes)
+    WHERE statut IN ('PROPOSE', 'VALIDE');
+
+-- -------------------------------------------------
+-- 2. STATISTIQUES
+-- -------------------------------------------------
+
+ANALYZE examens_planifies;
+
+SELECT indexrelname AS index, pg_size_pretty(pg_relation_size(indexrelid)) AS taille
+FROM pg_stat_user_indexes
+WHERE relname = 'examens_planifies'
+ORDER BY indexrelname;
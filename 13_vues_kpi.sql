@@ -0,0 +1,135 @@
+-- ============================================
+-- FICHIER: 13_vues_kpi.sql
+-- DESCRIPTION: Vues matérialisées des tableaux de bord (Direction, Chef de département)
+-- Occupation des salles, charge des professeurs, conflits par département et
+-- distributions par heure et par jour: calculées une fois après chaque génération,
+-- optimisation ou validation (rafraichir_vues_kpi) au lieu de l'être à chaque affichage.
+-- REFRESH ... CONCURRENTLY: les lectures ne sont pas bloquées pendant le rafraîchissement
+-- (index unique requis sur chaque vue). Date du dernier rafraîchissement: kpi_fraicheur
+-- À exécuter après 12_index_actifs.sql
+-- ============================================
+
+-- -------------------------------------------------
+-- 1. VUES MATÉRIALISÉES
+-- -------------------------------------------------
+
+-- Occupation par salle (taux sur 20 créneaux, comme get_detailed_room_occupation)
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_occupation_salles AS
+SELECT
+    l.id AS salle_id,
+    l.nom AS salle,
+    l.type,
+    l.capacite,
+    COUNT(ep.id) AS nb_examens,
+    COALESCE(SUM(ep.duree_minutes), 0) / 60.0 AS total_heures,
+    ROUND(COUNT(ep.id) * 100.0 / 20, 1) AS taux_occupation
+FROM lieu_examen l
+LEFT JOIN examens_planifies ep ON l.id = ep.salle_id AND ep.statut IN ('PROPOSE', 'VALIDE')
+GROUP BY l.id, l.nom, l.type, l.capacite;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_mv_occupation_salles ON mv_occupation_salles(salle_id);
+
+-- Charge de surveillance par professeur (professeurs ayant au moins un examen)
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_charge_professeurs AS
+SELECT
+    p.id AS prof_id,
+    CONCAT(p.prenom, ' ', p.nom) AS professeur,
+    d.nom AS departement,
+    COUNT(ep.id) AS nb_examens,
+    SUM(ep.duree_minutes) / 60.0 AS total_heures,
+    ROUND(AVG(ep.duree_minutes), 0) AS duree_moyenne_min
+FROM professeurs p
+JOIN examens_planifies ep ON p.id = ep.prof_id
+JOIN departements d ON p.dept_id = d.id
+WHERE ep.statut IN ('PROPOSE', 'VALIDE')
+GROUP BY p.id, p.prenom, p.nom, d.nom;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_mv_charge_professeurs ON mv_charge_professeurs(prof_id);
+
+-- Conflits par département (conflits_actifs): un conflit compte pour le département
+-- de chacun de ses deux examens
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_conflits_par_departement AS
+WITH cotes AS (
+    SELECT c.type_conflit, c.ressource_id, c.examen1, c.examen2, c.examen1 AS examen_id
+    FROM conflits_actifs c
+    UNION ALL
+    SELECT c.type_conflit, c.ressource_id, c.examen1, c.examen2, c.examen2
+    FROM conflits_actifs c
+)
+SELECT
+    d.id AS dept_id,
+    d.nom AS departement,
+    COUNT(DISTINCT c.examen_id) AS examens_en_conflit,
+    COUNT(DISTINCT (c.type_conflit, c.ressource_id, c.examen1, c.examen2)) AS nb_conflits
+FROM cotes c
+JOIN examens_planifies ep ON ep.id = c.examen_id
+JOIN modules m ON ep.module_id = m.id
+JOIN formations f ON m.formation_id = f.id
+JOIN departements d ON f.dept_id = d.id
+GROUP BY d.id, d.nom;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_mv_conflits_par_departement ON mv_conflits_par_departement(dept_id);
+
+-- Distribution des examens par heure de début
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_distribution_horaire AS
+SELECT EXTRACT(HOUR FROM date_heure)::INTEGER AS heure, COUNT(*) AS nb_examens
+FROM examens_planifies
+WHERE statut IN ('PROPOSE', 'VALIDE')
+GROUP BY EXTRACT(HOUR FROM date_heure)::INTEGER;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_mv_distribution_horaire ON mv_distribution_horaire(heure);
+
+-- Examens par jour et par département
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_examens_par_jour AS
+SELECT f.dept_id, DATE(ep.date_heure) AS jour, COUNT(*) AS nb_examens
+FROM examens_planifies ep
+JOIN modules m ON ep.module_id = m.id
+JOIN formations f ON m.formation_id = f.id
+WHERE ep.statut IN ('PROPOSE', 'VALIDE')
+GROUP BY f.dept_id, DATE(ep.date_heure);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_mv_examens_par_jour ON mv_examens_par_jour(dept_id, jour);
+
+-- -------------------------------------------------
+-- 2. RAFRAÎCHISSEMENT
+-- -------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS kpi_fraicheur (
+    vue VARCHAR(100) PRIMARY KEY,
+    rafraichi_le TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    duree_ms INTEGER
+);
+
+-- Rafraîchit toutes les vues (lectures non bloquées) et retourne la date du rafraîchissement
+CREATE OR REPLACE FUNCTION rafraichir_vues_kpi()
+RETURNS TIMESTAMP AS $$
+DECLARE
+    v_vue TEXT;
+    v_debut TIMESTAMP;
+BEGIN
+    FOREACH v_vue IN ARRAY ARRAY[
+        'mv_occupation_salles', 'mv_charge_professeurs', 'mv_conflits_par_departement',
+        'mv_distribution_horaire', 'mv_examens_par_jour'
+    ] LOOP
+        v_debut := clock_timestamp();
+        EXECUTE format('REFRESH MATERIALIZED VIEW CONCURRENTLY %I', v_vue);
+
+        INSERT INTO kpi_fraicheur (vue, rafraichi_le, duree_ms)
+        VALUES (v_vue, clock_timestamp(), EXTRACT(EPOCH FROM clock_timestamp() - v_debut) * 1000)
+        ON CONFLICT (vue)
+        DO UPDATE SET rafraichi_le = EXCLUDED.rafraichi_le, duree_ms = EXCLUDED.duree_ms;
+    END LOOP;
+
+    RETURN (SELECT MIN(rafraichi_le) FROM kpi_fraicheur);
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rafraichir_vues_kpi();
+
+DO $$
+BEGIN
+    RAISE NOTICE '✅ VUES MATÉRIALISÉES DES TABLEAUX DE BORD CRÉÉES';
+    RAISE NOTICE '   - mv_occupation_salles, mv_charge_professeurs, mv_conflits_par_departement';
+    RAISE NOTICE '   - mv_distribution_horaire, mv_examens_par_jour';
+    RAISE NOTICE '   - Rafraîchissement: SELECT rafraichir_vues_kpi();';
+END $$;
@@ -6,10 +6,20 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+import psycopg2.pool
 import numpy as np
-import random
+import os
 import time
 
+import bounds
+import conflicts
+import kpi
+import optimizer
+import precheck
+import scheduler
+
 # Configuration de la page
 st.set_page_config(
     page_title="Plateforme d'Examens Universitaires",
@@ -18,33 +28,158 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Configuration de la base de données
+# Configuration de la base de données: variables PGHOST, PGDATABASE, PGUSER, PGPASSWORD
+# et PGPORT si elles sont définies (comme 05_deployment_setup.sh et benchmark_index.py)
 DB_CONFIG = {
-    'host': 'dpg-d5mp9675r7bs73da5utg-a.frankfurt-postgres.render.com',
-    'database': 'mydb_lubi',
-    'user': 'mydb_lubi_user',
-    'password': 'IdVcFHisd27xyAS6bJgkz1pv53xcdA7u',
-    'port': '5432'
+    'host': os.environ.get('PGHOST', 'dpg-d5mp9675r7bs73da5utg-a.frankfurt-postgres.render.com'),
+    'database': os.environ.get('PGDATABASE', 'mydb_lubi'),
+    'user': os.environ.get('PGUSER', 'mydb_lubi_user'),
+    'password': os.environ.get('PGPASSWORD', 'IdVcFHisd27xyAS6bJgkz1pv53xcdA7u'),
+    'port': os.environ.get('PGPORT', '5432')
 }
 
+# Pool de connexions partagé par toutes les sessions (taille configurable par variables d'environnement)
+DB_POOL_MIN = int(os.environ.get('DB_POOL_MIN', 1))
+DB_POOL_MAX = int(os.environ.get('DB_POOL_MAX', 10))
+# Une connexion inutilisée depuis plus longtemps est vérifiée (SELECT 1) avant d'être prêtée
+DB_POOL_VERIFICATION_SECONDES = 30
+# Pool plein (DB_POOL_MAX connexions prêtées): attente d'une connexion rendue avant l'erreur
+DB_POOL_ATTENTE_SECONDES = float(os.environ.get('DB_POOL_ATTENTE', 10))
+DB_POOL_INTERVALLE_SECONDES = 0.05
+
+class PooledConnection(psycopg2.extensions.connection):
+    """Connexion du pool, avec la date de sa dernière restitution (None: jamais prêtée)"""
+    rendue_le = None
+
+@st.cache_resource
+def get_connection_pool(minconn=DB_POOL_MIN, maxconn=DB_POOL_MAX):
+    """Pool de connexions créé une fois par processus Streamlit, partagé entre sessions et reruns"""
+    return psycopg2.pool.ThreadedConnectionPool(minconn, maxconn, connection_factory=PooledConnection,
+                                                **DB_CONFIG)
+
+def _connection_ok(conn):
+    """Vérification de santé: connexion ouverte, et encore vivante si elle a dormi longtemps"""
+    if conn.closed:
+        return False
+    if conn.rendue_le is None or time.time() - conn.rendue_le < DB_POOL_VERIFICATION_SECONDES:
+        return True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        return True
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        return False
+
+def _attendre_connexion(pool):
+    """
+    Emprunter une connexion, en attendant qu'une autre session en rende une si les
+    DB_POOL_MAX connexions sont prêtées (PoolError), au plus DB_POOL_ATTENTE_SECONDES
+    """
+    limite = time.time() + DB_POOL_ATTENTE_SECONDES
+    while True:
+        try:
+            return pool.getconn()
+        except psycopg2.pool.PoolError:
+            if pool.closed or time.time() >= limite:
+                raise psycopg2.pool.PoolError(
+                    f"les {pool.maxconn} connexions du pool sont utilisées depuis plus de "
+                    f"{DB_POOL_ATTENTE_SECONDES:g}s (augmenter DB_POOL_MAX)"
+                )
+            time.sleep(DB_POOL_INTERVALLE_SECONDES)
+
 def get_connection():
-    """Établir une connexion à la base de données"""
+    """Emprunter une connexion au pool (rendue par release_connection)"""
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
+        pool = get_connection_pool()
+        conn = _attendre_connexion(pool)
+        if not _connection_ok(conn):
+            # Connexion coupée par le serveur: la jeter et en ouvrir une neuve
+            pool.putconn(conn, close=True)
+            conn = _attendre_connexion(pool)
+        # CRITIQUE: Autocommit activé pour éviter les erreurs de transaction
+        conn.autocommit = True
         return conn
     except Exception as e:
         st.error(f"Erreur de connexion à la base de données: {e}")
         return None
 
+def release_connection(conn):
+    """Rendre une connexion au pool (transaction interrompue annulée)"""
+    pool = get_connection_pool()
+    try:
+        if not conn.closed and conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            conn.rollback()
+        conn.rendue_le = time.time()
+        pool.putconn(conn, close=bool(conn.closed))
+    except Exception:
+        pool.putconn(conn, close=True)
+
+# Instantané en mémoire de l'emploi du temps, partagé entre sessions (st.cache_data) et
+# identifié par la version de l'emploi du temps: recalculé une fois après chaque écriture
+# des examens ou de leurs salles, jamais à chaque exécution du script.
+# Version = marqueurs peu coûteux lus à chaque exécution: un ajout ou une suppression change
+# le nombre de lignes ou le plus grand id, une modification change modified_at
+# (trigger trg_update_modified_at) et les salles d'un examen réparti sont réinsérées.
+# Les inscriptions ne changent pas pendant une session d'examens: elles sont relues
+# au plus tard après DUREE_VIE_INSTANTANE_SECONDES (ttl du cache), hors du chemin de chaque exécution
+SQL_VERSION_EMPLOI_DU_TEMPS = """
+    SELECT ep.nb, ep.id_max, ep.modifie_le, es.nb, es.id_max
+    FROM (SELECT COUNT(*) AS nb, MAX(id) AS id_max, MAX(modified_at) AS modifie_le
+          FROM examens_planifies) ep,
+         (SELECT COUNT(*) AS nb, MAX(id) AS id_max FROM examens_salles) es
+"""
+DUREE_VIE_INSTANTANE_SECONDES = 600
+
+@st.cache_data(max_entries=2, ttl=DUREE_VIE_INSTANTANE_SECONDES, show_spinner=False)
+def load_schedule_snapshot(_cursor, version):
+    """Instance du problème et examens actifs (solution chargée) d'une version de l'emploi du temps"""
+    instance = scheduler.load_instance(_cursor)
+    schedule = scheduler.Schedule(instance)
+    schedule.load_existing()
+    return {'instance': instance, 'schedule': schedule}
+
+@st.cache_data(max_entries=2, ttl=DUREE_VIE_INSTANTANE_SECONDES, show_spinner=False)
+def load_constraint_checker(_cursor, version):
+    """Index des contraintes (precheck.ConstraintChecker) d'une version de l'emploi du temps"""
+    return precheck.ConstraintChecker(load_schedule_snapshot(_cursor, version)['instance'])
+
+@st.cache_data(max_entries=2, ttl=DUREE_VIE_INSTANTANE_SECONDES, show_spinner=False)
+def load_conflicts(_cursor, version):
+    """Conflits (conflicts.detect_conflicts) d'une version de l'emploi du temps"""
+    snapshot = load_schedule_snapshot(_cursor, version)
+    return conflicts.detect_conflicts(snapshot['instance'], snapshot['schedule'])
+
+@st.cache_data(max_entries=8, ttl=DUREE_VIE_INSTANTANE_SECONDES, show_spinner="Calcul des bornes inférieures...")
+def load_schedule_bounds(_cursor, version, nb_examens, duree_minutes):
+    """Bornes inférieures (bounds.lower_bounds) des modules à planifier d'une version de l'emploi du temps"""
+    instance = scheduler.load_instance(_cursor, nb_examens=nb_examens, duree_minutes=duree_minutes)
+    return bounds.lower_bounds(instance)
+
+@st.cache_data(ttl=DUREE_VIE_INSTANTANE_SECONDES, show_spinner=False)
+def load_bulk_load_available(_cursor):
+    """Le mode chargement en bloc (07_chargement_en_bloc.sql) est-il installé ? Vérifié une fois par processus"""
+    _cursor.execute("SELECT to_regprocedure('debut_chargement_en_bloc()') IS NOT NULL")
+    return _cursor.fetchone()[0]
+
 class ExamPlatform:
     def __init__(self):
         self.conn = get_connection()
         if self.conn:
-            # CRITIQUE: Autocommit activé pour éviter les erreurs de transaction
-            self.conn.autocommit = True
             self.cursor = self.conn.cursor()
         else:
             self.cursor = None
+        # Version de l'emploi du temps et résultats déjà lus du cache pendant cette exécution
+        self.version = None
+        self.memo = {}
+        # Relations des scripts de migration absentes de la base (kpi.RELATIONS_KPI)
+        self.relations_absentes = None
+    
+    def close(self):
+        """Fin de l'exécution du script: rendre la connexion au pool"""
+        if self.conn:
+            self.cursor.close()
+            release_connection(self.conn)
+            self.conn = self.cursor = None
     
     def safe_execute(self, query, params=None):
         """Exécuter une requête SQL avec gestion d'erreur"""
@@ -138,6 +273,7 @@ class ExamPlatform:
     def reset_all_exams(self):
         """Réinitialiser tous les examens"""
         try:
+            self.invalidate_snapshot()
             success, error = self.safe_execute("SELECT 1 FROM examens_planifies LIMIT 1")
             if not success:
                 return True, "Table déjà vide"
@@ -145,10 +281,12 @@ class ExamPlatform:
             try:
                 success, error = self.safe_execute("TRUNCATE TABLE examens_planifies CASCADE")
                 if success:
+                    self.refresh_kpi_views()
                     return True, "Tous les examens ont été réinitialisés"
             except:
                 success, error = self.safe_execute("DELETE FROM examens_planifies")
                 if success:
+                    self.refresh_kpi_views()
                     return True, "Tous les examens ont été réinitialisés"
                 else:
                     return False, f"Erreur DELETE: {error}"
@@ -158,183 +296,240 @@ class ExamPlatform:
         except Exception as e:
             return False, f"Erreur: {str(e)}"
     
+    def get_schedule_version(self):
+        """Version de l'emploi du temps (lue une fois par exécution, puis après chaque écriture)"""
+        if self.version is None:
+            success, error = self.safe_execute(SQL_VERSION_EMPLOI_DU_TEMPS)
+            # Sans version lisible, l'instantané n'est réutilisé que dans cette exécution
+            self.version = tuple(self.cursor.fetchone()) if success else time.time()
+        return self.version
+    
+    def cached(self, fonction, *args):
+        """Résultat d'un chargement en cache (st.cache_data) pour la version courante"""
+        version = self.get_schedule_version()
+        cle = (fonction.__name__, version) + args
+        if cle not in self.memo:
+            self.memo[cle] = fonction(self.cursor, version, *args)
+        return self.memo[cle]
+    
+    def get_schedule_snapshot(self):
+        """
+        Instance du problème et examens actifs, pour vérifier les contraintes sans
+        aller-retour base: chargés une fois par version de l'emploi du temps
+        """
+        return self.cached(load_schedule_snapshot)
+    
+    def get_checker(self):
+        """Index des contraintes (precheck.ConstraintChecker) de la version courante"""
+        return self.cached(load_constraint_checker)
+    
+    def precheck(self, module_id, prof_id, salle_id, date_heure, duree_minutes):
+        """
+        Vérifier un examen sans requête: contraintes violées et, s'il y en a de bloquantes,
+        créneaux et salles faisables les plus proches
+        """
+        checker = self.get_checker()
+        violations = checker.check(module_id, prof_id, salle_id, date_heure, duree_minutes)
+        suggestions = {'salles': [], 'creneaux': []}
+        if any(v['bloquant'] for v in violations):
+            suggestions = checker.suggest(module_id, prof_id, salle_id, date_heure, duree_minutes)
+        return violations, suggestions
+    
+    def invalidate_snapshot(self):
+        """Après une écriture: relire la version (l'instantané de la nouvelle version sera chargé)"""
+        self.version = None
+        self.memo.clear()
+    
+    def get_schedule_bounds(self, nb_examens=30, duree_minutes=120):
+        """
+        Bornes inférieures du nombre de jours pour les modules à planifier
+        (bounds.lower_bounds), calculées une fois par version et par paramètres
+        """
+        return self.cached(load_schedule_bounds, nb_examens, duree_minutes)
+    
+    def refresh_kpi_views(self):
+        """
+        Rafraîchir les vues matérialisées des tableaux de bord (13_vues_kpi.sql)
+        après une génération, une optimisation ou une validation
+        """
+        if 'kpi_fraicheur' in self.get_missing_relations():
+            return None
+        success, error = self.safe_execute("SELECT rafraichir_vues_kpi()")
+        return self.cursor.fetchone()[0] if success else None
+    
+    def get_kpi_freshness(self):
+        """Date du plus ancien rafraîchissement des vues des tableaux de bord (None si inconnue)"""
+        success, error = self.safe_execute("SELECT MIN(rafraichi_le) FROM kpi_fraicheur")
+        return self.cursor.fetchone()[0] if success else None
+    
+    def get_conflicts(self):
+        """
+        Conflits réels de l'emploi du temps (conflicts.detect_conflicts): chevauchement
+        des durées pour les salles et professeurs, même jour pour les étudiants.
+        Calculés une fois par version de l'emploi du temps.
+        """
+        return self.cached(load_conflicts)
+    
+    def get_departements_noms(self):
+        """Noms des départements par id"""
+        success, error = self.safe_execute("SELECT id, nom FROM departements")
+        return dict(self.cursor.fetchall()) if success else {}
+    
     def count_conflicts(self):
-        """Compter les conflits"""
+        """
+        Compter les examens en conflit de salle (examens distincts partageant une salle
+        au même moment): indicateur "Conflits" des tableaux de bord, qui bloque la
+        validation finale. Lecture de conflits_actifs (10_conflits_actifs.sql), sinon
+        détection sur l'instantané
+        """
+        success, error = self.safe_execute(kpi.SQL_EXAMENS_EN_CONFLIT_SALLE)
+        if success:
+            return self.cursor.fetchone()[0]
         try:
-            success, error = self.safe_execute("""
-                SELECT COUNT(*) FROM (
-                    SELECT DISTINCT e1.id
-                    FROM examens_planifies e1
-                    JOIN examens_planifies e2 ON e1.id != e2.id
-                    WHERE e1.salle_id = e2.salle_id 
-                    AND e1.date_heure = e2.date_heure
-                    AND e1.statut IN ('PROPOSE', 'VALIDE') AND e2.statut IN ('PROPOSE', 'VALIDE')
-                ) as conflits
-            """)
-            if success:
-                return self.cursor.fetchone()[0]
-        except:
-            pass
-        return 0
+            return len(conflicts.conflicting_exams(self.get_conflicts()))
+        except Exception:
+            return 0
+    
+    def count_conflicts_by_type(self):
+        """Nombre de paires d'examens en conflit de chaque type (salle, professeur, etudiant)"""
+        success, error = self.safe_execute("SELECT type_conflit, nb_conflits FROM v_conflits_actifs_par_type")
+        if success:
+            compte = dict.fromkeys(conflicts.TYPES_CONFLITS, 0)
+            compte.update(self.cursor.fetchall())
+            return compte
+        return conflicts.count_by_type(self.get_conflicts())
     
     def get_conflicts_details(self):
         """Récupérer les détails des conflits"""
         try:
-            success, error = self.safe_execute("""
-                SELECT DISTINCT
-                    e1.id as id1, 
-                    e2.id as id2,
-                    l.nom as salle,
-                    e1.date_heure as date_heure,
-                    m1.nom as module1,
-                    m2.nom as module2,
-                    d1.nom as departement1,
-                    d2.nom as departement2
-                FROM examens_planifies e1
-                JOIN examens_planifies e2 ON e1.id < e2.id
-                JOIN lieu_examen l ON e1.salle_id = l.id
-                JOIN modules m1 ON e1.module_id = m1.id
-                JOIN modules m2 ON e2.module_id = m2.id
-                JOIN formations f1 ON m1.formation_id = f1.id
-                JOIN formations f2 ON m2.formation_id = f2.id
-                JOIN departements d1 ON f1.dept_id = d1.id
-                JOIN departements d2 ON f2.dept_id = d2.id
-                WHERE e1.salle_id = e2.salle_id 
-                AND e1.date_heure = e2.date_heure
-                AND e1.statut IN ('PROPOSE', 'VALIDE') AND e2.statut IN ('PROPOSE', 'VALIDE')
-                ORDER BY e1.date_heure
-                LIMIT 20
-            """)
-            
-            if success:
-                conflicts = self.cursor.fetchall()
-                if conflicts:
-                    columns = ['Examen1', 'Examen2', 'Salle', 'Date/Heure', 'Module1', 'Module2', 'Département1', 'Département2']
-                    return pd.DataFrame(conflicts, columns=columns)
+            conflits = self.get_conflicts()
+            if conflits:
+                instance = self.get_schedule_snapshot()['instance']
+                departements = self.get_departements_noms()
+                
+                def ressource(c):
+                    if c.type == 'salle':
+                        return instance.salle_noms[instance.salle_index[c.ressource]]
+                    if c.type == 'professeur':
+                        return f"Professeur {c.ressource}"
+                    return f"{c.nb_etudiants} étudiant(s)"
+                
+                def module(module_id):
+                    m = instance.module_index[module_id]
+                    return instance.module_noms[m], departements.get(instance.module_dept[m])
+                
+                lignes = [
+                    (c.type, c.examen1, c.examen2, ressource(c), c.debut.strftime('%Y-%m-%d %H:%M:%S'),
+                     module(c.module1)[0], module(c.module2)[0], module(c.module1)[1], module(c.module2)[1])
+                    for c in conflits
+                ]
+                columns = ['Type', 'Examen1', 'Examen2', 'Ressource', 'Date/Heure', 'Module1', 'Module2',
+                           'Département1', 'Département2']
+                return pd.DataFrame(lignes, columns=columns)
         except Exception as e:
             st.error(f"Erreur détails conflits: {e}")
         
         return pd.DataFrame()
     
-    # ==================== GÉNÉRATION AUTO (VERSION SIMPLIFIÉE QUI FONCTIONNE) ====================
+    # ==================== GÉNÉRATION AUTO (GRAPHE DE CONFLITS + DSATUR) ====================
     
-    def generate_simple_timetable(self, nb_examens=30, duree_minutes=120):
+    def generate_simple_timetable(self, nb_examens=30, duree_minutes=120, nb_departs=1,
+                                  par_departement=False):
         """
-        Générer un emploi du temps SIMPLE qui fonctionne
+        Générer un emploi du temps sans conflit étudiant:
+        graphe de conflits entre modules + coloration DSatur des jours,
+        puis affectation des heures, salles et professeurs (voir scheduler.py).
+        Avec nb_departs > 1, plusieurs constructions sont lancées en parallèle
+        et la meilleure est gardée (optimizer.multi_start).
+        Avec par_departement, chaque département est résolu dans son propre processus
+        puis les résultats sont réconciliés (optimizer.solve_by_department).
         """
         start_time = time.time()
         
         try:
-            # 1. Récupérer les modules disponibles
-            success, error = self.safe_execute("""
-                SELECT id, nom FROM modules 
-                ORDER BY RANDOM() 
-                LIMIT %s
-            """, (nb_examens,))
+            # 1. Charger le problème (modules sans examen, inscriptions, salles, professeurs)
+            instance = scheduler.load_instance(self.cursor, nb_examens=nb_examens, duree_minutes=duree_minutes)
             
-            if not success:
-                return False, f"Erreur modules: {error}", 0, {}
-            
-            modules = self.cursor.fetchall()
-            
-            if not modules:
+            if instance.nb_modules == len(instance.examens_existants):
                 return False, "Aucun module disponible", 0, {}
             
-            # 2. Récupérer les salles
-            success, error = self.safe_execute("SELECT id, nom FROM lieu_examen ORDER BY RANDOM() LIMIT 10")
-            if not success:
-                return False, "Erreur salles", 0, {}
-            salles = self.cursor.fetchall()
-            
-            # 3. Récupérer les professeurs
-            success, error = self.safe_execute("SELECT id FROM professeurs ORDER BY RANDOM() LIMIT 20")
-            if not success:
-                return False, "Erreur professeurs", 0, {}
-            professeurs = self.cursor.fetchall()
+            # 2. Résoudre en mémoire
+            infos_departs = {}
+            if par_departement:
+                schedule, infos_departs = optimizer.solve_by_department(instance)
+            elif nb_departs > 1:
+                schedule, infos_departs = optimizer.multi_start(instance, nb_departs=nb_departs)
+            else:
+                schedule = scheduler.build_schedule(instance)
             
-            # 4. Générer des dates (prochaines 2 semaines)
-            dates = []
-            for i in range(1, 15):
-                date_base = datetime.now().date() + timedelta(days=i)
-                if date_base.weekday() < 5:  # Lundi-Vendredi
-                    dates.append(f"{date_base} 08:30:00")
-                    dates.append(f"{date_base} 14:00:00")
+            infos_departs['departs'] = nb_departs
+            # Mêmes modules à planifier que l'instance: bornes déjà en cache pour cette version
+            infos_departs['jours_min'] = self.get_schedule_bounds(nb_examens, duree_minutes)['jours_min']
+            return self.save_schedule(instance, schedule, start_time, infos_departs)
             
-            if not dates:
-                dates = [f"{datetime.now().date() + timedelta(days=1)} 08:30:00"]
+        except Exception as e:
+            error_msg = str(e)
+            return False, f"Erreur système: {error_msg}", 0, {}
+    
+    def save_schedule(self, instance, schedule, start_time, infos=None):
+        """Insérer les examens placés d'une solution et résumer le résultat"""
+        infos = infos or {}
+        
+        try:
+            a_planifier = np.flatnonzero(~schedule.fixe)
+            if len(a_planifier) == 0:
+                return False, "Aucun module disponible", 0, {}
             
             succes_count = 0
-            echecs_count = 0
-            echecs_details = []
+            echecs_count = len(schedule.non_places)
+            echecs_details = [f"{instance.module_noms[m][:30]}: {raison}"
+                              for m, raison in schedule.non_places.items()]
+            
+            # 3. Insérer les examens placés: en bloc (une transaction), sinon examen par examen
+            #    pour isoler ceux que les triggers rejettent
+            lignes = schedule.to_rows()
+            success, error = self.insert_schedule_bulk(lignes)
+            if success:
+                succes_count, lignes = len(lignes), []
+            elif lignes:
+                echecs_details.append(f"Insertion en bloc annulée: {error[:100]}")
             
-            # 5. Insérer les examens UN PAR UN pour éviter les erreurs en bloc
-            for i, module in enumerate(modules[:nb_examens]):
-                module_id, module_nom = module
-                
-                try:
-                    # Choisir des valeurs aléatoires
-                    salle_id = random.choice(salles)[0]
-                    prof_id = random.choice(professeurs)[0]
-                    date_heure = random.choice(dates)
-                    
-                    # ESSAYER PLUSIEURS MÉTHODES D'INSERTION
-                    
-                    # Méthode 1: Sans creneau_id, mode MANUEL
-                    try:
-                        insert_query = """
+            for module_id, prof_id, salle_id, date_heure, duree, salles in lignes:
+                if salles:
+                    success, error = self.insert_split_exam(module_id, prof_id, date_heure, duree, salles)
+                else:
+                    success, error = self.safe_execute("""
                         INSERT INTO examens_planifies 
                         (module_id, prof_id, salle_id, date_heure, duree_minutes, 
                          mode_generation, statut, priorite)
                         VALUES (%s, %s, %s, %s, %s, 'MANUEL', 'VALIDE', 1)
-                        """
-                        self.cursor.execute(insert_query, (module_id, prof_id, salle_id, date_heure, duree_minutes))
-                        succes_count += 1
-                        continue
-                    except Exception as e1:
-                        pass
-                    
-                    # Méthode 2: Avec mode AUTO et creneau_id NULL
-                    try:
-                        insert_query = """
-                        INSERT INTO examens_planifies 
-                        (module_id, prof_id, salle_id, date_heure, duree_minutes, 
-                         mode_generation, statut, priorite, creneau_id)
-                        VALUES (%s, %s, %s, %s, %s, 'AUTO', 'VALIDE', 1, NULL)
-                        """
-                        self.cursor.execute(insert_query, (module_id, prof_id, salle_id, date_heure, duree_minutes))
-                        succes_count += 1
-                        continue
-                    except Exception as e2:
-                        pass
-                    
-                    # Méthode 3: Avec toutes les colonnes possibles
-                    try:
-                        insert_query = """
-                        INSERT INTO examens_planifies 
-                        (module_id, prof_id, salle_id, date_heure, duree_minutes, 
-                         mode_generation, statut, priorite, modifie_par)
-                        VALUES (%s, %s, %s, %s, %s, 'MANUEL', 'VALIDE', 1, 'system')
-                        """
-                        self.cursor.execute(insert_query, (module_id, prof_id, salle_id, date_heure, duree_minutes))
-                        succes_count += 1
-                        continue
-                    except Exception as e3:
-                        echecs_count += 1
-                        echecs_details.append(f"{module_nom[:30]}: toutes les méthodes ont échoué")
-                        
-                except Exception as e:
+                    """, (module_id, prof_id, salle_id, date_heure, duree))
+                
+                if success:
+                    succes_count += 1
+                else:
                     echecs_count += 1
-                    echecs_details.append(f"{module_nom[:30]}: {str(e)[:100]}")
-                    continue
+                    module_nom = instance.module_noms[instance.module_index[module_id]]
+                    echecs_details.append(f"{module_nom[:30]}: {error[:100]}")
             
+            self.invalidate_snapshot()
+            self.refresh_kpi_views()
             end_time = time.time()
             temps_execution = round(end_time - start_time, 2)
+            # Jours de toute la session (examens existants compris), comme la borne
+            ecart = bounds.gap(instance, schedule, infos) if infos.get('jours_min') else {}
             
             details = {
-                'modules_disponibles': len(modules),
+                'modules_disponibles': len(a_planifier),
                 'examens_planifies': succes_count,
                 'echecs': echecs_count,
-                'taux_reussite': (succes_count / len(modules)) * 100 if modules else 0,
+                'taux_reussite': (succes_count / len(a_planifier)) * 100,
+                'jours_utilises': ecart.get('jours_utilises'),
+                'jours_min': ecart.get('jours_min'),
+                'ecart_jours': ecart.get('ecart_jours'),
+                'departs': infos.get('departs', 1),
+                'graine': infos.get('graine'),
+                'reconcilies': infos.get('reconcilies', 0),
                 'temps_execution': temps_execution,
                 'echecs_details': echecs_details[:5]
             }
@@ -349,27 +544,147 @@ class ExamPlatform:
             error_msg = str(e)
             return False, f"Erreur système: {error_msg}", 0, {}
     
+    def start_anytime_generation(self, nb_examens=30, duree_minutes=120, reinitialiser=False):
+        """
+        Préparer une génération anytime et la garder en session (generation_en_cours)
+        avant la première tentative: le bouton d'arrêt peut être affiché dès maintenant.
+        Avec reinitialiser, les examens existants sont ignorés et ne seront supprimés
+        qu'à l'enregistrement (save_pending_generation): une génération interrompue
+        laisse l'emploi du temps en place. Retourne None s'il n'y a rien à planifier.
+        """
+        st.session_state.pop('generation_en_cours', None)
+        instance = scheduler.load_instance(self.cursor, nb_examens=nb_examens, duree_minutes=duree_minutes,
+                                           avec_existants=not reinitialiser)
+        if instance.nb_modules == len(instance.examens_existants):
+            return None
+        
+        generation = {'instance': instance, 'schedule': None, 'debut': time.time(), 'jours_min': None,
+                      'reinitialiser': reinitialiser}
+        st.session_state['generation_en_cours'] = generation
+        return generation
+    
+    def generate_anytime(self, generation, budget_secondes=30):
+        """
+        Génération anytime (optimizer.anytime): produit la progression après chaque
+        tentative. La meilleure solution est gardée en session à chaque étape, ce qui
+        permet de l'enregistrer même si la génération est arrêtée avant la fin
+        (save_pending_generation).
+        """
+        for meilleure, progression in optimizer.anytime(generation['instance'], budget_secondes=budget_secondes):
+            generation['schedule'] = meilleure
+            generation['jours_min'] = progression['jours_min']
+            yield progression
+    
+    def save_pending_generation(self):
+        """
+        Enregistrer la meilleure solution de la génération anytime en cours ou interrompue,
+        après suppression des examens existants si elle a été lancée avec réinitialisation
+        """
+        generation = st.session_state.pop('generation_en_cours', None)
+        if generation is None or generation['schedule'] is None:
+            return False, "Aucune génération en cours", 0, {}
+        if generation['reinitialiser']:
+            success, message = self.reset_all_exams()
+            if not success:
+                return False, message, 0, {}
+        return self.save_schedule(generation['instance'], generation['schedule'], generation['debut'],
+                                  {'jours_min': generation['jours_min']})
+    
+    def insert_schedule_bulk(self, lignes):
+        """
+        Écrire toute une solution en une transaction et quelques requêtes:
+        examens (execute_values, une page), salles des examens répartis, puis répartition
+        de leurs étudiants. En mode chargement en bloc (07_chargement_en_bloc.sql), les
+        triggers de ligne sont sautés et le lot est validé au COMMIT par une requête
+        ensembliste par contrainte; la moindre violation annule tout (ROLLBACK) et
+        l'appelant peut repasser examen par examen. Sans ce script, la même transaction
+        passe par les triggers de ligne.
+        lignes: Schedule.to_rows()
+        """
+        if not lignes:
+            return True, None
+        try:
+            chargement_en_bloc = load_bulk_load_available(self.cursor)
+            self.cursor.execute("BEGIN")
+            if chargement_en_bloc:
+                self.cursor.execute("SELECT debut_chargement_en_bloc()")
+            ids = psycopg2.extras.execute_values(self.cursor, """
+                INSERT INTO examens_planifies 
+                (module_id, prof_id, salle_id, date_heure, duree_minutes, 
+                 mode_generation, statut, priorite, nb_salles)
+                VALUES %s
+                RETURNING module_id, id
+            """, [(module_id, prof_id, salle_id, date_heure, duree, max(len(salles), 1))
+                  for module_id, prof_id, salle_id, date_heure, duree, salles in lignes],
+                template="(%s, %s, %s, %s, %s, 'MANUEL', 'VALIDE', 1, %s)",
+                page_size=len(lignes), fetch=True)
+            examen_ids = dict(ids)
+            
+            salles_reparties = [(examen_ids[module_id], salle, nb_places)
+                                for module_id, _, _, _, _, salles in lignes
+                                for salle, nb_places in salles]
+            if salles_reparties:
+                psycopg2.extras.execute_values(self.cursor, """
+                    INSERT INTO examens_salles (examen_id, salle_id, nb_places) VALUES %s
+                """, salles_reparties, page_size=len(salles_reparties))
+                self.cursor.execute(
+                    "SELECT repartir_etudiants(examen_id) FROM unnest(%s::int[]) AS examen_id",
+                    (sorted({examen_id for examen_id, _, _ in salles_reparties}),)
+                )
+            
+            self.cursor.execute("COMMIT")
+            return True, None
+        except Exception as e:
+            self.cursor.execute("ROLLBACK")
+            return False, str(e)
+    
+    def insert_split_exam(self, module_id, prof_id, date_heure, duree_minutes, salles):
+        """
+        Insérer un examen réparti sur plusieurs salles en une transaction:
+        examen (salle principale = première salle), salles (examens_salles),
+        puis répartition des étudiants par repartir_etudiants().
+        La cohérence des salles est vérifiée au COMMIT (trigger différé).
+        """
+        try:
+            self.cursor.execute("BEGIN")
+            self.cursor.execute("""
+                INSERT INTO examens_planifies 
+                (module_id, prof_id, salle_id, date_heure, duree_minutes, 
+                 mode_generation, statut, priorite, nb_salles)
+                VALUES (%s, %s, %s, %s, %s, 'MANUEL', 'VALIDE', 1, %s)
+                RETURNING id
+            """, (module_id, prof_id, salles[0][0], date_heure, duree_minutes, len(salles)))
+            examen_id = self.cursor.fetchone()[0]
+            
+            self.cursor.execute("""
+                INSERT INTO examens_salles (examen_id, salle_id, nb_places)
+                SELECT %s, salle_id, nb_places
+                FROM unnest(%s::int[], %s::int[]) AS s(salle_id, nb_places)
+            """, (examen_id, [r for r, _ in salles], [n for _, n in salles]))
+            
+            self.cursor.execute("SELECT repartir_etudiants(%s)", (examen_id,))
+            self.cursor.execute("COMMIT")
+            return True, None
+        except Exception as e:
+            self.cursor.execute("ROLLBACK")
+            return False, str(e)
+    
     # ==================== AJOUT MANUEL ====================
     
     def add_manual_exam(self, module_id, prof_id, salle_id, date_heure, duree_minutes):
         """Ajouter un examen manuellement"""
         try:
-            # Vérifier si le module a déjà un examen
-            success, error = self.safe_execute(
-                "SELECT COUNT(*) FROM examens_planifies WHERE module_id = %s",
-                (module_id,)
-            )
-            if success and self.cursor.fetchone()[0] > 0:
-                return False, "Ce module a déjà un examen planifié"
-            
-            # Vérifier si la salle est disponible à cette heure
-            success, error = self.safe_execute("""
-                SELECT COUNT(*) FROM examens_planifies 
-                WHERE salle_id = %s AND date_heure = %s AND statut IN ('PROPOSE', 'VALIDE')
-            """, (salle_id, date_heure))
-            
-            if success and self.cursor.fetchone()[0] > 0:
-                return False, "La salle n'est pas disponible à cette heure"
+            # Vérifier en mémoire toutes les contraintes (precheck): pas d'aller-retour base
+            try:
+                violations, _ = self.precheck(module_id, prof_id, salle_id,
+                                              datetime.strptime(date_heure, '%Y-%m-%d %H:%M:%S'),
+                                              duree_minutes)
+                bloquantes = [v['message'] for v in violations if v['bloquant']]
+                if bloquantes:
+                    return False, " ; ".join(bloquantes)
+            except Exception:
+                # L'instantané est une optimisation: les triggers restent la référence
+                pass
             
             # Insérer l'examen
             success, error = self.safe_execute("""
@@ -382,6 +697,7 @@ class ExamPlatform:
             
             if success:
                 examen_id = self.cursor.fetchone()[0]
+                self.invalidate_snapshot()
                 return True, f"Examen ajouté avec succès (ID: {examen_id})"
             else:
                 return False, f"Erreur d'insertion: {error}"
@@ -391,8 +707,11 @@ class ExamPlatform:
     
     # ==================== OPTIMISATION ====================
     
-    def optimize_timetable(self, mode='RAPIDE'):
-        """Optimiser l'emploi du temps"""
+    def optimize_timetable(self, mode='RAPIDE', budget_secondes=10):
+        """Optimiser l'emploi du temps (RAPIDE: décalage des conflits, RECUIT: recuit simulé)"""
+        if mode == 'RECUIT':
+            return self.optimize_timetable_anneal(budget_secondes)
+        
         start_time = time.time()
         
         try:
@@ -401,58 +720,211 @@ class ExamPlatform:
             if conflits_avant == 0:
                 return True, "Aucun conflit à résoudre", 0
             
-            conflicts = self.get_conflicts_details()
+            conflits = self.get_conflicts()
             
-            if conflicts.empty:
+            if not conflits:
                 return True, "Aucun conflit détecté", 0
             
-            conflits_resolus = 0
-            
-            for idx, conflit in conflicts.iterrows():
-                examen_id = conflit['Examen1']
-                date_actuelle = conflit['Date/Heure']
+            # Pré-vérification en mémoire (precheck) sur une copie de l'index, mise à jour
+            # à chaque déplacement: ne dépend pas de excl_salle_periode (11_exclusion_salles.sql)
+            instance = self.get_schedule_snapshot()['instance']
+            checker = precheck.ConstraintChecker(instance)
+            examens = {ex[0]: ex for ex in instance.examens_existants}
+            avant = {(c.type, c.examen1, c.examen2) for c in conflits}
+            deplaces = set()
+            refuses = 0
+            
+            for conflit in conflits:
+                examen_id = conflit.examen1
+                if examen_id in deplaces or conflit.examen2 in deplaces or examen_id not in examens:
+                    continue
                 
                 try:
-                    date_obj = datetime.strptime(str(date_actuelle), '%Y-%m-%d %H:%M:%S')
+                    _, module_id, _, salle_id, _, _ = examens[examen_id]
+                    prof_id, salles, date_obj, duree = checker.remove(module_id)
                     nouvelle_date = date_obj + timedelta(days=2)
                     nouvelle_date_str = nouvelle_date.strftime('%Y-%m-%d %H:%M:%S')
                     
+                    # Salle (chevauchement sur toute la durée), étudiants et professeur
+                    # au nouveau créneau: le déplacement ne doit créer aucun conflit
+                    violations = checker.check(module_id, prof_id, salle_id, nouvelle_date, duree,
+                                               salles_supplementaires=salles - {salle_id})
+                    if any(v['contrainte'] in ('salle', 'etudiants', 'professeur') for v in violations):
+                        checker.add(module_id, prof_id, salles, date_obj, duree)
+                        refuses += 1
+                        continue
+                    
                     success, error = self.safe_execute("""
-                        SELECT COUNT(*) FROM examens_planifies 
-                        WHERE salle_id = (
-                            SELECT salle_id FROM examens_planifies WHERE id = %s
-                        )
-                        AND date_heure = %s
-                        AND statut IN ('PROPOSE', 'VALIDE')
-                    """, (examen_id, nouvelle_date_str))
+                        UPDATE examens_planifies 
+                        SET date_heure = %s,
+                            modifie_par = 'optimizer'
+                        WHERE id = %s
+                    """, (nouvelle_date_str, examen_id))
                     
-                    if success and self.cursor.fetchone()[0] == 0:
-                        success, error = self.safe_execute("""
-                            UPDATE examens_planifies 
-                            SET date_heure = %s,
-                                modifie_par = 'optimizer'
-                            WHERE id = %s
-                        """, (nouvelle_date_str, examen_id))
-                        
-                        if success:
-                            conflits_resolus += 1
+                    if success:
+                        checker.add(module_id, prof_id, salles, nouvelle_date, duree)
+                        deplaces.add(examen_id)
+                    else:
+                        checker.add(module_id, prof_id, salles, date_obj, duree)
+                        refuses += 1
                 except:
                     continue
             
+            self.invalidate_snapshot()
+            self.refresh_kpi_views()
             end_time = time.time()
             temps_execution = round(end_time - start_time, 2)
             
+            # Conflits résolus: paires présentes avant et absentes de la nouvelle détection
+            apres = {(c.type, c.examen1, c.examen2) for c in self.get_conflicts()}
+            conflits_resolus = len(avant - apres)
             conflits_apres = self.count_conflicts()
             
             message = f"Optimisation terminée en {temps_execution}s\n"
-            message += f"Conflits résolus: {conflits_resolus}\n"
-            message += f"Conflits restants: {conflits_apres}"
+            message += f"Examens déplacés: {len(deplaces)} ({refuses} déplacement(s) refusé(s))\n"
+            message += f"Conflits résolus: {conflits_resolus}"
+            if apres - avant:
+                message += f", nouveaux conflits: {len(apres - avant)}"
+            message += f"\nConflits restants: {conflits_apres}"
             
             return True, message, temps_execution
             
         except Exception as e:
             return False, f"Erreur: {str(e)[:200]}", 0
     
+    def optimize_timetable_anneal(self, budget_secondes=10):
+        """
+        Recuit simulé en mémoire sur tous les examens actifs,
+        puis écriture des seuls examens modifiés
+        """
+        start_time = time.time()
+        
+        try:
+            conflits_avant = self.count_conflicts()
+            
+            instance, initiale = optimizer.load_current_schedule(self.cursor)
+            cout_avant = optimizer.evaluate(instance, initiale)
+            if cout_avant['total'] == 0:
+                return True, "Aucun conflit à résoudre", 0
+            
+            meilleure, cout_apres = optimizer.anneal(instance, initiale.copy(), budget_secondes=budget_secondes)
+            diff = optimizer.schedule_diff(initiale, meilleure)
+            ecrits, rejetes = self.write_schedule_diff(diff)
+            if ecrits:
+                self.refresh_kpi_views()
+            
+            end_time = time.time()
+            temps_execution = round(end_time - start_time, 2)
+            
+            conflits_apres = self.count_conflicts()
+            
+            message = f"Optimisation terminée en {temps_execution}s ({cout_apres['iterations']} itérations)\n"
+            message += f"Violations: {cout_avant['total']} → {cout_apres['total']} (pondérées)\n"
+            message += f"Examens déplacés: {ecrits}/{len(diff)}"
+            if rejetes:
+                message += f" ({len(rejetes)} rejetés par les contraintes)"
+            restants = conflicts.count_by_type(conflicts.detect_conflicts(instance, meilleure))
+            message += f"\nExamens en conflit de salle: {conflits_avant} → {conflits_apres} "
+            message += f"(paires en conflit de la solution optimisée: {restants['salle']} salle, "
+            message += f"{restants['professeur']} professeur, {restants['etudiant']} étudiant)"
+            
+            return True, message, temps_execution
+            
+        except Exception as e:
+            return False, f"Erreur: {str(e)[:200]}", 0
+    
+    def repair_timetable(self, examen_ids=(), salles_indisponibles=(), budget_secondes=0.5):
+        """
+        Réparation locale après une modification: l'état courant sert de point de départ
+        et seul le voisinage des examens modifiés (étudiants, salle, professeur) ou des
+        salles indisponibles est réoptimisé; le reste de l'emploi du temps ne bouge pas.
+        """
+        start_time = time.time()
+        
+        try:
+            instance, initiale = optimizer.load_current_schedule(self.cursor)
+            index = {examen_id: m for m, examen_id in enumerate(initiale.examen_id) if examen_id is not None}
+            modules = [index[examen_id] for examen_id in examen_ids if examen_id in index]
+            exclues = [instance.salle_index[salle_id] for salle_id in salles_indisponibles
+                       if salle_id in instance.salle_index]
+            
+            reparee, resultat = optimizer.repair(instance, initiale, modules, exclues,
+                                                 budget_secondes=budget_secondes)
+            diff = optimizer.schedule_diff(initiale, reparee)
+            ecrits, rejetes = self.write_schedule_diff(diff)
+            
+            temps_execution = round(time.time() - start_time, 2)
+            message = f"Réparation terminée en {temps_execution}s\n"
+            message += f"Examens réoptimisables: {resultat['mobiles']}\n"
+            message += f"Examens déplacés: {ecrits}/{len(diff)}"
+            if rejetes:
+                message += f" ({len(rejetes)} rejetés par les contraintes)"
+            return True, message, temps_execution
+            
+        except Exception as e:
+            return False, f"Erreur: {str(e)[:200]}", 0
+    
+    def update_exam(self, examen_id, prof_id, salle_id, date_heure, salles):
+        """
+        Déplacer un examen et remplacer ses salles en une transaction:
+        les anciennes salles supplémentaires sont retirées avant la mise à jour
+        (disponibilité vérifiée sur les nouvelles), la capacité d'un examen
+        réparti est vérifiée au COMMIT
+        """
+        try:
+            self.cursor.execute("BEGIN")
+            self.cursor.execute("DELETE FROM examens_salles WHERE examen_id = %s", (examen_id,))
+            self.cursor.execute("""
+                UPDATE examens_planifies 
+                SET prof_id = %s, salle_id = %s, date_heure = %s,
+                    nb_salles = %s, modifie_par = 'optimizer'
+                WHERE id = %s
+            """, (prof_id, salle_id, date_heure, max(len(salles), 1), examen_id))
+            if salles:
+                self.cursor.execute("""
+                    INSERT INTO examens_salles (examen_id, salle_id, nb_places)
+                    SELECT %s, salle_id, nb_places
+                    FROM unnest(%s::int[], %s::int[]) AS s(salle_id, nb_places)
+                """, (examen_id, [r for r, _ in salles], [n for _, n in salles]))
+                self.cursor.execute("SELECT repartir_etudiants(%s)", (examen_id,))
+            else:
+                self.cursor.execute("DELETE FROM repartition_etudiants WHERE examen_id = %s", (examen_id,))
+            self.cursor.execute("COMMIT")
+            return True, None
+        except Exception as e:
+            self.cursor.execute("ROLLBACK")
+            return False, str(e)
+    
+    def write_schedule_diff(self, diff, max_passes=3):
+        """
+        Appliquer les modifications (examen_id, prof_id, salle_id, date_heure, salles).
+        Une mise à jour rejetée par un trigger peut passer une fois les autres
+        examens déplacés: on refait quelques passes sur les rejets.
+        """
+        en_attente = list(diff)
+        erreurs = {}
+        ecrits = 0
+        
+        for _ in range(max_passes):
+            rejetes = []
+            for ligne in en_attente:
+                success, error = self.update_exam(*ligne)
+                
+                if success:
+                    ecrits += 1
+                    erreurs.pop(ligne[0], None)
+                else:
+                    rejetes.append(ligne)
+                    erreurs[ligne[0]] = error
+            
+            if not rejetes or len(rejetes) == len(en_attente):
+                break
+            en_attente = rejetes
+        
+        if ecrits:
+            self.invalidate_snapshot()
+        return ecrits, erreurs
+    
     # ==================== FONCTIONS DE DONNÉES POUR DASHBOARDS ====================
     
     def get_generated_timetable(self, limit=500):
@@ -488,42 +960,12 @@ class ExamPlatform:
             return pd.DataFrame()
     
     def get_timetable_statistics(self):
-        """Statistiques"""
-        stats = {}
-        
-        success, error = self.safe_execute("SELECT COUNT(*) FROM examens_planifies WHERE statut IN ('PROPOSE', 'VALIDE')")
-        if success:
-            stats['total_examens'] = self.cursor.fetchone()[0]
-        
-        success, error = self.safe_execute("""
-            SELECT DATE(date_heure) as jour, COUNT(*) 
-            FROM examens_planifies 
-            WHERE statut IN ('PROPOSE', 'VALIDE')
-            GROUP BY DATE(date_heure)
-            ORDER BY DATE(date_heure)
-        """)
-        if success:
-            data = self.cursor.fetchall()
-            if data:
-                stats['examens_par_jour'] = pd.DataFrame(data, columns=['Date', 'Examens'])
-        
-        success, error = self.safe_execute("""
-            SELECT d.nom, COUNT(ep.id) 
-            FROM examens_planifies ep
-            LEFT JOIN modules m ON ep.module_id = m.id
-            LEFT JOIN formations f ON m.formation_id = f.id
-            LEFT JOIN departements d ON f.dept_id = d.id
-            WHERE ep.statut IN ('PROPOSE', 'VALIDE')
-            GROUP BY d.nom
-            HAVING d.nom IS NOT NULL
-            ORDER BY COUNT(ep.id) DESC
-        """)
-        if success:
-            data = self.cursor.fetchall()
-            if data:
-                stats['repartition_par_departement'] = pd.DataFrame(data, columns=['Département', 'Examens'])
-        
-        return stats
+        """Statistiques de l'emploi du temps (kpi.StatistiquesEmploiDuTemps), en une requête"""
+        try:
+            return kpi.timetable_statistics(self.cursor)
+        except Exception as e:
+            st.error(f"Erreur statistiques: {e}")
+            return None
     
     # ==================== FONCTIONS SPÉCIFIQUES AUX RÔLES ====================
     
@@ -647,19 +1089,14 @@ class ExamPlatform:
         try:
             success, error = self.safe_execute("""
                 SELECT 
-                    l.type,
-                    COUNT(DISTINCT l.id) as nb_salles,
-                    COUNT(ep.id) as nb_examens,
-                    CASE 
-                        WHEN COUNT(DISTINCT l.id) * 20 > 0 
-                        THEN ROUND(COUNT(ep.id) * 100.0 / (COUNT(DISTINCT l.id) * 20), 1)
-                        ELSE 0
-                    END as taux_occupation
-                FROM lieu_examen l
-                LEFT JOIN examens_planifies ep ON l.id = ep.salle_id AND ep.statut IN ('PROPOSE', 'VALIDE')
-                GROUP BY l.type
-                ORDER BY l.type
-            """)
+                    type,
+                    COUNT(*) as nb_salles,
+                    SUM(nb_examens) as nb_examens,
+                    ROUND(SUM(nb_examens) * 100.0 / (COUNT(*) * 20), 1) as taux_occupation
+                FROM {mv_occupation_salles}
+                GROUP BY type
+                ORDER BY type
+            """.format(mv_occupation_salles=self.kpi_view('mv_occupation_salles')))
             
             if success:
                 data = self.cursor.fetchall()
@@ -675,29 +1112,13 @@ class ExamPlatform:
         return pd.DataFrame()
     
     def get_detailed_room_occupation(self):
-        """Occupation détaillée par salle"""
+        """Occupation détaillée par salle (vue matérialisée mv_occupation_salles)"""
         try:
             success, error = self.safe_execute("""
-                SELECT 
-                    l.nom as salle,
-                    l.type,
-                    l.capacite,
-                    COUNT(ep.id) as nb_examens,
-                    CASE 
-                        WHEN SUM(ep.duree_minutes) IS NOT NULL 
-                        THEN SUM(ep.duree_minutes) / 60.0
-                        ELSE 0
-                    END as total_heures,
-                    CASE 
-                        WHEN 20 > 0 
-                        THEN ROUND(COUNT(ep.id) * 100.0 / 20, 1)
-                        ELSE 0
-                    END as taux_occupation
-                FROM lieu_examen l
-                LEFT JOIN examens_planifies ep ON l.id = ep.salle_id AND ep.statut IN ('PROPOSE', 'VALIDE')
-                GROUP BY l.id, l.nom, l.type, l.capacite
-                ORDER BY l.type, taux_occupation DESC
-            """)
+                SELECT salle, type, capacite, nb_examens, total_heures, taux_occupation
+                FROM {mv_occupation_salles}
+                ORDER BY type, taux_occupation DESC
+            """.format(mv_occupation_salles=self.kpi_view('mv_occupation_salles')))
             
             if success:
                 data = self.cursor.fetchall()
@@ -714,31 +1135,14 @@ class ExamPlatform:
         return pd.DataFrame()
     
     def get_professor_workload(self):
-        """Charge de travail des professeurs"""
+        """Charge de travail des professeurs (vue matérialisée mv_charge_professeurs)"""
         try:
             success, error = self.safe_execute("""
-                SELECT 
-                    CONCAT(p.prenom, ' ', p.nom) as professeur,
-                    d.nom as departement,
-                    COUNT(ep.id) as nb_examens,
-                    CASE 
-                        WHEN SUM(ep.duree_minutes) IS NOT NULL 
-                        THEN SUM(ep.duree_minutes) / 60.0
-                        ELSE 0
-                    END as total_heures,
-                    CASE 
-                        WHEN COUNT(ep.id) > 0 
-                        THEN ROUND(AVG(ep.duree_minutes), 0)
-                        ELSE 0
-                    END as duree_moyenne_min
-                FROM professeurs p
-                JOIN examens_planifies ep ON p.id = ep.prof_id
-                JOIN departements d ON p.dept_id = d.id
-                WHERE ep.statut IN ('PROPOSE', 'VALIDE')
-                GROUP BY p.id, p.prenom, p.nom, d.nom
+                SELECT professeur, departement, nb_examens, total_heures, duree_moyenne_min
+                FROM {mv_charge_professeurs}
                 ORDER BY total_heures DESC
                 LIMIT 50
-            """)
+            """.format(mv_charge_professeurs=self.kpi_view('mv_charge_professeurs')))
             
             if success:
                 data = self.cursor.fetchall()
@@ -788,187 +1192,75 @@ class ExamPlatform:
     
     # ==================== FONCTIONS STRATÉGIQUES POUR VICE-DOYEN/DOYEN ====================
     
+    def get_missing_relations(self):
+        """Tables et vues des tableaux de bord non installées (vérifiées une fois par exécution)"""
+        if self.relations_absentes is None:
+            try:
+                self.relations_absentes = kpi.missing_relations(self.cursor)
+            except Exception:
+                self.relations_absentes = set(kpi.RELATIONS_KPI)
+        return self.relations_absentes
+    
+    def kpi_view(self, vue):
+        """Vue matérialisée des tableaux de bord, ou sa requête si 13_vues_kpi.sql n'est pas installé"""
+        return kpi.view_source(vue, self.get_missing_relations())
+    
     def get_kpi_academiques(self):
-        """Récupérer les KPIs académiques stratégiques"""
-        kpis = {}
-        
-        # 1. Taux de conflits
-        success, error = self.safe_execute("SELECT COUNT(*) FROM examens_planifies WHERE statut IN ('PROPOSE', 'VALIDE')")
-        if success:
-            total_examens = self.cursor.fetchone()[0]
-            if total_examens > 0:
+        """
+        KPIs académiques stratégiques (kpi.KpiAcademiques): en-tête et indicateurs
+        du tableau de bord Direction en une seule requête
+        """
+        try:
+            conflits = None
+            if 'conflits_actifs' in self.get_missing_relations():
+                # 10_conflits_actifs.sql non installé: conflits détectés sur l'instantané
                 conflits = self.count_conflicts()
-                kpis['taux_conflits'] = (conflits / total_examens) * 100 if conflits > 0 else 0
-            else:
-                kpis['taux_conflits'] = 0
-        
-        # 2. Heures totales de surveillance
-        success, error = self.safe_execute("""
-            SELECT SUM(duree_minutes)/60.0 FROM examens_planifies 
-            WHERE statut IN ('PROPOSE', 'VALIDE')
-        """)
-        if success:
-            total_heures = self.cursor.fetchone()[0]
-            kpis['total_heures_surveillance'] = total_heures or 0
-        
-        # 3. Taux d'utilisation des salles
-        success, error = self.safe_execute("SELECT COUNT(*) FROM lieu_examen")
-        if success:
-            total_salles = self.cursor.fetchone()[0]
-            if total_salles > 0:
-                success, error = self.safe_execute("""
-                    SELECT COUNT(DISTINCT salle_id) FROM examens_planifies 
-                    WHERE statut IN ('PROPOSE', 'VALIDE')
-                """)
-                if success:
-                    salles_utilisees = self.cursor.fetchone()[0]
-                    kpis['taux_salles_utilisees'] = (salles_utilisees / total_salles) * 100 if total_salles > 0 else 0
-        
-        # 4. Nombre de professeurs impliqués
-        success, error = self.safe_execute("""
-            SELECT COUNT(DISTINCT prof_id) FROM examens_planifies 
-            WHERE statut IN ('PROPOSE', 'VALIDE')
-        """)
-        if success:
-            profs_impliques = self.cursor.fetchone()[0]
-            kpis['profs_impliques'] = profs_impliques or 0
-        
-        # 5. Répartition amphis vs salles
-        success, error = self.safe_execute("""
-            SELECT 
-                SUM(CASE WHEN l.type = 'AMPHI' THEN 1 ELSE 0 END) as amphis,
-                SUM(CASE WHEN l.type = 'SALLE' THEN 1 ELSE 0 END) as salles
-            FROM lieu_examen l
-            JOIN examens_planifies ep ON l.id = ep.salle_id
-            WHERE ep.statut IN ('PROPOSE', 'VALIDE')
-        """)
-        if success:
-            repartition = self.cursor.fetchone()
-            if repartition:
-                kpis['examens_amphis'] = repartition[0] or 0
-                kpis['examens_salles'] = repartition[1] or 0
-            else:
-                kpis['examens_amphis'] = 0
-                kpis['examens_salles'] = 0
-        
-        # 6. Charge moyenne par professeur
-        if kpis.get('profs_impliques', 0) > 0 and kpis.get('total_heures_surveillance', 0) > 0:
-            kpis['charge_moyenne_par_prof'] = kpis['total_heures_surveillance'] / kpis['profs_impliques']
-        else:
-            kpis['charge_moyenne_par_prof'] = 0
-        
-        return kpis
+            return kpi.kpi_academiques(self.cursor, conflits)
+        except Exception as e:
+            st.error(f"Erreur KPIs: {e}")
+            return None
     
     def get_conflits_par_departement(self):
-        """Récupérer les conflits par département"""
+        """
+        Conflits par département, tous types (vue matérialisée mv_conflits_par_departement
+        sur conflits_actifs): un conflit compte pour le département de chacun de ses examens.
+        Sans conflits_actifs, calculés sur les conflits de l'instantané.
+        """
+        colonnes = ['Département', 'Examens en conflit', 'Nombre de conflits']
         try:
+            if 'conflits_actifs' in self.get_missing_relations():
+                instance = self.get_schedule_snapshot()['instance']
+                departements = self.get_departements_noms()
+                examens, paires = {}, {}
+                for c in self.get_conflicts():
+                    for examen, module_id in ((c.examen1, c.module1), (c.examen2, c.module2)):
+                        dept = instance.module_dept[instance.module_index[module_id]]
+                        examens.setdefault(dept, set()).add(examen)
+                        paires.setdefault(dept, set()).add((c.type, c.ressource, c.examen1, c.examen2))
+                lignes = sorted(((departements.get(dept), len(examens[dept]), len(paires[dept]))
+                                 for dept in examens), key=lambda ligne: -ligne[2])
+                return pd.DataFrame(lignes, columns=colonnes)
+            
             success, error = self.safe_execute("""
-                SELECT 
-                    d.nom as departement,
-                    COUNT(DISTINCT e1.id) as examens_en_conflit,
-                    COUNT(DISTINCT 
-                        CASE 
-                            WHEN e1.id < e2.id THEN e1.id 
-                            ELSE e2.id 
-                        END
-                    ) as nb_conflits
-                FROM examens_planifies e1
-                JOIN examens_planifies e2 ON e1.id != e2.id 
-                    AND e1.salle_id = e2.salle_id 
-                    AND e1.date_heure = e2.date_heure
-                JOIN modules m ON e1.module_id = m.id
-                JOIN formations f ON m.formation_id = f.id
-                JOIN departements d ON f.dept_id = d.id
-                WHERE e1.statut IN ('PROPOSE', 'VALIDE') 
-                    AND e2.statut IN ('PROPOSE', 'VALIDE')
-                GROUP BY d.nom
+                SELECT departement, examens_en_conflit, nb_conflits
+                FROM {mv_conflits_par_departement}
                 ORDER BY nb_conflits DESC
-            """)
+            """.format(mv_conflits_par_departement=self.kpi_view('mv_conflits_par_departement')))
             
             if success:
                 data = self.cursor.fetchall()
-                df = pd.DataFrame(data, 
-                                 columns=['Département', 'Examens en conflit', 'Nombre de conflits'])
-                # Conversion en numérique
-                df['Examens en conflit'] = pd.to_numeric(df['Examens en conflit'], errors='coerce')
-                df['Nombre de conflits'] = pd.to_numeric(df['Nombre de conflits'], errors='coerce')
-                return df
+                return pd.DataFrame(data, columns=colonnes)
         except Exception as e:
             st.error(f"Erreur conflits par département: {e}")
         return pd.DataFrame()
     
     def get_occupation_strategique(self):
-        """Occupation stratégique des ressources"""
-        stats = {}
-        
-        # Occupation par type de salle
-        success, error = self.safe_execute("""
-            SELECT 
-                l.type,
-                COUNT(ep.id) as nb_examens,
-                CASE 
-                    WHEN SUM(ep.duree_minutes) IS NOT NULL 
-                    THEN SUM(ep.duree_minutes)/60.0
-                    ELSE 0
-                END as heures_occupees,
-                COUNT(DISTINCT DATE(ep.date_heure)) as jours_occupes
-            FROM lieu_examen l
-            LEFT JOIN examens_planifies ep ON l.id = ep.salle_id AND ep.statut IN ('PROPOSE', 'VALIDE')
-            GROUP BY l.type
-            ORDER BY l.type
-        """)
-        
-        if success:
-            data = self.cursor.fetchall()
-            stats['occupation_par_type'] = pd.DataFrame(data, 
-                                                       columns=['Type', 'Examens', 'Heures', 'Jours occupés'])
-            # Conversion en numérique
-            if not stats['occupation_par_type'].empty:
-                stats['occupation_par_type']['Examens'] = pd.to_numeric(stats['occupation_par_type']['Examens'], errors='coerce')
-                stats['occupation_par_type']['Heures'] = pd.to_numeric(stats['occupation_par_type']['Heures'], errors='coerce')
-                stats['occupation_par_type']['Jours occupés'] = pd.to_numeric(stats['occupation_par_type']['Jours occupés'], errors='coerce')
-        
-        # Distribution des examens dans le temps
-        success, error = self.safe_execute("""
-            SELECT 
-                EXTRACT(HOUR FROM date_heure) as heure,
-                COUNT(*) as nb_examens
-            FROM examens_planifies
-            WHERE statut IN ('PROPOSE', 'VALIDE')
-            GROUP BY EXTRACT(HOUR FROM date_heure)
-            ORDER BY heure
-        """)
-        
-        if success:
-            data = self.cursor.fetchall()
-            stats['distribution_par_heure'] = pd.DataFrame(data, 
-                                                          columns=['Heure', 'Examens'])
-            # Conversion en numérique
-            if not stats['distribution_par_heure'].empty:
-                stats['distribution_par_heure']['Heure'] = pd.to_numeric(stats['distribution_par_heure']['Heure'], errors='coerce')
-                stats['distribution_par_heure']['Examens'] = pd.to_numeric(stats['distribution_par_heure']['Examens'], errors='coerce')
-        
-        # Taux de réussite de planification
-        success, error = self.safe_execute("""
-            SELECT 
-                mode_generation,
-                COUNT(*) as nb_examens,
-                AVG(duree_minutes) as duree_moyenne
-            FROM examens_planifies
-            WHERE statut IN ('PROPOSE', 'VALIDE')
-            GROUP BY mode_generation
-        """)
-        
-        if success:
-            data = self.cursor.fetchall()
-            stats['reussite_planification'] = pd.DataFrame(data, 
-                                                          columns=['Mode', 'Examens', 'Durée moyenne'])
-            # Conversion en numérique
-            if not stats['reussite_planification'].empty:
-                stats['reussite_planification']['Examens'] = pd.to_numeric(stats['reussite_planification']['Examens'], errors='coerce')
-                stats['reussite_planification']['Durée moyenne'] = pd.to_numeric(stats['reussite_planification']['Durée moyenne'], errors='coerce')
-        
-        return stats
+        """Occupation stratégique des ressources (kpi.OccupationStrategique), en une requête"""
+        try:
+            return kpi.occupation_strategique(self.cursor, self.get_missing_relations())
+        except Exception as e:
+            st.error(f"Erreur occupation: {e}")
+            return None
 
 # ==================== INTERFACE STREAMLIT COMPLÈTE ====================
 
@@ -1180,9 +1472,27 @@ def show_professeur_dashboard(platform):
     else:
         st.error("Erreur lors de la récupération des professeurs.")
 
+def show_kpi_freshness(platform):
+    """Date du dernier rafraîchissement des indicateurs, avec rafraîchissement à la demande"""
+    col_date, col_bouton = st.columns([4, 1])
+    with col_date:
+        if 'kpi_fraicheur' in platform.get_missing_relations():
+            st.caption("Indicateurs calculés à chaque affichage (vues de 13_vues_kpi.sql non installées)")
+        else:
+            rafraichi_le = platform.get_kpi_freshness()
+            if rafraichi_le:
+                st.caption(f"Indicateurs calculés le {rafraichi_le:%d/%m/%Y à %H:%M:%S}")
+            else:
+                st.caption("Indicateurs jamais calculés")
+    with col_bouton:
+        if st.button("Rafraîchir les indicateurs", use_container_width=True):
+            platform.refresh_kpi_views()
+            st.rerun()
+
 def show_chef_departement_dashboard(platform):
     """Dashboard pour chef de département"""
     st.title("Tableau de bord Chef de Département")
+    show_kpi_freshness(platform)
     st.markdown("---")
     
     departments = platform.get_departments()
@@ -1275,15 +1585,12 @@ def show_chef_departement_dashboard(platform):
         
         with col2:
             success, error = platform.safe_execute("""
-                SELECT DATE(ep.date_heure) as jour, COUNT(*) as examens
-                FROM examens_planifies ep
-                JOIN modules m ON ep.module_id = m.id
-                JOIN formations f ON m.formation_id = f.id
-                JOIN departements d ON f.dept_id = d.id
-                WHERE d.nom = %s AND ep.statut IN ('PROPOSE', 'VALIDE')
-                GROUP BY DATE(ep.date_heure)
+                SELECT jour, nb_examens
+                FROM {mv_examens_par_jour}
+                JOIN departements d ON dept_id = d.id
+                WHERE d.nom = %s
                 ORDER BY jour
-            """, (selected_dept,))
+            """.format(mv_examens_par_jour=platform.kpi_view('mv_examens_par_jour')), (selected_dept,))
             
             if success:
                 daily_data = platform.cursor.fetchall()
@@ -1364,8 +1671,24 @@ def show_administrateur_dashboard(platform):
         col1, col2 = st.columns(2)
         
         with col1:
-            nb_examens = st.slider("Nombre d'examens", 10, 200, 30)
+            tous_les_modules = st.checkbox("Planifier tous les modules sans examen", value=False)
+            nb_examens = st.slider("Nombre d'examens", 10, 200, 30, disabled=tous_les_modules)
+            if tous_les_modules:
+                nb_examens = None
             duree_moyenne = st.select_slider("Durée (minutes)", [60, 90, 120, 150, 180], value=120)
+            nb_departs = st.slider(
+                "Départs parallèles", 1, 16, 1,
+                help="Constructions indépendantes lancées sur plusieurs processus, la meilleure est gardée"
+            )
+            par_departement = st.checkbox(
+                "Décomposer par département", value=False,
+                help="Un processus par département, puis réconciliation des salles et professeurs partagés"
+            )
+            budget_generation = st.slider(
+                "Budget de temps (secondes)", 0, 120, 0,
+                help="0: une seule construction. Sinon, recherche anytime jusqu'au budget "
+                     "avec la meilleure solution toujours disponible"
+            )
             
             st.session_state.reset_before_generate = st.checkbox(
                 "Réinitialiser avant de générer", value=True
@@ -1373,11 +1696,12 @@ def show_administrateur_dashboard(platform):
             
             st.markdown("---")
             st.info("""
-            **Mode de génération simplifiée :**
-            - Tente plusieurs méthodes d'insertion
-            - Gère automatiquement les contraintes
-            - Utilise autocommit=True
-            - Gère les erreurs une par une
+            **Génération par graphe de conflits :**
+            - Deux modules partageant un étudiant sont reliés
+            - Les jours sont attribués par coloration DSatur
+            - Plus petite salle adaptée, professeur du département le moins chargé
+            - Aucun conflit étudiant (1 examen par jour)
+            - Départs parallèles: meilleure de plusieurs constructions
             """)
         
         with col2:
@@ -1392,9 +1716,24 @@ def show_administrateur_dashboard(platform):
             else:
                 st.success("Aucun conflit")
             
-            estimated_time = nb_examens * 0.2
+            estimated_time = (nb_examens or 1600) * 0.01
             st.info(f"Temps estimé: {estimated_time:.1f}s")
             
+            # Bornes inférieures: clique du graphe de conflits, capacité, professeurs
+            # (calculées à la demande, puis gardées en cache jusqu'à la prochaine écriture)
+            if st.toggle("Bornes inférieures de la session", value=False):
+                bornes_session = platform.get_schedule_bounds(nb_examens, duree_moyenne)
+                col_b1, col_b2 = st.columns(2)
+                col_b1.metric("Jours minimum (borne)", bornes_session['jours_min'],
+                              help=f"Clique de conflits: {bornes_session['jours_clique']} modules, "
+                                   f"capacité: {bornes_session['jours_capacite']} jours, "
+                                   f"professeurs: {bornes_session['jours_professeurs']} jours")
+                col_b2.metric("Jours de session", bornes_session['nb_jours'])
+                if not bornes_session['realisable']:
+                    st.warning(f"Session infaisable: au moins {bornes_session['jours_min']} jours nécessaires"
+                               + (f", {len(bornes_session['modules_trop_grands'])} module(s) plus grand(s) "
+                                  "que toutes les salles réunies" if bornes_session['modules_trop_grands'] else ""))
+            
             st.markdown("---")
             if st.button("Test génération (5 examens)"):
                 with st.spinner("Test en cours..."):
@@ -1413,42 +1752,97 @@ def show_administrateur_dashboard(platform):
                         st.error(message)
         
         st.markdown("---")
+        resultat_generation = None
+        
+        # Arrêt anticipé: le clic interrompt la génération en cours (nouvelle exécution du script)
+        # et la meilleure solution gardée en session est enregistrée. Même clé dans les deux
+        # exécutions: le bouton affiché pendant la génération est celui lu à l'exécution suivante.
+        zone_arret = st.empty()
+        
+        def bouton_arret():
+            return zone_arret.button("ARRÊTER ET ENREGISTRER LA MEILLEURE SOLUTION",
+                                     key='arreter_generation', use_container_width=True)
+        
+        arret_affiche = 'generation_en_cours' in st.session_state
+        if arret_affiche and bouton_arret():
+            resultat_generation = platform.save_pending_generation()
+            arret_affiche = False
+        
         if st.button("GÉNÉRER L'EMPLOI DU TEMPS", type="primary", use_container_width=True):
-            with st.spinner("Génération en cours..."):
-                if st.session_state.reset_before_generate:
-                    platform.reset_all_exams()
-                
-                succes, message, temps_exec, details = platform.generate_simple_timetable(
+            if budget_generation > 0:
+                # Réinitialisation différée à l'enregistrement de la solution
+                generation = platform.start_anytime_generation(
                     nb_examens=nb_examens,
-                    duree_minutes=duree_moyenne
+                    duree_minutes=duree_moyenne,
+                    reinitialiser=st.session_state.reset_before_generate
                 )
-                
-                if succes:
-                    st.success(f"{message}")
-                    st.metric("Temps d'exécution", f"{temps_exec}s")
-                    
-                    if temps_exec <= 45:
-                        st.balloons()
-                        st.success("OBJECTIF ATTEINT: < 45 secondes!")
-                    
-                    with st.expander("Détails de la génération"):
-                        col_a, col_b, col_c = st.columns(3)
-                        with col_a:
-                            st.metric("Examens créés", details.get('examens_planifies', 0))
-                        with col_b:
-                            st.metric("Échecs", details.get('echecs', 0))
-                        with col_c:
-                            taux = details.get('taux_reussite', 0)
-                            st.metric("Taux réussite", f"{taux:.1f}%")
-                    
-                    st.rerun()
+                if generation is None:
+                    resultat_generation = (False, "Aucun module disponible", 0, {})
                 else:
-                    st.error(f"{message}")
+                    if not arret_affiche:
+                        bouton_arret()
+                    barre = st.progress(0.0, text="Recherche en cours...")
+                    col_p1, col_p2, col_p3, col_p4 = st.columns(4)
+                    zone_iterations, zone_non_places = col_p1.empty(), col_p2.empty()
+                    zone_violations, zone_charge = col_p3.empty(), col_p4.empty()
+                    
+                    for progression in platform.generate_anytime(generation, budget_secondes=budget_generation):
+                        barre.progress(min(progression['ecoule'] / budget_generation, 1.0),
+                                       text=f"Recherche en cours... {progression['ecoule']:.0f}s / {budget_generation}s")
+                        zone_iterations.metric("Tentatives", progression['iteration'])
+                        zone_non_places.metric("Modules non placés", progression['non_places'])
+                        zone_violations.metric("Conflits", progression['violations'])
+                        zone_charge.metric("Écart type charge", f"{progression['ecart_type_charge']:.2f}")
+                        if progression['borne_atteinte']:
+                            barre.progress(1.0, text="Borne inférieure atteinte: solution optimale")
                     
-                    if 'echecs_details' in details and details['echecs_details']:
-                        with st.expander("Voir les erreurs détaillées"):
-                            for err in details['echecs_details']:
-                                st.write(f"- {err}")
+                    zone_arret.empty()
+                    resultat_generation = platform.save_pending_generation()
+            else:
+                if st.session_state.reset_before_generate:
+                    platform.reset_all_exams()
+                with st.spinner("Génération en cours..."):
+                    resultat_generation = platform.generate_simple_timetable(
+                        nb_examens=nb_examens,
+                        duree_minutes=duree_moyenne,
+                        nb_departs=nb_departs,
+                        par_departement=par_departement
+                    )
+        
+        if resultat_generation is not None:
+            succes, message, temps_exec, details = resultat_generation
+            
+            if succes:
+                st.success(f"{message}")
+                st.metric("Temps d'exécution", f"{temps_exec}s")
+                
+                if temps_exec <= 45:
+                    st.balloons()
+                    st.success("OBJECTIF ATTEINT: < 45 secondes!")
+                
+                with st.expander("Détails de la génération"):
+                    col_a, col_b, col_c, col_d = st.columns(4)
+                    with col_a:
+                        st.metric("Examens créés", details.get('examens_planifies', 0))
+                    with col_b:
+                        st.metric("Échecs", details.get('echecs', 0))
+                    with col_c:
+                        taux = details.get('taux_reussite', 0)
+                        st.metric("Taux réussite", f"{taux:.1f}%")
+                    with col_d:
+                        if details.get('ecart_jours') is not None:
+                            st.metric("Jours utilisés", details['jours_utilises'],
+                                      delta=f"+{details['ecart_jours']} / borne {details['jours_min']}",
+                                      delta_color="off")
+                
+                st.rerun()
+            else:
+                st.error(f"{message}")
+                
+                if 'echecs_details' in details and details['echecs_details']:
+                    with st.expander("Voir les erreurs détaillées"):
+                        for err in details['echecs_details']:
+                            st.write(f"- {err}")
     
     with tab2:
         st.subheader("Ajout Manuel d'Examen")
@@ -1460,6 +1854,8 @@ def show_administrateur_dashboard(platform):
         if not modules:
             st.error("Tous les modules ont déjà un examen planifié!")
         else:
+            # Formulaire: les choix ne relancent pas la page; la vérification en mémoire
+            # (precheck) porte sur les valeurs envoyées par Vérifier ou Ajouter
             with st.form("form_ajout_manuel"):
                 col1, col2 = st.columns(2)
                 
@@ -1495,9 +1891,40 @@ def show_administrateur_dashboard(platform):
                     st.write(f"**Date/Heure :** {date_heure}")
                     st.write(f"**Durée :** {duree_minutes} minutes")
                 
-                submitted = st.form_submit_button("AJOUTER L'EXAMEN", type="primary", use_container_width=True)
+                col_verifier, col_ajouter = st.columns(2)
+                with col_verifier:
+                    verifier = st.form_submit_button("VÉRIFIER LES CONTRAINTES", use_container_width=True)
+                with col_ajouter:
+                    submitted = st.form_submit_button("AJOUTER L'EXAMEN", type="primary", use_container_width=True)
+            
+            if verifier or submitted:
+                # Vérification en mémoire des contraintes pour les valeurs envoyées
+                violations, suggestions = platform.precheck(
+                    module_id, prof_id, salle_id,
+                    datetime.strptime(date_heure, '%Y-%m-%d %H:%M:%S'), duree_minutes
+                )
+                bloquant = any(v['bloquant'] for v in violations)
+                if not violations:
+                    st.success("Toutes les contraintes sont respectées")
+                for v in violations:
+                    if v['bloquant']:
+                        st.error(v['message'])
+                    else:
+                        st.warning(v['message'])
+                
+                if suggestions['salles'] or suggestions['creneaux']:
+                    noms_salles = {s[0]: s[1] for s in salles}
+                    col_s1, col_s2 = st.columns(2)
+                    with col_s1:
+                        st.write("**Salles libres à ce créneau :**")
+                        for s_id in suggestions['salles']:
+                            st.write(f"- {noms_salles.get(s_id, s_id)}")
+                    with col_s2:
+                        st.write("**Créneaux faisables les plus proches :**")
+                        for creneau, s_id in suggestions['creneaux']:
+                            st.write(f"- {creneau:%Y-%m-%d %H:%M} ({noms_salles.get(s_id, s_id)})")
                 
-                if submitted:
+                if submitted and not bloquant:
                     with st.spinner("Ajout en cours..."):
                         success, message = platform.add_manual_exam(
                             module_id=module_id,
@@ -1603,9 +2030,21 @@ def show_administrateur_dashboard(platform):
         
         st.markdown("---")
         
+        col_mode, col_budget = st.columns(2)
+        with col_mode:
+            mode_optim = st.selectbox(
+                "Mode d'optimisation", ["RECUIT", "RAPIDE"],
+                format_func=lambda m: {"RECUIT": "Recuit simulé (en mémoire)",
+                                       "RAPIDE": "Rapide (décalage de 2 jours)"}[m]
+            )
+        with col_budget:
+            budget_optim = st.slider("Budget de temps (secondes)", 2, 60, 10,
+                                     disabled=mode_optim != "RECUIT")
+        
         if st.button("Lancer l'optimisation", use_container_width=True):
             with st.spinner("Optimisation en cours..."):
-                succes, message, temps_exec = platform.optimize_timetable(mode='RAPIDE')
+                succes, message, temps_exec = platform.optimize_timetable(mode=mode_optim,
+                                                                          budget_secondes=budget_optim)
                 
                 if succes:
                     st.success(message)
@@ -1613,6 +2052,40 @@ def show_administrateur_dashboard(platform):
                     st.rerun()
                 else:
                     st.error(message)
+        
+        st.markdown("---")
+        st.subheader("Réparation locale")
+        st.caption("Après un déplacement manuel ou une salle indisponible: seuls les examens "
+                   "touchés (mêmes étudiants, même salle, même surveillant) sont déplacés.")
+        
+        examens_df = platform.get_generated_timetable(limit=5000)
+        salles_liste = platform.get_all_salles()
+        
+        col_rep1, col_rep2 = st.columns(2)
+        with col_rep1:
+            examens_modifies = st.multiselect(
+                "Examens modifiés (restent en place)",
+                examens_df['examen_id'].tolist() if not examens_df.empty else [],
+                format_func=lambda e: "#{} {} ({})".format(
+                    e, *examens_df.loc[examens_df['examen_id'] == e, ['module', 'date_heure']].iloc[0]
+                )
+            )
+        with col_rep2:
+            salles_indisponibles = st.multiselect(
+                "Salles indisponibles",
+                [salle[0] for salle in salles_liste],
+                format_func=lambda r: next(f"{s[1]} ({s[2]}, {s[3]} places)" for s in salles_liste if s[0] == r)
+            )
+        
+        if st.button("Réparer le voisinage", use_container_width=True,
+                     disabled=not examens_modifies and not salles_indisponibles):
+            with st.spinner("Réparation en cours..."):
+                succes, message, temps_exec = platform.repair_timetable(examens_modifies, salles_indisponibles)
+                
+                if succes:
+                    st.success(message)
+                else:
+                    st.error(message)
     
     with tab5:
         st.subheader("Visualisations Avancées")
@@ -1710,41 +2183,32 @@ def show_administrateur_dashboard(platform):
 def show_doyen_dashboard(platform):
     """Dashboard vice-doyen/doyen - Vue stratégique globale"""
     st.title("Tableau de bord Direction - Vue Stratégique")
+    show_kpi_freshness(platform)
     st.markdown("---")
     
-    # KPIs Principaux en haut
-    col1, col2, col3, col4, col5 = st.columns(5)
+    # KPIs Principaux en haut (en-tête et onglet KPIs: une seule requête)
+    kpis = platform.get_kpi_academiques()
     
-    with col1:
-        success, error = platform.safe_execute("SELECT COUNT(*) FROM examens_planifies WHERE statut IN ('PROPOSE', 'VALIDE')")
-        if success:
-            total_examens = platform.cursor.fetchone()[0]
-            st.metric("Examens planifiés", total_examens)
-    
-    with col2:
-        conflits = platform.count_conflicts()
-        if conflits > 0:
-            st.error(f"Conflits: {conflits}")
-        else:
-            st.success("Conflits: 0")
-    
-    with col3:
-        success, error = platform.safe_execute("SELECT COUNT(*) FROM etudiants")
-        if success:
-            total_etudiants = platform.cursor.fetchone()[0]
-            st.metric("Étudiants", total_etudiants)
-    
-    with col4:
-        success, error = platform.safe_execute("SELECT COUNT(*) FROM professeurs")
-        if success:
-            total_profs = platform.cursor.fetchone()[0]
-            st.metric("Professeurs", total_profs)
+    col1, col2, col3, col4, col5 = st.columns(5)
     
-    with col5:
-        success, error = platform.safe_execute("SELECT COUNT(*) FROM lieu_examen")
-        if success:
-            total_salles = platform.cursor.fetchone()[0]
-            st.metric("Salles", total_salles)
+    if kpis is not None:
+        with col1:
+            st.metric("Examens planifiés", kpis.total_examens)
+        
+        with col2:
+            if kpis.conflits > 0:
+                st.error(f"Conflits: {kpis.conflits}")
+            else:
+                st.success("Conflits: 0")
+        
+        with col3:
+            st.metric("Étudiants", kpis.total_etudiants)
+        
+        with col4:
+            st.metric("Professeurs", kpis.total_profs)
+        
+        with col5:
+            st.metric("Salles", kpis.total_salles)
     
     st.markdown("---")
     
@@ -1755,28 +2219,25 @@ def show_doyen_dashboard(platform):
     with tab1:
         st.subheader("Indicateurs Clés de Performance Académiques")
         
-        # Récupérer les KPIs
-        kpis = platform.get_kpi_academiques()
-        
         col_kpi1, col_kpi2, col_kpi3, col_kpi4 = st.columns(4)
         
         with col_kpi1:
-            if 'taux_conflits' in kpis:
-                st.metric("Taux de conflits", f"{kpis['taux_conflits']:.1f}%")
+            if kpis is not None:
+                st.metric("Taux de conflits", f"{kpis.taux_conflits:.1f}%")
             else:
                 st.metric("Taux de conflits", "N/A")
         
         with col_kpi2:
-            if 'total_heures_surveillance' in kpis:
-                st.metric("Heures surveillance", f"{kpis['total_heures_surveillance']:.0f}h")
+            if kpis is not None:
+                st.metric("Heures surveillance", f"{kpis.total_heures_surveillance:.0f}h")
         
         with col_kpi3:
-            if 'taux_salles_utilisees' in kpis:
-                st.metric("Salles utilisées", f"{kpis['taux_salles_utilisees']:.1f}%")
+            if kpis is not None:
+                st.metric("Salles utilisées", f"{kpis.taux_salles_utilisees:.1f}%")
         
         with col_kpi4:
-            if 'charge_moyenne_par_prof' in kpis:
-                st.metric("Charge moyenne/prof", f"{kpis['charge_moyenne_par_prof']:.1f}h")
+            if kpis is not None:
+                st.metric("Charge moyenne/prof", f"{kpis.charge_moyenne_par_prof:.1f}h")
         
         st.markdown("---")
         
@@ -1785,28 +2246,31 @@ def show_doyen_dashboard(platform):
         
         with col_viz1:
             # Répartition amphis vs salles
-            if 'examens_amphis' in kpis and 'examens_salles' in kpis:
+            if kpis is not None:
                 fig = go.Figure(data=[go.Pie(
                     labels=['Amphithéâtres', 'Salles'],
-                    values=[kpis['examens_amphis'], kpis['examens_salles']],
+                    values=[kpis.examens_amphis, kpis.examens_salles],
                     hole=0.3,
                     marker=dict(colors=['#FF6B6B', '#4ECDC4'])
                 )])
                 fig.update_layout(title="Répartition examens par type de salle")
                 st.plotly_chart(fig, use_container_width=True)
         
+        # Examens par jour et par département (tous les examens actifs, une requête)
+        stats = platform.get_timetable_statistics()
+        
         with col_viz2:
-            # Diagramme de Gantt simplifié
-            exams_df = platform.get_all_exams_for_visualizations(limit=100)
-            if not exams_df.empty:
-                exams_df['Date'] = pd.to_datetime(exams_df['date_heure']).dt.date
-                daily_counts = exams_df.groupby('Date').size().reset_index(name='Examens')
-                
-                fig = px.line(daily_counts, x='Date', y='Examens',
+            if stats is not None and not stats.examens_par_jour.empty:
+                fig = px.line(stats.examens_par_jour, x='Date', y='Examens',
                              title="Densité des examens dans le temps",
                              markers=True)
                 fig.update_traces(line=dict(width=3))
                 st.plotly_chart(fig, use_container_width=True)
+        
+        if stats is not None and not stats.repartition_par_departement.empty:
+            fig = px.bar(stats.repartition_par_departement, x='Département', y='Examens',
+                        title=f"Répartition des {stats.total_examens} examens par département")
+            st.plotly_chart(fig, use_container_width=True)
     
     with tab2:
         st.subheader("Vue Stratégique de l'Occupation")
@@ -1865,6 +2329,26 @@ def show_doyen_dashboard(platform):
                              title="Répartition des examens par type de salle",
                              hole=0.3)
                 st.plotly_chart(fig3, use_container_width=True)
+        
+        # Distribution par heure de début et par mode de génération
+        occupation = platform.get_occupation_strategique()
+        if occupation is not None:
+            col_occ6, col_occ7 = st.columns(2)
+            
+            with col_occ6:
+                if not occupation.distribution_par_heure.empty:
+                    fig4 = px.bar(occupation.distribution_par_heure, x='Heure', y='Examens',
+                                 title="Examens par heure de début")
+                    st.plotly_chart(fig4, use_container_width=True)
+            
+            with col_occ7:
+                if not occupation.reussite_planification.empty:
+                    fig5 = px.bar(occupation.reussite_planification, x='Mode', y='Examens',
+                                 title="Examens par mode de génération",
+                                 hover_data=['Durée moyenne'])
+                    st.plotly_chart(fig5, use_container_width=True)
+            
+            st.dataframe(occupation.occupation_par_type, use_container_width=True)
     
     with tab3:
         st.subheader("Analyse des Conflits par Département")
@@ -2044,9 +2528,11 @@ def show_doyen_dashboard(platform):
                         """)
                         
                         if success:
+                            platform.refresh_kpi_views()
                             st.success("Tous les examens ont été marqués comme validés.")
                     else:
-                        st.error("Impossible de valider : des conflits sont encore présents.")
+                        # Seuls les conflits de salle bloquent (voir count_conflicts)
+                        st.error("Impossible de valider : des conflits de salle sont encore présents.")
 
 def main():
     """Fonction principale"""
@@ -2057,6 +2543,14 @@ def main():
         st.error("Connexion base de données échouée")
         st.stop()
     
+    # Connexion empruntée pour cette exécution seulement, rendue même après st.rerun/st.stop
+    try:
+        show_pages(platform)
+    finally:
+        platform.close()
+
+def show_pages(platform):
+    """Page de connexion ou tableau de bord du rôle connecté"""
     if 'role' not in st.session_state:
         st.session_state['role'] = None
     
@@ -2078,6 +2572,11 @@ def main():
                     st.error(f"{conflits} conflit(s)")
                 else:
                     st.success("Aucun conflit")
+                # Paires en conflit par type (professeur et étudiant: informatif, non bloquant)
+                par_type = platform.count_conflicts_by_type()
+                if any(par_type.values()):
+                    st.caption(f"Paires en conflit: {par_type['salle']} salle, "
+                               f"{par_type['professeur']} professeur, {par_type['etudiant']} étudiant")
             
             st.markdown("---")
             if st.button("Déconnexion", use_container_width=True):
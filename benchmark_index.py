@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Mesure avec/sans index des requêtes des tableaux de bord (kpi.py), des requêtes
+des vues matérialisées (13_vues_kpi.sql, exécutées à chaque rafraîchissement) et des
+vérifications des triggers, pour les index partiels de 12_index_actifs.sql.
+Session en lecture seule: la mesure "sans index" désactive les parcours d'index
+(SET LOCAL enable_indexscan, enable_indexonlyscan, enable_bitmapscan) dans une
+transaction annulée; aucun index n'est supprimé ni aucun verrou pris.
+Connexion: variables PGHOST, PGPORT, PGUSER, PGPASSWORD, PGDATABASE, comme
+05_deployment_setup.sh et app.py
+"""
+
+import argparse
+import statistics
+import time
+
+import psycopg2
+
+import kpi
+
+INDEX_ACTIFS = [
+    'idx_examens_actifs_salle_date',
+    'idx_examens_actifs_prof_jour',
+    'idx_examens_actifs_module',
+    'idx_examens_actifs_date',
+]
+
+SANS_INDEX = """
+    SET LOCAL enable_indexscan = off;
+    SET LOCAL enable_indexonlyscan = off;
+    SET LOCAL enable_bitmapscan = off;
+"""
+
+# Vérifications par examen des triggers (02, 07, 08); %(salle)s, %(prof)s, %(module)s
+# et %(jour)s sont pris sur un examen actif
+REQUETES_TRIGGERS = [
+    ('Occupation d\'une salle', """
+        SELECT date_heure, duree_minutes
+        FROM examens_planifies
+        WHERE salle_id = %(salle)s
+        AND statut IN ('PROPOSE', 'VALIDE')
+        AND date_heure >= %(jour)s::date AND date_heure < %(jour)s::date + 1
+    """),
+    ('Examens d\'un professeur ce jour', """
+        SELECT COUNT(*)
+        FROM examens_planifies
+        WHERE prof_id = %(prof)s
+        AND DATE(date_heure) = %(jour)s::date
+        AND statut IN ('PROPOSE', 'VALIDE')
+    """),
+    ('Examen d\'un module', """
+        SELECT id, date_heure
+        FROM examens_planifies
+        WHERE module_id = %(module)s
+        AND statut IN ('PROPOSE', 'VALIDE')
+    """),
+]
+
+
+def requetes(absentes):
+    """
+    (nom, exécution(cursor, params)) des requêtes mesurées. Les vues matérialisées
+    sont mesurées par leur requête de définition (ce que coûte REFRESH), pas par
+    leur lecture, qui ne dépend pas des index de examens_planifies.
+    """
+    # Sans conflits_actifs (10_conflits_actifs.sql), le nombre de conflits n'est pas relu
+    conflits = 0 if 'conflits_actifs' in absentes else None
+    mesurees = [
+        ('KPIs académiques', lambda cursor, params: kpi.kpi_academiques(cursor, conflits)),
+        ('Occupation stratégique', lambda cursor, params: kpi.occupation_strategique(cursor, absentes)),
+        ('Statistiques emploi du temps', lambda cursor, params: kpi.timetable_statistics(cursor)),
+    ]
+    for vue, definition in kpi.REQUETES_VUES_KPI.items():
+        if vue == 'mv_conflits_par_departement' and 'conflits_actifs' in absentes:
+            continue
+        mesurees.append((f"Vue {vue}", lambda cursor, params, sql=definition: lire(cursor, sql)))
+    for nom, sql in REQUETES_TRIGGERS:
+        mesurees.append((nom, lambda cursor, params, sql=sql: lire(cursor, sql, params)))
+    return mesurees
+
+
+def lire(cursor, sql, params=None):
+    cursor.execute(sql, params)
+    return cursor.fetchall()
+
+
+def parametres(cursor):
+    """Salle, professeur, module et jour d'un examen actif"""
+    cursor.execute("""
+        SELECT salle_id, prof_id, module_id, DATE(date_heure)
+        FROM examens_planifies
+        WHERE statut IN ('PROPOSE', 'VALIDE')
+        ORDER BY date_heure
+        LIMIT 1
+    """)
+    ligne = cursor.fetchone()
+    if ligne is None:
+        return None
+    return {'salle': ligne[0], 'prof': ligne[1], 'module': ligne[2], 'jour': ligne[3]}
+
+
+def mesurer(conn, execution, params, repetitions, sans_index):
+    """Temps médian (ms) d'une requête, après une exécution d'échauffement"""
+    mesures = []
+    with conn.cursor() as cursor:
+        for i in range(repetitions + 1):
+            if sans_index:
+                cursor.execute(SANS_INDEX)
+            debut = time.perf_counter()
+            execution(cursor, params)
+            if i:
+                mesures.append((time.perf_counter() - debut) * 1000)
+            # Fin de transaction: les SET LOCAL ne valent que pour cette mesure
+            conn.rollback()
+    return statistics.median(mesures)
+
+
+def index_utilises(conn, params):
+    """Index partiels présents dans le plan de chaque requête des triggers"""
+    utilises = {}
+    with conn.cursor() as cursor:
+        for nom, sql in REQUETES_TRIGGERS:
+            cursor.execute("EXPLAIN " + sql, params)
+            plan = "\n".join(ligne[0] for ligne in cursor.fetchall())
+            utilises[nom] = [index for index in INDEX_ACTIFS if index in plan]
+    conn.rollback()
+    return utilises
+
+
+def benchmark(repetitions=20):
+    conn = psycopg2.connect("")
+    # Lecture seule: la mesure ne peut ni modifier ni verrouiller la base
+    conn.set_session(readonly=True)
+    cursor = conn.cursor()
+
+    print("⏱️  BENCHMARK DES INDEX PARTIELS (examens actifs)")
+    print("=" * 60)
+
+    params = parametres(cursor)
+    if params is None:
+        print("❌ Aucun examen actif: générer un emploi du temps avant la mesure")
+        conn.close()
+        return
+
+    cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename = 'examens_planifies'")
+    presents = {ligne[0] for ligne in cursor.fetchall()}
+    manquants = [index for index in INDEX_ACTIFS if index not in presents]
+    if manquants:
+        print(f"❌ Index absents ({', '.join(manquants)}): exécuter 12_index_actifs.sql")
+        conn.close()
+        return
+
+    absentes = kpi.missing_relations(cursor)
+    conn.rollback()
+
+    print(f"{'Requête':<40} {'Sans index (ms)':>15} {'Avec (ms)':>10} {'Gain':>7}")
+    print("-" * 76)
+    utilises = index_utilises(conn, params)
+    total_sans, total_avec = 0.0, 0.0
+    for nom, execution in requetes(absentes):
+        sans = mesurer(conn, execution, params, repetitions, sans_index=True)
+        avec = mesurer(conn, execution, params, repetitions, sans_index=False)
+        total_sans, total_avec = total_sans + sans, total_avec + avec
+        print(f"{nom:<40} {sans:>15.2f} {avec:>10.2f} {sans / avec if avec > 0 else 0:>6.1f}x")
+        if utilises.get(nom):
+            print(f"{'':<4}↳ {', '.join(utilises[nom])}")
+    print("-" * 76)
+    print(f"{'Total':<40} {total_sans:>15.2f} {total_avec:>10.2f} "
+          f"{total_sans / total_avec if total_avec > 0 else 0:>6.1f}x")
+    conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repetitions', type=int, default=20, help="exécutions mesurées par requête")
+    args = parser.parse_args()
+    benchmark(args.repetitions)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Bornes inférieures de la planification
+Clique maximale du graphe de conflits (modules partageant des étudiants)
+et capacité des salles par créneau
+"""
+
+import math
+import time
+
+import numpy as np
+
+from scheduler import MAX_EXAMENS_PAR_JOUR_PROF, places_utiles
+
+
+# ==================== CLIQUE MAXIMALE ====================
+
+def max_clique(voisins, limite_secondes=2.0):
+    """
+    Clique maximale du graphe de conflits (séparation et évaluation, borne par
+    coloration gloutonne). Au-delà de limite_secondes, retourne la meilleure clique
+    trouvée: elle reste une borne inférieure valide, seulement moins serrée.
+    """
+    n = len(voisins)
+    adjacence = [set(v) for v in voisins]
+    debut = time.time()
+    meilleure = []
+
+    def colorer(candidats):
+        """Ordre des candidats et borne (nombre de couleurs) de chacun"""
+        ordre, bornes = [], []
+        restants = sorted(candidats, key=lambda v: -len(adjacence[v]))
+        couleur = 0
+        while restants:
+            couleur += 1
+            classe, suivants = [], []
+            for v in restants:
+                if any(v in adjacence[u] for u in classe):
+                    suivants.append(v)
+                else:
+                    classe.append(v)
+            ordre += classe
+            bornes += [couleur] * len(classe)
+            restants = suivants
+        return ordre, bornes
+
+    def etendre(clique, candidats):
+        nonlocal meilleure
+        if len(clique) > len(meilleure):
+            meilleure = clique
+        if time.time() - debut > limite_secondes:
+            return
+        ordre, bornes = colorer(candidats)
+        for i in range(len(ordre) - 1, -1, -1):
+            if len(clique) + bornes[i] <= len(meilleure):
+                return
+            v = ordre[i]
+            etendre(clique + [v], [u for u in ordre[:i] if u in adjacence[v]])
+
+    # Sommets par degré décroissant: une bonne clique tôt élague davantage
+    for v in sorted(range(n), key=lambda v: -len(adjacence[v])):
+        if time.time() - debut > limite_secondes:
+            break
+        if len(adjacence[v]) + 1 <= len(meilleure):
+            continue
+        etendre([v], [u for u in adjacence[v] if len(adjacence[u]) + 1 > len(meilleure)])
+        # Le sommet traité n'apporte plus de nouvelle clique
+        for u in adjacence[v]:
+            adjacence[u].discard(v)
+        adjacence[v] = set()
+
+    return sorted(meilleure)
+
+
+# ==================== BORNES DE LA SESSION ====================
+
+def lower_bounds(instance, limite_secondes=2.0):
+    """
+    Bornes inférieures du nombre de jours de session:
+    - clique: modules deux à deux en conflit, donc sur des jours distincts
+    - capacité: places utilisables par créneau x créneaux par jour
+    - professeurs: 3 examens par jour et par professeur
+    et de l'écart type des charges de surveillance (charges aussi égales que possible).
+    """
+    clique = max_clique(instance.voisins, limite_secondes)
+    places_creneau = int(places_utiles(instance.salle_types, instance.salle_capacites).sum())
+    demande = int(instance.effectifs.sum())
+    nb_examens = instance.nb_modules
+    nb_profs = len(instance.prof_ids)
+
+    jours_capacite = math.ceil(demande / max(places_creneau * instance.nb_heures, 1))
+    jours_professeurs = math.ceil(nb_examens / max(nb_profs * MAX_EXAMENS_PAR_JOUR_PROF, 1))
+    jours_min = max(len(clique), jours_capacite, jours_professeurs)
+
+    # Module plus grand que toutes les salles d'un créneau réunies
+    trop_grands = np.flatnonzero(instance.effectifs > places_creneau).tolist()
+
+    # Écart type minimal: charges q ou q+1
+    if nb_profs:
+        q, r = divmod(nb_examens, nb_profs)
+        moyenne = nb_examens / nb_profs
+        variance = (r * (q + 1 - moyenne) ** 2 + (nb_profs - r) * (q - moyenne) ** 2) / nb_profs
+        ecart_type_min = math.floor(math.sqrt(variance) * 10000) / 10000
+    else:
+        ecart_type_min = 0.0
+
+    return {
+        'clique': clique,
+        'jours_clique': len(clique),
+        'jours_capacite': jours_capacite,
+        'jours_professeurs': jours_professeurs,
+        'jours_min': jours_min,
+        'nb_jours': instance.nb_jours,
+        'realisable': jours_min <= instance.nb_jours and not trop_grands,
+        'modules_trop_grands': trop_grands,
+        'ecart_type_min': ecart_type_min,
+    }
+
+
+def score_bound(bornes):
+    """Borne inférieure de optimizer.score (non placés, violations, écart type)"""
+    if not bornes['realisable']:
+        return (1, 0, 0.0)
+    return (0, 0, bornes['ecart_type_min'])
+
+
+def gap(instance, schedule, bornes):
+    """Écart entre une solution et les bornes: jours utilisés au-delà du minimum"""
+    jours_utilises = len(set(schedule.jour[schedule.jour >= 0].tolist()))
+    return {
+        'jours_utilises': jours_utilises,
+        'jours_min': bornes['jours_min'],
+        'ecart_jours': jours_utilises - bornes['jours_min'],
+    }
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Détection des conflits d'un emploi du temps par balayage (sweep line)
+Salles et professeurs: chevauchement réel des intervalles [début, début + durée[
+(comme OVERLAPS dans check_salle_disponibilite), étudiants: deux examens le même jour
+(check_etudiant_daily_limit). O(n log n + conflits) au lieu d'une auto-jointure.
+"""
+
+import heapq
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Un conflit entre deux examens sur une ressource:
+# type 'salle' (ressource = salle_id), 'professeur' (prof_id) ou 'etudiant' (date du jour),
+# debut/fin = période en conflit, nb_etudiants = étudiants communs (conflit étudiant)
+Conflit = namedtuple('Conflit', ['type', 'ressource', 'examen1', 'examen2', 'module1', 'module2',
+                                 'debut', 'fin', 'nb_etudiants'])
+
+TYPES_CONFLITS = ('salle', 'professeur', 'etudiant')
+
+
+def sweep(intervalles):
+    """
+    Paires qui se chevauchent parmi [(debut, fin, cle)] d'une même ressource:
+    tri par début, puis tas des intervalles actifs ordonnés par fin.
+    Produit (cle1, cle2, debut, fin) de la période commune.
+    """
+    actifs = []
+    for debut, fin, cle in sorted(intervalles, key=lambda i: (i[0], i[1])):
+        while actifs and actifs[0][0] <= debut:
+            heapq.heappop(actifs)
+        for fin_active, cle_active in actifs:
+            yield cle_active, cle, debut, min(fin, fin_active)
+        heapq.heappush(actifs, (fin, cle))
+
+
+def _placed(schedule):
+    """Masque des modules placés: jour et heure connus (salle éventuellement pas encore)"""
+    return (schedule.jour >= 0) & (schedule.heure >= 0)
+
+
+def exam_intervals(instance, schedule):
+    """
+    Intervalle de chaque examen placé: {m: (debut, fin)}; durée de l'examen existant,
+    sinon durée de l'instance pour les nouveaux examens (instance.durees)
+    """
+    creneaux = {}
+    intervalles = {}
+    for m in np.flatnonzero(_placed(schedule)).tolist():
+        d, h = int(schedule.jour[m]), int(schedule.heure[m])
+        if (d, h) not in creneaux:
+            creneaux[d, h] = datetime.strptime(instance.date_heure(d, h), '%Y-%m-%d %H:%M:%S')
+        debut = creneaux[d, h]
+        intervalles[m] = (debut, debut + timedelta(minutes=int(instance.durees[m])))
+    return intervalles
+
+
+def _student_pairs(instance, schedule):
+    """{(m1, m2): nb_etudiants} des modules ayant des étudiants communs le même jour"""
+    jours = schedule.jour[instance.insc_module]
+    # Même masque que exam_intervals: chaque paire doit avoir ses deux intervalles
+    ok = _placed(schedule)[instance.insc_module]
+    cles = instance.insc_etudiant[ok].astype(np.int64) * instance.nb_jours + jours[ok]
+    modules = instance.insc_module[ok]
+    ordre = np.argsort(cles, kind='stable')
+    cles, modules = cles[ordre], modules[ordre]
+
+    # Groupes (étudiant, jour) de plus d'un examen
+    paires = {}
+    doublons = np.flatnonzero(cles[1:] == cles[:-1])
+    if not len(doublons):
+        return paires
+    debuts = doublons[np.r_[True, doublons[1:] != doublons[:-1] + 1]]
+    for debut in debuts.tolist():
+        fin = debut + 1
+        while fin < len(cles) and cles[fin] == cles[debut]:
+            fin += 1
+        groupe = sorted(modules[debut:fin].tolist())
+        for i, a in enumerate(groupe):
+            for b in groupe[i + 1:]:
+                paires[a, b] = paires.get((a, b), 0) + 1
+    return paires
+
+
+def detect_conflicts(instance, schedule):
+    """
+    Tous les conflits de la solution (examens existants et nouveaux), triés par début:
+    [Conflit], une entrée par paire d'examens et par ressource
+    """
+    intervalles = exam_intervals(instance, schedule)
+    par_salle, par_prof = {}, {}
+    for m, (debut, fin) in intervalles.items():
+        for r in schedule.rooms(m):
+            par_salle.setdefault(int(r), []).append((debut, fin, m))
+        if schedule.prof[m] >= 0:
+            par_prof.setdefault(int(schedule.prof[m]), []).append((debut, fin, m))
+
+    def conflit(type_conflit, ressource, a, b, debut, fin, nb_etudiants=0):
+        a, b = min(a, b), max(a, b)
+        return Conflit(type_conflit, ressource, schedule.examen_id[a], schedule.examen_id[b],
+                       instance.module_ids[a], instance.module_ids[b], debut, fin, nb_etudiants)
+
+    conflits = []
+    for r, liste in par_salle.items():
+        conflits += [conflit('salle', instance.salle_ids[r], a, b, debut, fin)
+                     for a, b, debut, fin in sweep(liste)]
+    for p, liste in par_prof.items():
+        conflits += [conflit('professeur', instance.prof_ids[p], a, b, debut, fin)
+                     for a, b, debut, fin in sweep(liste)]
+
+    for (a, b), nb_etudiants in _student_pairs(instance, schedule).items():
+        (debut_a, fin_a), (debut_b, fin_b) = intervalles[a], intervalles[b]
+        conflits.append(conflit('etudiant', debut_a.date(), a, b, min(debut_a, debut_b),
+                                max(fin_a, fin_b), nb_etudiants))
+
+    conflits.sort(key=lambda c: (c.debut, TYPES_CONFLITS.index(c.type)))
+    return conflits
+
+
+def count_by_type(conflits):
+    """Nombre de conflits de chaque type"""
+    compte = dict.fromkeys(TYPES_CONFLITS, 0)
+    for c in conflits:
+        compte[c.type] += 1
+    return compte
+
+
+def conflicting_exams(conflits, types=('salle',)):
+    """Examens distincts engagés dans au moins un conflit des types donnés"""
+    return {examen for c in conflits if c.type in types for examen in (c.examen1, c.examen2)}
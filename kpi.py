@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Indicateurs des tableaux de bord en une requête par tableau de bord
+Chaque jeu d'indicateurs est calculé par une seule instruction SQL (CTE et agrégats
+FILTER, listes en json_agg) au lieu d'une requête par indicateur: un aller-retour
+avec la base quelle que soit sa latence. Résultats typés (namedtuple).
+"""
+
+from collections import namedtuple
+
+import pandas as pd
+
+# ==================== RÉSULTATS ====================
+
+KpiAcademiques = namedtuple('KpiAcademiques', [
+    'total_examens', 'total_etudiants', 'total_profs', 'total_salles',
+    'conflits', 'taux_conflits',
+    'total_heures_surveillance', 'salles_utilisees', 'taux_salles_utilisees',
+    'profs_impliques', 'charge_moyenne_par_prof',
+    'examens_amphis', 'examens_salles',
+])
+
+OccupationStrategique = namedtuple('OccupationStrategique', [
+    'occupation_par_type', 'distribution_par_heure', 'reussite_planification',
+])
+
+StatistiquesEmploiDuTemps = namedtuple('StatistiquesEmploiDuTemps', [
+    'total_examens', 'examens_par_jour', 'repartition_par_departement',
+])
+
+# ==================== REQUÊTES ====================
+
+# Tables et vues lues par les tableaux de bord mais installées par les scripts de migration
+# (10_conflits_actifs.sql, 13_vues_kpi.sql; voir 05_deployment_setup.sh): absentes,
+# les indicateurs sont calculés autrement
+RELATIONS_KPI = (
+    'conflits_actifs', 'kpi_fraicheur',
+    'mv_occupation_salles', 'mv_charge_professeurs', 'mv_conflits_par_departement',
+    'mv_distribution_horaire', 'mv_examens_par_jour',
+)
+
+# Définition des vues matérialisées (mêmes requêtes que 13_vues_kpi.sql), lues directement
+# quand la vue n'est pas installée
+REQUETES_VUES_KPI = {
+    'mv_occupation_salles': """
+        SELECT
+            l.id AS salle_id,
+            l.nom AS salle,
+            l.type,
+            l.capacite,
+            COUNT(ep.id) AS nb_examens,
+            COALESCE(SUM(ep.duree_minutes), 0) / 60.0 AS total_heures,
+            ROUND(COUNT(ep.id) * 100.0 / 20, 1) AS taux_occupation
+        FROM lieu_examen l
+        LEFT JOIN examens_planifies ep ON l.id = ep.salle_id AND ep.statut IN ('PROPOSE', 'VALIDE')
+        GROUP BY l.id, l.nom, l.type, l.capacite
+    """,
+    'mv_charge_professeurs': """
+        SELECT
+            p.id AS prof_id,
+            CONCAT(p.prenom, ' ', p.nom) AS professeur,
+            d.nom AS departement,
+            COUNT(ep.id) AS nb_examens,
+            SUM(ep.duree_minutes) / 60.0 AS total_heures,
+            ROUND(AVG(ep.duree_minutes), 0) AS duree_moyenne_min
+        FROM professeurs p
+        JOIN examens_planifies ep ON p.id = ep.prof_id
+        JOIN departements d ON p.dept_id = d.id
+        WHERE ep.statut IN ('PROPOSE', 'VALIDE')
+        GROUP BY p.id, p.prenom, p.nom, d.nom
+    """,
+    'mv_conflits_par_departement': """
+        WITH cotes AS (
+            SELECT c.type_conflit, c.ressource_id, c.examen1, c.examen2, c.examen1 AS examen_id
+            FROM conflits_actifs c
+            UNION ALL
+            SELECT c.type_conflit, c.ressource_id, c.examen1, c.examen2, c.examen2
+            FROM conflits_actifs c
+        )
+        SELECT
+            d.id AS dept_id,
+            d.nom AS departement,
+            COUNT(DISTINCT c.examen_id) AS examens_en_conflit,
+            COUNT(DISTINCT (c.type_conflit, c.ressource_id, c.examen1, c.examen2)) AS nb_conflits
+        FROM cotes c
+        JOIN examens_planifies ep ON ep.id = c.examen_id
+        JOIN modules m ON ep.module_id = m.id
+        JOIN formations f ON m.formation_id = f.id
+        JOIN departements d ON f.dept_id = d.id
+        GROUP BY d.id, d.nom
+    """,
+    'mv_distribution_horaire': """
+        SELECT EXTRACT(HOUR FROM date_heure)::INTEGER AS heure, COUNT(*) AS nb_examens
+        FROM examens_planifies
+        WHERE statut IN ('PROPOSE', 'VALIDE')
+        GROUP BY EXTRACT(HOUR FROM date_heure)::INTEGER
+    """,
+    'mv_examens_par_jour': """
+        SELECT f.dept_id, DATE(ep.date_heure) AS jour, COUNT(*) AS nb_examens
+        FROM examens_planifies ep
+        JOIN modules m ON ep.module_id = m.id
+        JOIN formations f ON m.formation_id = f.id
+        WHERE ep.statut IN ('PROPOSE', 'VALIDE')
+        GROUP BY f.dept_id, DATE(ep.date_heure)
+    """,
+}
+
+SQL_RELATIONS_ABSENTES = """
+    SELECT relation
+    FROM unnest(%s::TEXT[]) AS relation
+    WHERE to_regclass(relation) IS NULL
+"""
+
+# Indicateur "Conflits" des tableaux de bord: examens distincts en conflit de salle
+# (deux examens dans la même salle au même moment), le sens historique de l'indicateur.
+# C'est lui qui bloque la validation finale; les conflits professeur et étudiant sont
+# comptés par paire et par type à part (v_conflits_actifs_par_type).
+# Table conflits_actifs tenue à jour par triggers (10_conflits_actifs.sql)
+SQL_EXAMENS_EN_CONFLIT_SALLE = """
+    SELECT COUNT(DISTINCT e.examen_id)
+    FROM conflits_actifs c
+    CROSS JOIN LATERAL (VALUES (c.examen1), (c.examen2)) AS e(examen_id)
+    WHERE c.type_conflit = 'salle'
+"""
+
+SQL_KPI_ACADEMIQUES = """
+    WITH actifs AS (
+        SELECT ep.salle_id, ep.prof_id, ep.duree_minutes, l.type
+        FROM examens_planifies ep
+        JOIN lieu_examen l ON l.id = ep.salle_id
+        WHERE ep.statut IN ('PROPOSE', 'VALIDE')
+    ),
+    agregats AS (
+        SELECT
+            COUNT(*) AS total_examens,
+            COALESCE(SUM(duree_minutes), 0) / 60.0 AS total_heures,
+            COUNT(DISTINCT salle_id) AS salles_utilisees,
+            COUNT(DISTINCT prof_id) AS profs_impliques,
+            COUNT(*) FILTER (WHERE type = 'AMPHI') AS examens_amphis,
+            COUNT(*) FILTER (WHERE type = 'SALLE') AS examens_salles
+        FROM actifs
+    )
+    SELECT
+        a.total_examens,
+        (SELECT COUNT(*) FROM etudiants),
+        (SELECT COUNT(*) FROM professeurs),
+        (SELECT COUNT(*) FROM lieu_examen),
+        ({conflits}),
+        a.total_heures,
+        a.salles_utilisees,
+        a.profs_impliques,
+        a.examens_amphis,
+        a.examens_salles
+    FROM agregats a
+"""
+
+# Distribution par heure: vue matérialisée mv_distribution_horaire (13_vues_kpi.sql),
+# ou sa requête (view_source)
+SQL_OCCUPATION_STRATEGIQUE = """
+    WITH actifs AS (
+        SELECT salle_id, date_heure, duree_minutes, mode_generation
+        FROM examens_planifies
+        WHERE statut IN ('PROPOSE', 'VALIDE')
+    ),
+    par_type AS (
+        SELECT l.type,
+               COUNT(a.salle_id) AS nb_examens,
+               COALESCE(SUM(a.duree_minutes), 0) / 60.0 AS heures_occupees,
+               COUNT(DISTINCT DATE(a.date_heure)) AS jours_occupes
+        FROM lieu_examen l
+        LEFT JOIN actifs a ON a.salle_id = l.id
+        GROUP BY l.type
+    ),
+    par_heure AS (
+        SELECT heure, nb_examens
+        FROM {mv_distribution_horaire}
+    ),
+    par_mode AS (
+        SELECT mode_generation, COUNT(*) AS nb_examens, AVG(duree_minutes) AS duree_moyenne
+        FROM actifs
+        GROUP BY mode_generation
+    )
+    SELECT
+        (SELECT json_agg(json_build_array(type, nb_examens, heures_occupees, jours_occupes) ORDER BY type)
+         FROM par_type),
+        (SELECT json_agg(json_build_array(heure, nb_examens) ORDER BY heure) FROM par_heure),
+        (SELECT json_agg(json_build_array(mode_generation, nb_examens, duree_moyenne)) FROM par_mode)
+"""
+
+SQL_STATISTIQUES_EMPLOI_DU_TEMPS = """
+    WITH actifs AS (
+        SELECT ep.date_heure, d.nom AS departement
+        FROM examens_planifies ep
+        LEFT JOIN modules m ON ep.module_id = m.id
+        LEFT JOIN formations f ON m.formation_id = f.id
+        LEFT JOIN departements d ON f.dept_id = d.id
+        WHERE ep.statut IN ('PROPOSE', 'VALIDE')
+    ),
+    par_jour AS (
+        SELECT DATE(date_heure) AS jour, COUNT(*) AS nb_examens
+        FROM actifs
+        GROUP BY DATE(date_heure)
+    ),
+    par_departement AS (
+        SELECT departement, COUNT(*) AS nb_examens
+        FROM actifs
+        WHERE departement IS NOT NULL
+        GROUP BY departement
+    )
+    SELECT
+        (SELECT COUNT(*) FROM actifs),
+        (SELECT json_agg(json_build_array(jour, nb_examens) ORDER BY jour) FROM par_jour),
+        (SELECT json_agg(json_build_array(departement, nb_examens) ORDER BY nb_examens DESC)
+         FROM par_departement)
+"""
+
+
+def _pourcentage(partie, total):
+    return partie * 100 / total if total else 0
+
+
+def _tableau(lignes, colonnes):
+    """DataFrame numérique d'une liste json_agg (NULL, donc None, si elle est vide)"""
+    df = pd.DataFrame(lignes or [], columns=colonnes)
+    for colonne in colonnes[1:]:
+        df[colonne] = pd.to_numeric(df[colonne], errors='coerce')
+    return df
+
+
+# ==================== CHARGEMENT ====================
+
+def missing_relations(cursor, relations=RELATIONS_KPI):
+    """Relations non installées parmi relations"""
+    cursor.execute(SQL_RELATIONS_ABSENTES, (list(relations),))
+    return {ligne[0] for ligne in cursor.fetchall()}
+
+
+def view_source(vue, absentes=()):
+    """Vue matérialisée vue pour une clause FROM, ou sa requête si elle est absente"""
+    if vue in absentes:
+        return f"({REQUETES_VUES_KPI[vue]}) AS {vue}"
+    return vue
+
+
+def kpi_academiques(cursor, conflits=None):
+    """
+    Indicateurs de la vue stratégique (en-tête et onglet KPIs du tableau de bord Direction).
+    conflits: nombre d'examens en conflit de salle déjà connu, sinon lu dans conflits_actifs
+    """
+    if conflits is None:
+        cursor.execute(SQL_KPI_ACADEMIQUES.format(conflits=SQL_EXAMENS_EN_CONFLIT_SALLE))
+    else:
+        cursor.execute(SQL_KPI_ACADEMIQUES.format(conflits='%s'), (conflits,))
+    (total_examens, total_etudiants, total_profs, total_salles, conflits, total_heures,
+     salles_utilisees, profs_impliques, examens_amphis, examens_salles) = cursor.fetchone()
+    total_heures = float(total_heures)
+    return KpiAcademiques(
+        total_examens=total_examens,
+        total_etudiants=total_etudiants,
+        total_profs=total_profs,
+        total_salles=total_salles,
+        conflits=conflits,
+        taux_conflits=_pourcentage(conflits, total_examens),
+        total_heures_surveillance=total_heures,
+        salles_utilisees=salles_utilisees,
+        taux_salles_utilisees=_pourcentage(salles_utilisees, total_salles),
+        profs_impliques=profs_impliques,
+        charge_moyenne_par_prof=total_heures / profs_impliques if profs_impliques else 0,
+        examens_amphis=examens_amphis,
+        examens_salles=examens_salles,
+    )
+
+
+def occupation_strategique(cursor, absentes=()):
+    """
+    Occupation par type de salle, distribution par heure et par mode de génération.
+    absentes: relations non installées (missing_relations)
+    """
+    cursor.execute(SQL_OCCUPATION_STRATEGIQUE.format(
+        mv_distribution_horaire=view_source('mv_distribution_horaire', absentes)))
+    par_type, par_heure, par_mode = cursor.fetchone()
+    return OccupationStrategique(
+        occupation_par_type=_tableau(par_type, ['Type', 'Examens', 'Heures', 'Jours occupés']),
+        distribution_par_heure=_tableau(par_heure, ['Heure', 'Examens']),
+        reussite_planification=_tableau(par_mode, ['Mode', 'Examens', 'Durée moyenne']),
+    )
+
+
+def timetable_statistics(cursor):
+    """Nombre d'examens actifs, examens par jour et par département"""
+    cursor.execute(SQL_STATISTIQUES_EMPLOI_DU_TEMPS)
+    total_examens, par_jour, par_departement = cursor.fetchone()
+    examens_par_jour = _tableau(par_jour, ['Date', 'Examens'])
+    examens_par_jour['Date'] = pd.to_datetime(examens_par_jour['Date']).dt.date
+    return StatistiquesEmploiDuTemps(
+        total_examens=total_examens,
+        examens_par_jour=examens_par_jour,
+        repartition_par_departement=_tableau(par_departement, ['Département', 'Examens']),
+    )
@@ -0,0 +1,779 @@
+#!/usr/bin/env python3
+"""
+Optimisation de l'emploi du temps par recuit simulé
+Recherche locale en mémoire sur les voisinages déplacement / échange / salle / professeur,
+et mouvements composés: chaînes de Kempe entre deux jours, échange de deux créneaux entiers
+Départs multiples en parallèle (un processus par graine)
+Décomposition par département (un processus par département) puis réconciliation
+Mode anytime: budget de temps, meilleure solution toujours disponible,
+arrêt anticipé dès que la borne inférieure (bounds.py) est atteinte
+Réparation locale: seul le voisinage des examens modifiés est réoptimisé
+"""
+
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from bounds import lower_bounds, score_bound
+from conflicts import sweep
+from scheduler import (
+    CAPACITE_MAX_SALLE_NORMALE,
+    MAX_EXAMENS_PAR_JOUR_PROF,
+    Schedule,
+    StudentDayOccupancy,
+    assign_professors,
+    assign_rooms,
+    build_schedule,
+    color_days,
+    load_instance,
+    repair_days,
+)
+
+# Poids des violations dans la fonction objectif
+POIDS = {
+    'etudiants': 10,         # check_etudiant_daily_limit
+    'profs': 5,              # check_professeur_daily_limit
+    'profs_simultanes': 10,  # professeur sur deux examens qui se chevauchent
+    'salles': 10,            # check_salle_disponibilite (paires d'examens qui se chevauchent)
+    'capacite': 10,          # check_salle_capacity
+}
+
+# Mouvements composés (chaîne de Kempe, échange de créneaux): part des tirages
+# et taille maximale d'une chaîne
+PROBA_MOUVEMENT_COMPOSE = 0.05
+TAILLE_MAX_CHAINE = 200
+
+
+# ==================== CHARGEMENT ====================
+
+def load_current_schedule(cursor, nb_jours=14, duree_minutes=120):
+    """Charger les examens actifs comme solution de départ (tous déplaçables)"""
+    instance = load_instance(cursor, nb_examens=0, duree_minutes=duree_minutes, nb_jours=nb_jours)
+    schedule = Schedule(instance)
+    schedule.load_existing()
+    schedule.fixe[:] = False
+    return instance, schedule
+
+
+def salles_possibles(instance):
+    """Pour chaque module, les salles qui respectent la règle de capacité"""
+    capacites = instance.salle_capacites
+    amphi = np.array([t == 'AMPHI' for t in instance.salle_types])
+    possibles = []
+    for effectif in instance.effectifs:
+        ok = capacites >= effectif
+        if effectif > CAPACITE_MAX_SALLE_NORMALE:
+            ok &= amphi
+        possibles.append(np.flatnonzero(ok))
+    return possibles
+
+
+# ==================== FONCTION OBJECTIF ====================
+
+def _overlapping_pairs(occupations):
+    """Nombre de paires d'examens qui se chevauchent, ressource par ressource (balayage)"""
+    return sum(sum(1 for _ in sweep(intervalles)) for intervalles in occupations.values())
+
+
+def evaluate(instance, schedule):
+    """
+    Compter les violations de chaque contrainte sur la solution complète.
+    Salles et professeurs: paires d'examens dont les intervalles [début, début + durée[
+    se chevauchent (durée réelle de chaque examen, comme conflicts.detect_conflicts)
+    """
+    nb_jours = instance.nb_jours
+    place = np.flatnonzero((schedule.jour >= 0) & (schedule.salle >= 0))
+    jour, salle, prof = schedule.jour[place], schedule.salle[place], schedule.prof[place]
+    debuts = instance.heure_minutes[schedule.heure[place]]
+    fins = debuts + instance.durees[place]
+    violations = {}
+
+    # Étudiants: plus d'un examen le même jour
+    jours_insc = schedule.jour[instance.insc_module]
+    ok = jours_insc >= 0
+    cles = instance.insc_etudiant[ok].astype(np.int64) * nb_jours + jours_insc[ok]
+    compte = np.bincount(cles, minlength=1)
+    violations['etudiants'] = int(np.maximum(compte - 1, 0).sum())
+
+    # Salles et professeurs: intervalles par (ressource, jour)
+    # (les salles supplémentaires des examens répartis comptent aussi)
+    par_salle, par_prof = {}, {}
+    for m, d, p, debut, fin in zip(place.tolist(), jour.tolist(), prof.tolist(), debuts.tolist(), fins.tolist()):
+        for r in schedule.rooms(m):
+            par_salle.setdefault((r, d), []).append((debut, fin, m))
+        if p >= 0:
+            par_prof.setdefault((p, d), []).append((debut, fin, m))
+    violations['salles'] = _overlapping_pairs(par_salle)
+
+    # Capacité: effectif et règle des 20 places hors amphi (la répartition
+    # d'un examen sur plusieurs salles est valide par construction)
+    effectifs = instance.effectifs[place]
+    amphi = np.array([t == 'AMPHI' for t in instance.salle_types])[salle]
+    trop_petite = (effectifs > instance.salle_capacites[salle])
+    trop_petite |= (~amphi) & (effectifs > CAPACITE_MAX_SALLE_NORMALE)
+    trop_petite &= ~np.isin(place, list(schedule.repartition))
+    violations['capacite'] = int(trop_petite.sum())
+
+    # Professeurs: limite de 3 examens par jour, et pas deux examens à la fois
+    avec_prof = prof >= 0
+    cles = prof[avec_prof].astype(np.int64) * nb_jours + jour[avec_prof]
+    compte = np.bincount(cles, minlength=1)
+    violations['profs'] = int(np.maximum(compte - MAX_EXAMENS_PAR_JOUR_PROF, 0).sum())
+    violations['profs_simultanes'] = _overlapping_pairs(par_prof)
+
+    violations['total'] = sum(POIDS[k] * v for k, v in violations.items())
+    return violations
+
+
+# ==================== ÉVALUATION INCRÉMENTALE ====================
+
+class CostModel:
+    """
+    Compteurs des contraintes mis à jour à chaque mouvement d'examen:
+    étudiant x jour (StudentDayOccupancy), professeur x jour, et examens par
+    (salle, jour) et (professeur, jour) pour les chevauchements.
+    Chaque examen occupe l'intervalle réel [début, début + durée[ de sa durée
+    (instance.durees): un examen long gêne aussi le créneau suivant, comme dans
+    evaluate(), conflicts.py et la contrainte excl_salle_periode.
+    Un examen réparti garde ses salles: il occupe toutes ses salles au créneau où il est déplacé.
+    Une salle exclue (indisponible) n'accepte aucun examen.
+    Un mouvement coûte O(étudiants du module déplacé + examens de la salle et du
+    professeur ce jour-là) au lieu d'une réévaluation complète.
+    La solution est modifiée en place via move().
+    """
+
+    def __init__(self, instance, schedule, salles_exclues=()):
+        self.instance = instance
+        self.schedule = schedule
+        nb_jours, nb_profs = instance.nb_jours, len(instance.prof_ids)
+
+        self.occupation = StudentDayOccupancy(instance)
+        self.etudiant_jour = self.occupation.matrice
+        self.prof_jour = np.zeros((nb_profs, nb_jours), dtype=np.int16)
+        # Examens présents par (salle, jour) et (professeur, jour)
+        self.salle_examens = {}
+        self.prof_examens = {}
+
+        amphi = np.array([t == 'AMPHI' for t in instance.salle_types])
+        effectifs = instance.effectifs[:, None]
+        self.accepte = effectifs <= instance.salle_capacites[None, :]
+        self.accepte &= amphi[None, :] | (effectifs <= CAPACITE_MAX_SALLE_NORMALE)
+        for m in schedule.repartition:
+            self.accepte[m, schedule.salle[m]] = True
+        self.accepte[:, list(salles_exclues)] = False
+
+        self.violations = dict.fromkeys(POIDS, 0)
+        for m in range(instance.nb_modules):
+            if schedule.jour[m] >= 0 and schedule.salle[m] >= 0:
+                self._add(m, schedule.jour[m], schedule.heure[m], schedule.salle[m], schedule.prof[m])
+
+    @property
+    def total(self):
+        return sum(POIDS[k] * v for k, v in self.violations.items())
+
+    def _rooms(self, m, r):
+        """Salles occupées par l'examen m de salle principale r"""
+        if m in self.schedule.repartition:
+            return self.schedule.rooms(m)
+        return [r]
+
+    def overlaps(self, m, h, examens):
+        """Nombre d'examens (autres que m) de la liste qui chevauchent m commencé à l'heure h"""
+        inst, heures = self.instance, self.schedule.heure
+        debut = inst.heure_minutes[h]
+        fin = debut + inst.durees[m]
+        return sum(1 for a in examens
+                   if a != m and inst.heure_minutes[heures[a]] < fin
+                   and debut < inst.heure_minutes[heures[a]] + inst.durees[a])
+
+    def room_free(self, m, d, h, r):
+        """La salle r est-elle libre le jour d sur toute la durée de m commencé à l'heure h ?"""
+        return not self.overlaps(m, h, self.salle_examens.get((r, d), ()))
+
+    def _add(self, m, d, h, r, p):
+        v = self.violations
+        etudiants = self.instance.etudiants_du_module[m]
+        v['etudiants'] += int(np.count_nonzero(self.etudiant_jour[etudiants, d] >= 1))
+        self.etudiant_jour[etudiants, d] += 1
+        for salle in self._rooms(m, r):
+            examens = self.salle_examens.setdefault((salle, d), set())
+            v['salles'] += self.overlaps(m, h, examens)
+            examens.add(m)
+        v['capacite'] += int(not self.accepte[m, r])
+        if p >= 0:
+            v['profs'] += int(self.prof_jour[p, d] >= MAX_EXAMENS_PAR_JOUR_PROF)
+            self.prof_jour[p, d] += 1
+            examens = self.prof_examens.setdefault((p, d), set())
+            v['profs_simultanes'] += self.overlaps(m, h, examens)
+            examens.add(m)
+
+    def _remove(self, m, d, h, r, p):
+        v = self.violations
+        etudiants = self.instance.etudiants_du_module[m]
+        self.etudiant_jour[etudiants, d] -= 1
+        v['etudiants'] -= int(np.count_nonzero(self.etudiant_jour[etudiants, d] >= 1))
+        for salle in self._rooms(m, r):
+            examens = self.salle_examens[(salle, d)]
+            examens.discard(m)
+            v['salles'] -= self.overlaps(m, h, examens)
+        v['capacite'] -= int(not self.accepte[m, r])
+        if p >= 0:
+            self.prof_jour[p, d] -= 1
+            v['profs'] -= int(self.prof_jour[p, d] >= MAX_EXAMENS_PAR_JOUR_PROF)
+            examens = self.prof_examens[(p, d)]
+            examens.discard(m)
+            v['profs_simultanes'] -= self.overlaps(m, h, examens)
+
+    def delta(self, m, d, h, r, p):
+        """Variation du coût pondéré si l'examen m passe en (d, h, r, p), sans rien modifier"""
+        s = self.schedule
+        d0, h0, r0, p0 = s.jour[m], s.heure[m], s.salle[m], s.prof[m]
+        delta = 0
+
+        if d != d0:
+            etudiants = self.instance.etudiants_du_module[m]
+            avant = np.count_nonzero(self.etudiant_jour[etudiants, d0] >= 2)
+            apres = np.count_nonzero(self.etudiant_jour[etudiants, d] >= 1)
+            delta += POIDS['etudiants'] * int(apres - avant)
+
+        # Chevauchements: m est exclu des deux comptes, seules ses paires changent
+        if (d, h, r) != (d0, h0, r0):
+            for salle, salle0 in zip(self._rooms(m, r), self._rooms(m, r0)):
+                delta += POIDS['salles'] * (self.overlaps(m, h, self.salle_examens.get((salle, d), ()))
+                                            - self.overlaps(m, h0, self.salle_examens.get((salle0, d0), ())))
+        if r != r0:
+            delta += POIDS['capacite'] * (int(not self.accepte[m, r]) - int(not self.accepte[m, r0]))
+
+        if (p, d) != (p0, d0):
+            if p0 >= 0:
+                delta -= POIDS['profs'] * int(self.prof_jour[p0, d0] > MAX_EXAMENS_PAR_JOUR_PROF)
+            if p >= 0:
+                delta += POIDS['profs'] * int(self.prof_jour[p, d] >= MAX_EXAMENS_PAR_JOUR_PROF)
+        if (p, d, h) != (p0, d0, h0):
+            if p0 >= 0:
+                delta -= POIDS['profs_simultanes'] * self.overlaps(m, h0, self.prof_examens.get((p0, d0), ()))
+            if p >= 0:
+                delta += POIDS['profs_simultanes'] * self.overlaps(m, h, self.prof_examens.get((p, d), ()))
+
+        return delta
+
+    def move(self, m, d, h, r, p):
+        """Déplacer l'examen m en (d, h, r, p) et mettre les compteurs à jour"""
+        s = self.schedule
+        self._remove(m, s.jour[m], s.heure[m], s.salle[m], s.prof[m])
+        s.jour[m], s.heure[m], s.salle[m], s.prof[m] = d, h, r, p
+        self._add(m, d, h, r, p)
+
+    def move_many(self, mouvements):
+        """
+        Mouvement composé [(m, d, h, r, p)]: tous les examens sont retirés avant d'être
+        replacés, pour ne pas compter de conflit entre deux examens qui échangent leur place.
+        Retourne les mouvements inverses (pour annuler).
+        """
+        s = self.schedule
+        inverses = [(m, s.jour[m], s.heure[m], s.salle[m], s.prof[m]) for m, *_ in mouvements]
+        for m, d, h, r, p in inverses:
+            self._remove(m, d, h, r, p)
+        for m, d, h, r, p in mouvements:
+            s.jour[m], s.heure[m], s.salle[m], s.prof[m] = d, h, r, p
+            self._add(m, d, h, r, p)
+        return inverses
+
+    def students_free(self, entrants, sortants, d):
+        """
+        Les étudiants des examens entrants n'ont aucun autre examen le jour d,
+        une fois les examens sortants retirés de ce jour (vérification avant mouvement)
+        """
+        if not len(entrants):
+            return True
+        etudiants = np.concatenate([self.instance.etudiants_du_module[m] for m in entrants])
+        occupes = self.etudiant_jour[etudiants, d].astype(np.int32)
+        if len(sortants):
+            partants = np.concatenate([self.instance.etudiants_du_module[m] for m in sortants])
+            occupes -= np.isin(etudiants, partants)
+        return not (occupes > 0).any()
+
+    def conflicting_modules(self):
+        """Modules impliqués dans au moins une violation"""
+        s = self.schedule
+        en_conflit = []
+        for m in np.flatnonzero((s.jour >= 0) & (s.salle >= 0)):
+            d, h, r, p = s.jour[m], s.heure[m], s.salle[m], s.prof[m]
+            if (not all(self.room_free(m, d, h, salle) for salle in self._rooms(m, r))
+                    or not self.accepte[m, r]
+                    or (p >= 0 and (self.prof_jour[p, d] > MAX_EXAMENS_PAR_JOUR_PROF
+                                    or self.overlaps(m, h, self.prof_examens[(p, d)])))
+                    or (self.etudiant_jour[self.instance.etudiants_du_module[m], d] > 1).any()):
+                en_conflit.append(m)
+        return np.array(en_conflit, dtype=np.int64)
+
+
+# ==================== MOUVEMENTS COMPOSÉS ====================
+
+def kempe_chain(instance, schedule, m, d2, taille_max=TAILLE_MAX_CHAINE):
+    """
+    Chaîne de Kempe de l'examen m entre son jour et d2: composante connexe de m dans le
+    graphe de conflits restreint aux examens de ces deux jours. Échanger les jours de
+    toute la chaîne ne crée aucun conflit étudiant. None si la chaîne dépasse taille_max.
+    """
+    jours = (schedule.jour[m], d2)
+    chaine, pile = {m}, [m]
+    while pile:
+        a = pile.pop()
+        for b in instance.voisins[a]:
+            if b not in chaine and schedule.jour[b] in jours:
+                chaine.add(b)
+                pile.append(b)
+                if len(chaine) > taille_max:
+                    return None
+    return sorted(chaine)
+
+
+def kempe_move(instance, cout, m, d2, deplacable, possibles):
+    """
+    Mouvements de l'échange de Kempe de m vers d2 (heure et surveillant conservés),
+    None si la chaîne n'est pas déplaçable. Un examen dont la salle est prise
+    sur sa durée le jour cible passe dans une salle possible libre.
+    """
+    s = cout.schedule
+    d1 = s.jour[m]
+    chaine = kempe_chain(instance, s, m, d2)
+    if chaine is None or not deplacable[chaine].all():
+        return None
+    dans_chaine = set(chaine)
+    mouvements, prises = [], {}
+
+    def libre(a, d, h, r):
+        # Les examens de la chaîne quittent leur jour: seuls les autres comptent
+        autres = [b for b in cout.salle_examens.get((r, d), ()) if b not in dans_chaine]
+        return not cout.overlaps(a, h, autres + prises.get((r, d), []))
+
+    for a in chaine:
+        d, h, r = d1 + d2 - s.jour[a], s.heure[a], s.salle[a]
+        if a not in s.repartition and not libre(a, d, h, r):
+            libres = [x for x in possibles[a] if libre(a, d, h, x)]
+            if libres:
+                r = libres[0]
+        prises.setdefault((r, d), []).append(a)
+        mouvements.append((a, d, h, r, s.prof[a]))
+    return mouvements
+
+
+def slot_swap_move(cout, d1, h1, d2, h2, deplacable):
+    """
+    Mouvements de l'échange de tous les examens des créneaux (d1, h1) et (d2, h2),
+    salles et surveillants conservés. None si un examen est figé ou si un étudiant
+    aurait deux examens le même jour.
+    """
+    s = cout.schedule
+    place = (s.jour >= 0) & (s.salle >= 0)
+    a = np.flatnonzero(place & (s.jour == d1) & (s.heure == h1))
+    b = np.flatnonzero(place & (s.jour == d2) & (s.heure == h2))
+    if not (len(a) or len(b)) or not deplacable[a].all() or not deplacable[b].all():
+        return None
+    if d1 != d2 and not (cout.students_free(a, b, d2) and cout.students_free(b, a, d1)):
+        return None
+    return ([(m, d2, h2, s.salle[m], s.prof[m]) for m in a]
+            + [(m, d1, h1, s.salle[m], s.prof[m]) for m in b])
+
+
+# ==================== RECUIT SIMULÉ ====================
+
+def anneal(instance, schedule, budget_secondes=10.0, seed=None,
+           temperature_initiale=20.0, temperature_finale=0.1, salles_exclues=()):
+    """
+    Recuit simulé sur la solution (modifiée en place) pendant budget_secondes.
+    Les mouvements sont évalués par CostModel.delta; la moitié des tirages
+    porte sur les examens en conflit (liste rafraîchie périodiquement).
+    Les salles exclues (indices) comptent comme une violation de capacité.
+    Une part PROBA_MOUVEMENT_COMPOSE des tirages est un mouvement composé
+    (chaîne de Kempe ou échange de créneaux) pour sortir des minima locaux.
+    Retourne la meilleure solution rencontrée et son évaluation.
+    """
+    rng = np.random.default_rng(seed)
+    possibles = salles_possibles(instance)
+    if len(salles_exclues):
+        possibles = [np.setdiff1d(salles, salles_exclues) for salles in possibles]
+    mobiles = np.flatnonzero(~schedule.fixe & (schedule.jour >= 0) & (schedule.salle >= 0))
+    profs_par_dept = {}
+    for p, dept_id in enumerate(instance.prof_dept):
+        profs_par_dept.setdefault(dept_id, []).append(p)
+
+    cout = CostModel(instance, schedule, salles_exclues)
+    mobile = ~schedule.fixe
+    deplacable = mobile & (schedule.salle >= 0)
+    courant = cout.total
+    meilleure, meilleur_cout = schedule.copy(), courant
+    en_conflit = mobiles
+    debut = time.time()
+    iterations = 0
+
+    while len(mobiles) and courant > 0:
+        if iterations % 2000 == 0:
+            ecoule = time.time() - debut
+            if ecoule >= budget_secondes:
+                break
+            temperature = temperature_initiale * (temperature_finale / temperature_initiale) ** (ecoule / budget_secondes)
+            en_conflit = cout.conflicting_modules()
+            en_conflit = en_conflit[mobile[en_conflit]]
+            if not len(en_conflit):
+                en_conflit = mobiles
+        iterations += 1
+
+        m = int(rng.choice(en_conflit if rng.random() < 0.5 else mobiles))
+        d, h, r, p = schedule.jour[m], schedule.heure[m], schedule.salle[m], schedule.prof[m]
+        type_mouvement = rng.integers(4, 6) if rng.random() < PROBA_MOUVEMENT_COMPOSE else rng.integers(4)
+
+        if type_mouvement >= 4:
+            # Mouvement composé: chaîne de Kempe entre deux jours, ou échange de deux créneaux
+            jour_cible, heure_cible = rng.integers(instance.nb_jours), rng.integers(instance.nb_heures)
+            if type_mouvement == 4 and jour_cible != d:
+                mouvements = kempe_move(instance, cout, m, jour_cible, deplacable, possibles)
+            elif type_mouvement == 5 and (jour_cible, heure_cible) != (d, h):
+                mouvements = slot_swap_move(cout, d, h, jour_cible, heure_cible, deplacable)
+            else:
+                continue
+            if mouvements is None:
+                continue
+            avant = cout.total
+            inverses = cout.move_many(mouvements)
+            delta = cout.total - avant
+            if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+                courant = cout.total
+            else:
+                cout.move_many(inverses)
+                continue
+        elif type_mouvement == 1:
+            # Échanger les créneaux de deux examens (deux mouvements successifs)
+            autre = int(rng.choice(mobiles))
+            if autre == m:
+                continue
+            d2, h2, r2, p2 = schedule.jour[autre], schedule.heure[autre], schedule.salle[autre], schedule.prof[autre]
+            avant = cout.total
+            cout.move(m, d2, h2, r, p)
+            cout.move(autre, d, h, r2, p2)
+            delta = cout.total - avant
+            if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+                courant = cout.total
+            else:
+                cout.move(autre, d2, h2, r2, p2)
+                cout.move(m, d, h, r, p)
+                continue
+        else:
+            if type_mouvement == 0:
+                # Déplacer l'examen sur un autre créneau, de préférence un jour libre pour ses étudiants
+                jours_libres = np.flatnonzero(cout.occupation.free_days(m))
+                if len(jours_libres):
+                    jour_cible = rng.choice(jours_libres)
+                else:
+                    jour_cible = rng.integers(instance.nb_jours)
+                cible = (jour_cible, rng.integers(instance.nb_heures), r, p)
+            elif type_mouvement == 2:
+                # Changer de salle (un examen réparti garde ses salles)
+                if not len(possibles[m]) or m in schedule.repartition:
+                    continue
+                cible = (d, h, rng.choice(possibles[m]), p)
+            else:
+                # Changer de surveillant (de préférence dans le département du module)
+                candidats = profs_par_dept.get(instance.module_dept[m]) or range(len(instance.prof_ids))
+                cible = (d, h, r, rng.choice(candidats))
+            delta = cout.delta(m, *cible)
+            if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+                cout.move(m, *cible)
+                courant = cout.total
+            else:
+                continue
+
+        if courant < meilleur_cout:
+            meilleure, meilleur_cout = schedule.copy(), courant
+
+    resultat = evaluate(instance, meilleure)
+    resultat['iterations'] = iterations
+    return meilleure, resultat
+
+
+def schedule_diff(initiale, finale):
+    """
+    Examens modifiés: [(examen_id, prof_id, salle_id, date_heure, salles)],
+    salles = [(salle_id, nb_places)] pour un examen réparti, [] sinon
+    """
+    inst = finale.instance
+    diff = []
+    for m in range(inst.nb_modules):
+        if finale.examen_id[m] is None or not finale.is_complete(m):
+            continue
+        if (initiale.jour[m], initiale.heure[m], initiale.salle[m], initiale.prof[m]) == \
+                (finale.jour[m], finale.heure[m], finale.salle[m], finale.prof[m]) \
+                and initiale.repartition.get(m) == finale.repartition.get(m):
+            continue
+        diff.append((
+            finale.examen_id[m],
+            inst.prof_ids[finale.prof[m]],
+            inst.salle_ids[finale.salle[m]],
+            inst.date_heure(finale.jour[m], finale.heure[m]),
+            [(inst.salle_ids[r], nb_places) for r, nb_places in finale.repartition.get(m, [])]
+        ))
+    return diff
+
+
+# ==================== DÉPARTS MULTIPLES ====================
+
+# Instance en lecture seule de chaque processus de calcul (cf. _init_worker)
+_instance_partagee = None
+
+
+def score(instance, schedule):
+    """
+    Qualité d'une solution, à minimiser dans l'ordre: modules non placés,
+    violations pondérées, puis écart type de la charge des surveillants
+    """
+    places = schedule.prof[schedule.prof >= 0]
+    charges = np.bincount(places, minlength=len(instance.prof_ids))
+    return (len(schedule.non_places), evaluate(instance, schedule)['total'], round(float(charges.std()), 4))
+
+
+def _process_pool(instance, nb_taches, max_workers=None):
+    """
+    Pool de processus recevant l'instance en lecture seule (initializer).
+    Processus démarrés par spawn, jamais par fork: un fork du serveur Streamlit
+    copierait dans les processus de calcul les sockets ouvertes du pool de connexions
+    et les verrous tenus par ses threads
+    """
+    return ProcessPoolExecutor(max_workers=max_workers or min(nb_taches, os.cpu_count() or 1),
+                               mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_init_worker, initargs=(instance,))
+
+
+def _init_worker(instance):
+    global _instance_partagee
+    _instance_partagee = instance
+
+
+def _run_seed(graine, budget_secondes):
+    """Une construction graine + recuit, exécutée dans un processus de calcul"""
+    instance = _instance_partagee
+    schedule = build_schedule(instance, seed=graine)
+    if budget_secondes > 0 and evaluate(instance, schedule)['total'] > 0:
+        schedule, _ = anneal(instance, schedule, budget_secondes=budget_secondes, seed=graine)
+    resultat = score(instance, schedule)
+    # L'instance n'est pas renvoyée: le processus parent a la sienne
+    schedule.instance = None
+    return graine, resultat, schedule
+
+
+def multi_start(instance, nb_departs=8, budget_secondes=5.0, max_workers=None, seed=None):
+    """
+    Lancer nb_departs constructions indépendantes (graines différentes) dans un
+    ProcessPoolExecutor et garder la meilleure selon score().
+    L'instance (tableaux NumPy) est sérialisée une seule fois par processus (initializer).
+    """
+    graines = [int(g) for g in np.random.SeedSequence(seed).generate_state(nb_departs)]
+    meilleure, meilleur_score, meilleure_graine = None, None, None
+    scores = []
+    with _process_pool(instance, nb_departs, max_workers) as pool:
+        futures = [pool.submit(_run_seed, graine, budget_secondes) for graine in graines]
+        for future in as_completed(futures):
+            graine, resultat, schedule = future.result()
+            scores.append(resultat)
+            if meilleur_score is None or resultat < meilleur_score:
+                meilleure, meilleur_score, meilleure_graine = schedule, resultat, graine
+
+    meilleure.instance = instance
+    return meilleure, {
+        'departs': nb_departs,
+        'graine': meilleure_graine,
+        'non_places': meilleur_score[0],
+        'violations': meilleur_score[1],
+        'ecart_type_charge': meilleur_score[2],
+        'scores': sorted(scores),
+    }
+
+
+# ==================== DÉCOMPOSITION PAR DÉPARTEMENT ====================
+
+def _solve_department(modules, part_capacite):
+    """
+    Colorer les jours des modules d'un département (sous-instance construite dans
+    le processus de calcul: graphe de conflits limité au département)
+    """
+    debut = time.time()
+    sous_instance = _instance_partagee.restrict(modules)
+    schedule = Schedule(sous_instance)
+    schedule.load_existing()
+    color_days(sous_instance, schedule, part_capacite=part_capacite)
+    jours = [(m, int(schedule.jour[i])) for i, m in enumerate(modules) if not schedule.fixe[i]]
+    raisons = {modules[i]: raison for i, raison in schedule.non_places.items()}
+    return jours, raisons, time.time() - debut
+
+
+def solve_by_department(instance, max_workers=None):
+    """
+    Planifier chaque département séparément et en parallèle (jours par DSatur sur
+    son propre graphe de conflits, avec une part des places proportionnelle à
+    son effectif), puis réconcilier sur l'instance complète:
+    conflits des étudiants inscrits dans plusieurs départements et dépassements
+    de places (repair_days), salles partagées et professeurs de tous les départements
+    (assign_rooms, assign_professors).
+    """
+    par_dept = {}
+    for m, dept_id in enumerate(instance.module_dept):
+        par_dept.setdefault(dept_id, []).append(m)
+
+    libres = ~np.zeros(instance.nb_modules, dtype=bool)
+    for _, module_id, *_ in instance.examens_existants:
+        libres[instance.module_index[module_id]] = False
+    demande = {dept_id: int(instance.effectifs[[m for m in modules if libres[m]]].sum())
+               for dept_id, modules in par_dept.items()}
+    demande_totale = max(sum(demande.values()), 1)
+
+    schedule = Schedule(instance)
+    schedule.load_existing()
+    temps = []
+    # Les plus gros départements d'abord: ils bornent la durée totale
+    ordre = sorted(par_dept, key=lambda dept_id: -len(par_dept[dept_id]))
+    with _process_pool(instance, len(ordre), max_workers) as pool:
+        futures = [pool.submit(_solve_department, par_dept[dept_id], demande[dept_id] / demande_totale)
+                   for dept_id in ordre]
+        for future in as_completed(futures):
+            jours, raisons, duree = future.result()
+            temps.append(duree)
+            for m, d in jours:
+                schedule.jour[m] = d
+            schedule.non_places.update(raisons)
+
+    # Réconciliation sur l'instance complète
+    reconcilies = repair_days(instance, schedule)
+    assign_rooms(instance, schedule)
+    assign_professors(instance, schedule)
+    return schedule, {
+        'departements': len(par_dept),
+        'reconcilies': len(reconcilies),
+        'temps_max_departement': round(max(temps, default=0.0), 2),
+    }
+
+
+# ==================== MODE ANYTIME ====================
+
+def anytime(instance, budget_secondes=30.0, seed=None, budget_recuit=2.0):
+    """
+    Générateur anytime: construction déterministe, puis tant que le budget le permet,
+    constructions aléatoires (+ recuit court si elles ont des violations).
+    Après chaque tentative, produit (meilleure solution, progression); l'appelant
+    peut s'arrêter à tout moment avec la meilleure solution rencontrée.
+    La recherche s'arrête avant le budget si la meilleure solution atteint la borne
+    inférieure du score: aucune tentative supplémentaire ne peut l'améliorer.
+    """
+    debut = time.time()
+    rng = np.random.default_rng(seed)
+    bornes = lower_bounds(instance, limite_secondes=min(2.0, budget_secondes / 10 or 0.1))
+    borne = score_bound(bornes)
+    meilleure = build_schedule(instance)
+    meilleur_score = score(instance, meilleure)
+    iteration = 0
+
+    def progression(candidat, ameliore):
+        return {
+            'iteration': iteration,
+            'ecoule': round(time.time() - debut, 2),
+            'budget': budget_secondes,
+            'non_places': meilleur_score[0],
+            'violations': meilleur_score[1],
+            'ecart_type_charge': meilleur_score[2],
+            'candidat': candidat,
+            'ameliore': ameliore,
+            'jours_min': bornes['jours_min'],
+            'borne': borne,
+            'borne_atteinte': meilleur_score <= borne,
+        }
+
+    yield meilleure, progression(meilleur_score, True)
+
+    while time.time() - debut < budget_secondes and meilleur_score > borne:
+        iteration += 1
+        reste = budget_secondes - (time.time() - debut)
+        candidate = build_schedule(instance, seed=int(rng.integers(2 ** 31)))
+        if evaluate(instance, candidate)['total'] > 0:
+            candidate, _ = anneal(instance, candidate, budget_secondes=min(budget_recuit, max(reste, 0.1)),
+                                  seed=int(rng.integers(2 ** 31)))
+        resultat = score(instance, candidate)
+        ameliore = resultat < meilleur_score
+        if ameliore:
+            meilleure, meilleur_score = candidate, resultat
+        yield meilleure, progression(resultat, ameliore)
+
+
+# ==================== RÉPARATION LOCALE ====================
+
+def neighbourhood(instance, schedule, modules):
+    """
+    Modules touchés par les modules donnés: mêmes étudiants le même jour,
+    même salle au même créneau, même surveillant le même jour
+    """
+    voisins = set()
+    for m in modules:
+        d, h, p = schedule.jour[m], schedule.heure[m], schedule.prof[m]
+        if d < 0:
+            continue
+        etudiants = instance.etudiants_du_module[m]
+        for autres in (instance.modules_de_etudiant[e] for e in etudiants):
+            voisins.update(int(a) for a in autres[schedule.jour[autres] == d])
+        meme_creneau = np.flatnonzero((schedule.jour == d) & (schedule.heure == h))
+        salles = set(schedule.rooms(m))
+        voisins.update(int(a) for a in meme_creneau if salles & set(schedule.rooms(a)))
+        if p >= 0:
+            voisins.update(int(a) for a in np.flatnonzero((schedule.prof == p) & (schedule.jour == d)))
+    voisins.update(int(m) for m in modules)
+    return voisins
+
+
+def repair(instance, schedule, modules=(), salles_exclues=(), garder_modifies=True,
+           budget_secondes=0.5, seed=None):
+    """
+    Réparation incrémentale à partir de la solution courante (démarrage à chaud):
+    seuls les examens du voisinage des modules modifiés (et ceux des salles
+    exclues) peuvent bouger, le reste de l'emploi du temps est figé.
+    Les examens d'une salle exclue sont d'abord réaffectés à une autre salle du même
+    jour (assign_rooms, puis assign_professors); sans solution ils restent en place.
+    garder_modifies: les modules modifiés restent où l'administrateur les a mis.
+    Retourne la solution réparée (non modifiée en place) et son évaluation.
+    """
+    travail = schedule.copy()
+    exclues = set(int(r) for r in salles_exclues)
+    dans_salle_exclue = [m for m in np.flatnonzero(travail.salle >= 0)
+                         if exclues & set(travail.rooms(m))]
+
+    if dans_salle_exclue:
+        travail.fixe[:] = True
+        for m in dans_salle_exclue:
+            travail.heure[m] = travail.salle[m] = travail.prof[m] = -1
+            travail.repartition.pop(m, None)
+            travail.fixe[m] = False
+        assign_rooms(instance, travail, salles_exclues=sorted(exclues))
+        assign_professors(instance, travail)
+        for m in dans_salle_exclue:
+            if m in travail.non_places:
+                # Pas d'autre salle ce jour-là: l'examen garde sa place
+                del travail.non_places[m]
+                travail.jour[m], travail.heure[m] = schedule.jour[m], schedule.heure[m]
+                travail.salle[m], travail.prof[m] = schedule.salle[m], schedule.prof[m]
+                travail.repartition.pop(m, None)
+                if m in schedule.repartition:
+                    travail.repartition[m] = list(schedule.repartition[m])
+
+    modifies = set(int(m) for m in modules)
+    mobiles = neighbourhood(instance, travail, modifies | set(dans_salle_exclue))
+    if garder_modifies:
+        mobiles -= modifies - set(dans_salle_exclue)
+
+    travail.fixe[:] = True
+    travail.fixe[list(mobiles)] = False
+    # Température basse: on cherche à résoudre les conflits, pas à explorer
+    reparee, resultat = anneal(instance, travail, budget_secondes=budget_secondes, seed=seed,
+                               temperature_initiale=2.0, salles_exclues=sorted(exclues))
+    reparee.fixe = schedule.fixe.copy()
+    resultat['mobiles'] = len(mobiles)
+    return reparee, resultat
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Vérification en mémoire des contraintes d'un examen avant insertion
+Équivalent des triggers (02_constraints_triggers_v2.sql, 06_examens_salles.sql)
+sur un instantané de l'emploi du temps, avec suggestions de créneaux et de salles
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from scheduler import (
+    HEURES_CRENEAUX,
+    MAX_EXAMENS_PAR_JOUR_PROF,
+    StudentDayOccupancy,
+    jours_ouvres,
+    salle_accepte,
+)
+
+# check_equite_surveillance: avertissement au-delà de 1,5 fois la moyenne
+SEUIL_EQUITE = 1.5
+
+
+def _chevauche(debut, fin, intervalles):
+    """Premier intervalle (debut, fin, module_id) qui chevauche [debut, fin[, None sinon"""
+    for autre_debut, autre_fin, module_id in intervalles:
+        if autre_debut < fin and debut < autre_fin:
+            return module_id
+    return None
+
+
+class ConstraintChecker:
+    """
+    Index en mémoire des examens actifs d'un instantané (instance.examens_existants):
+    occupation salles et professeurs par intervalles, examens par professeur et par jour,
+    matrice étudiants x jours. Une vérification ne fait aucune requête.
+    L'index suit les déplacements faits par l'appelant (remove puis add).
+    """
+
+    def __init__(self, instance):
+        self.instance = instance
+        self.occupation = StudentDayOccupancy(instance)
+        self.jours = dict(instance.jour_index)
+        self.salle_intervalles = {}
+        self.prof_intervalles = {}
+        self.prof_jour = {}
+        self.prof_charge = {}
+        self.examens = {}
+
+        salles_supp = {}
+        for examen_id, salle_id, _ in instance.salles_existantes:
+            salles_supp.setdefault(examen_id, set()).add(salle_id)
+
+        for examen_id, module_id, prof_id, salle_id, date_heure, duree in instance.examens_existants:
+            self.add(module_id, prof_id, {salle_id} | salles_supp.get(examen_id, set()), date_heure, duree)
+
+    @property
+    def modules_planifies(self):
+        return self.examens.keys()
+
+    def _jour(self, jour):
+        """Indice du jour dans la matrice d'occupation (colonne ajoutée pour un jour hors session)"""
+        d = self.jours.get(jour)
+        if d is None:
+            matrice = self.occupation.matrice
+            d = self.jours[jour] = matrice.shape[1]
+            self.occupation.matrice = np.hstack([matrice, np.zeros((len(matrice), 1), dtype=matrice.dtype)])
+        return d
+
+    def add(self, module_id, prof_id, salles, date_heure, duree_minutes):
+        """Indexer un examen (salles: toutes ses salles, principale comprise)"""
+        intervalle = (date_heure, date_heure + timedelta(minutes=duree_minutes), module_id)
+        for salle in salles:
+            self.salle_intervalles.setdefault(salle, []).append(intervalle)
+        self.prof_intervalles.setdefault(prof_id, []).append(intervalle)
+        cle = (prof_id, date_heure.date())
+        self.prof_jour[cle] = self.prof_jour.get(cle, 0) + 1
+        self.prof_charge[prof_id] = self.prof_charge.get(prof_id, 0) + 1
+        m = self.instance.module_index.get(module_id)
+        if m is not None:
+            self.occupation.place(m, self._jour(date_heure.date()))
+        self.examens[module_id] = (prof_id, set(salles), date_heure, duree_minutes)
+
+    def remove(self, module_id):
+        """Retirer l'examen d'un module de l'index; retourne (prof_id, salles, date_heure, duree_minutes)"""
+        prof_id, salles, date_heure, duree = examen = self.examens.pop(module_id)
+        for intervalles in [self.salle_intervalles[salle] for salle in salles] + [self.prof_intervalles[prof_id]]:
+            intervalles[:] = [i for i in intervalles if i[2] != module_id]
+        self.prof_jour[(prof_id, date_heure.date())] -= 1
+        self.prof_charge[prof_id] -= 1
+        if not self.prof_charge[prof_id]:
+            del self.prof_charge[prof_id]
+        m = self.instance.module_index.get(module_id)
+        if m is not None:
+            self.occupation.remove(m, self.jours[date_heure.date()])
+        return examen
+
+    def check(self, module_id, prof_id, salle_id, date_heure, duree_minutes, salles_supplementaires=()):
+        """
+        Toutes les contraintes violées par l'examen proposé:
+        [{'contrainte', 'bloquant', 'message'}], vide si l'insertion passera les triggers.
+        Les contraintes non bloquantes correspondent aux triggers qui n'émettent qu'un avertissement.
+        salles_supplementaires: autres salles d'un examen réparti (disponibilité vérifiée aussi)
+        """
+        inst = self.instance
+        violations = []
+
+        def violation(contrainte, message, bloquant=True):
+            violations.append({'contrainte': contrainte, 'bloquant': bloquant, 'message': message})
+
+        debut = date_heure
+        fin = debut + timedelta(minutes=duree_minutes)
+        m = inst.module_index.get(module_id)
+        r = inst.salle_index.get(salle_id)
+        p = inst.prof_index.get(prof_id)
+
+        # check_module_unique_examen
+        if module_id in self.modules_planifies:
+            violation('module', "Ce module a déjà un examen planifié")
+
+        # check_etudiant_daily_limit
+        d = self.jours.get(debut.date())
+        if m is not None and d is not None:
+            occupes = self.occupation.students_busy(m, d)
+            if occupes:
+                violation('etudiants', f"{occupes} étudiant(s) du module ont déjà un examen ce jour-là")
+
+        # check_salle_capacity (capacité bloquante, règle des 20 places en avertissement)
+        if r is not None and m is not None:
+            effectif = int(inst.effectifs[m])
+            capacite = int(inst.salle_capacites[r])
+            if effectif > capacite:
+                violation('capacite', f"La salle a une capacité de {capacite} places pour {effectif} étudiants")
+            elif not salle_accepte(inst.salle_types[r], capacite, effectif):
+                violation('capacite', f"Salle {inst.salle_types[r]}: 20 étudiants au plus hors amphithéâtre "
+                                      f"({effectif} inscrits)", bloquant=False)
+
+        # check_salle_disponibilite (salles principales et supplémentaires)
+        autre = _chevauche(debut, fin, self.salle_intervalles.get(salle_id, []))
+        if autre is not None:
+            violation('salle', f"La salle est occupée à cette heure (module {autre})")
+        for salle in salles_supplementaires:
+            autre = _chevauche(debut, fin, self.salle_intervalles.get(salle, []))
+            if autre is not None:
+                violation('salle', f"La salle {salle} est occupée à cette heure (module {autre})")
+
+        # check_professeur_daily_limit
+        deja = self.prof_jour.get((prof_id, debut.date()), 0)
+        if deja >= MAX_EXAMENS_PAR_JOUR_PROF:
+            violation('professeur', f"Le professeur a déjà {deja} examens ce jour-là "
+                                    f"(maximum {MAX_EXAMENS_PAR_JOUR_PROF})")
+
+        # Professeur dans deux salles à la fois (non vérifié par les triggers)
+        autre = _chevauche(debut, fin, self.prof_intervalles.get(prof_id, []))
+        if autre is not None:
+            violation('professeur', f"Le professeur surveille déjà un examen à cette heure (module {autre})",
+                      bloquant=False)
+
+        # check_professeur_departement (avertissement)
+        if p is not None and m is not None and inst.prof_dept[p] != inst.module_dept[m]:
+            violation('departement', "Le professeur n'est pas du département du module", bloquant=False)
+
+        # check_equite_surveillance (avertissement)
+        if self.prof_charge:
+            moyenne = sum(self.prof_charge.values()) / len(self.prof_charge)
+            charge = self.prof_charge.get(prof_id, 0) + 1
+            if charge > moyenne * SEUIL_EQUITE:
+                violation('equite', f"Le professeur aurait {charge} surveillances "
+                                    f"(moyenne {moyenne:.1f})", bloquant=False)
+
+        return violations
+
+    def free_rooms(self, module_id, date_heure, duree_minutes):
+        """Salles libres sur [date_heure, +durée[ qui respectent la règle de capacité, plus petites d'abord"""
+        inst = self.instance
+        m = inst.module_index.get(module_id)
+        if m is None:
+            return []
+        effectif = int(inst.effectifs[m])
+        fin = date_heure + timedelta(minutes=duree_minutes)
+        libres = [
+            (int(inst.salle_capacites[r]), salle_id)
+            for r, salle_id in enumerate(inst.salle_ids)
+            if salle_accepte(inst.salle_types[r], int(inst.salle_capacites[r]), effectif)
+            and _chevauche(date_heure, fin, self.salle_intervalles.get(salle_id, [])) is None
+        ]
+        return [salle_id for _, salle_id in sorted(libres)]
+
+    def suggest(self, module_id, prof_id, salle_id, date_heure, duree_minutes, nb_suggestions=5,
+                jours_autour=7):
+        """
+        Suggestions proches de la demande:
+        - salles: salles libres et adaptées au créneau demandé
+        - creneaux: [(date_heure, salle_id)] sans violation bloquante, par distance au créneau
+          demandé (jours ouvrés à +/- jours_autour), en gardant la salle demandée si elle est libre
+        """
+        salles = self.free_rooms(module_id, date_heure, duree_minutes)[:nb_suggestions]
+
+        debut_fenetre = date_heure.date() - timedelta(days=jours_autour)
+        candidats = [
+            datetime.combine(jour, datetime.strptime(heure, '%H:%M').time())
+            for jour in jours_ouvres(debut_fenetre, 2 * jours_autour + 1)
+            for heure in HEURES_CRENEAUX
+        ]
+        candidats.sort(key=lambda c: abs((c - date_heure).total_seconds()))
+
+        creneaux = []
+        for candidat in candidats:
+            if candidat == date_heure or candidat < datetime.now():
+                continue
+            libres = self.free_rooms(module_id, candidat, duree_minutes)
+            if not libres:
+                continue
+            salle = salle_id if salle_id in libres else libres[0]
+            violations = self.check(module_id, prof_id, salle, candidat, duree_minutes)
+            if not any(v['bloquant'] for v in violations):
+                creneaux.append((candidat, salle))
+                if len(creneaux) >= nb_suggestions:
+                    break
+
+        return {'salles': salles, 'creneaux': creneaux}
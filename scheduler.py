@@ -0,0 +1,1013 @@
+#!/usr/bin/env python3
+"""
+Moteur de planification des examens
+Graphe de conflits entre modules (étudiants partagés) + coloration DSatur des jours
+"""
+
+import heapq
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# ==================== PARAMÈTRES ====================
+
+# Heures de début des créneaux (cf. creneaux_horaires)
+HEURES_CRENEAUX = ['08:30', '10:45', '14:00', '16:15']
+# Écart entre deux créneaux consécutifs d'une même demi-journée
+ECART_CRENEAUX_MINUTES = 135
+
+MAX_EXAMENS_PAR_JOUR_PROF = 3
+CAPACITE_MAX_SALLE_NORMALE = 20
+STATUTS_ACTIFS = ('PROPOSE', 'VALIDE')
+
+
+def heures_pour_duree(duree_minutes):
+    """Créneaux utilisables sans chevauchement pour une durée d'examen donnée"""
+    if duree_minutes <= ECART_CRENEAUX_MINUTES:
+        return list(HEURES_CRENEAUX)
+    # Examens longs: un seul créneau par demi-journée
+    return [HEURES_CRENEAUX[0], HEURES_CRENEAUX[2]]
+
+
+def jours_ouvres(date_debut, nb_jours):
+    """Jours ouvrés (lundi-vendredi) sur nb_jours jours calendaires"""
+    jours = []
+    for i in range(nb_jours):
+        jour = date_debut + timedelta(days=i)
+        if jour.weekday() < 5:
+            jours.append(jour)
+    return jours
+
+
+def salle_accepte(type_salle, capacite, effectif):
+    """Règle de check_salle_capacity: capacité et 20 places max hors amphi"""
+    if effectif > capacite:
+        return False
+    if type_salle != 'AMPHI' and effectif > CAPACITE_MAX_SALLE_NORMALE:
+        return False
+    return True
+
+
+def places_utiles(salle_types, salle_capacites):
+    """Places réellement utilisables de chaque salle (20 au plus hors amphi)"""
+    amphi = np.array([t == 'AMPHI' for t in salle_types])
+    capacites = np.asarray(salle_capacites)
+    return np.where(amphi, capacites, np.minimum(capacites, CAPACITE_MAX_SALLE_NORMALE))
+
+
+# ==================== INSTANCE ====================
+
+class ScheduleInstance:
+    """
+    Données du problème, chargées une fois et indexées de 0 à n-1.
+
+    modules: [(id, nom, dept_id)]
+    inscriptions: [(etudiant_id, module_id)]
+    salles: [(id, nom, type, capacite)]
+    professeurs: [(id, dept_id)]
+    examens_existants: [(examen_id, module_id, prof_id, salle_id, date_heure, duree_minutes)]
+    salles_existantes: [(examen_id, salle_id, nb_places)] des examens répartis sur plusieurs salles
+    """
+
+    def __init__(self, modules, inscriptions, salles, professeurs, jours, heures,
+                 duree_minutes=120, examens_existants=None, salles_existantes=None):
+        examens_existants = examens_existants or []
+
+        # Modules (les modules déjà planifiés sont ajoutés s'ils manquent)
+        self.module_ids = [m[0] for m in modules]
+        self.module_noms = [m[1] for m in modules]
+        self.module_dept = [m[2] for m in modules]
+        self.module_index = {module_id: i for i, module_id in enumerate(self.module_ids)}
+
+        # Créneaux: jours x heures, étendus aux dates des examens existants
+        jours = sorted(set(jours) | {ex[4].date() for ex in examens_existants})
+        heures = sorted(set(heures) | {ex[4].strftime('%H:%M') for ex in examens_existants})
+        self.jours = jours
+        self.heures = heures
+        self.jour_index = {jour: d for d, jour in enumerate(jours)}
+        self.heure_index = {heure: h for h, heure in enumerate(heures)}
+        self.heure_minutes = np.array([int(heure[:2]) * 60 + int(heure[3:5]) for heure in heures],
+                                      dtype=np.int32)
+        self.duree_minutes = duree_minutes
+
+        # Durée de chaque examen: durée réelle des examens existants, duree_minutes sinon
+        self.durees = np.full(self.nb_modules, duree_minutes, dtype=np.int32)
+        for ex in examens_existants:
+            self.durees[self.module_index[ex[1]]] = ex[5]
+
+        # Salles et professeurs
+        self.salle_ids = [s[0] for s in salles]
+        self.salle_noms = [s[1] for s in salles]
+        self.salle_types = [s[2] for s in salles]
+        self.salle_capacites = np.array([s[3] for s in salles], dtype=np.int32)
+        self.salle_index = {salle_id: r for r, salle_id in enumerate(self.salle_ids)}
+        self.prof_ids = [p[0] for p in professeurs]
+        self.prof_dept = [p[1] for p in professeurs]
+        self.prof_index = {prof_id: p for p, prof_id in enumerate(self.prof_ids)}
+
+        self.examens_existants = examens_existants
+        self.salles_existantes = salles_existantes or []
+
+        self._build_inscriptions(inscriptions)
+        self._voisins = None
+
+    @property
+    def nb_modules(self):
+        return len(self.module_ids)
+
+    @property
+    def nb_jours(self):
+        return len(self.jours)
+
+    @property
+    def nb_heures(self):
+        return len(self.heures)
+
+    @property
+    def voisins(self):
+        """Graphe de conflits, construit au premier accès"""
+        if self._voisins is None:
+            self._voisins = self._build_conflict_graph()
+        return self._voisins
+
+    def _build_inscriptions(self, inscriptions):
+        """Index étudiants <-> modules sous forme de tableaux numpy"""
+        lignes = [(e, self.module_index[m]) for e, m in inscriptions if m in self.module_index]
+        if lignes:
+            data = np.array(lignes, dtype=np.int64)
+        else:
+            data = np.zeros((0, 2), dtype=np.int64)
+
+        self.etudiant_ids, etud_idx = np.unique(data[:, 0], return_inverse=True)
+        mod_idx = data[:, 1]
+        # Inscriptions à plat (une entrée par couple étudiant/module)
+        self.insc_etudiant = etud_idx.astype(np.int32)
+        self.insc_module = mod_idx.astype(np.int32)
+
+        ordre = np.argsort(mod_idx, kind='stable')
+        self.effectifs = np.bincount(mod_idx, minlength=self.nb_modules).astype(np.int32)
+        self.etudiants_du_module = np.split(etud_idx[ordre].astype(np.int32),
+                                            np.cumsum(self.effectifs)[:-1])
+
+        ordre = np.argsort(etud_idx, kind='stable')
+        nb_par_etudiant = np.bincount(etud_idx, minlength=len(self.etudiant_ids))
+        self.modules_de_etudiant = np.split(mod_idx[ordre].astype(np.int32),
+                                            np.cumsum(nb_par_etudiant)[:-1])
+
+    def _build_conflict_graph(self):
+        """
+        Graphe module-module: arête quand deux modules partagent un étudiant,
+        pondérée par le nombre d'étudiants partagés.
+        """
+        voisins = [dict() for _ in range(self.nb_modules)]
+        for modules in self.modules_de_etudiant:
+            if len(modules) < 2:
+                continue
+            liste = modules.tolist()
+            for i, a in enumerate(liste):
+                voisins_a = voisins[a]
+                for b in liste[i + 1:]:
+                    voisins_a[b] = voisins_a.get(b, 0) + 1
+                    voisins_b = voisins[b]
+                    voisins_b[a] = voisins_b.get(a, 0) + 1
+        return voisins
+
+    def date_heure(self, jour, heure):
+        """Timestamp texte d'un créneau (jour, heure)"""
+        return f"{self.jours[jour]} {self.heures[heure]}:00"
+
+    def overlapping_slots(self, m, heure):
+        """
+        Heures où un nouvel examen (duree_minutes) chevaucherait l'examen m commencé
+        à l'heure donnée: un examen long déborde sur les créneaux suivants
+        """
+        debut = self.heure_minutes[heure]
+        fin = debut + self.durees[m]
+        return np.flatnonzero((self.heure_minutes < fin) & (debut < self.heure_minutes + self.duree_minutes))
+
+    def restrict(self, modules):
+        """
+        Sous-instance limitée aux modules donnés (indices), avec les mêmes jours,
+        heures, salles et professeurs: les indices de jour et d'heure sont communs
+        """
+        garde = np.zeros(self.nb_modules, dtype=bool)
+        garde[modules] = True
+        ok = garde[self.insc_module]
+        module_ids = np.array(self.module_ids)
+        inscriptions = list(zip(self.etudiant_ids[self.insc_etudiant[ok]].tolist(),
+                                module_ids[self.insc_module[ok]].tolist()))
+        gardes = {self.module_ids[m] for m in modules}
+        examens_existants = [ex for ex in self.examens_existants if ex[1] in gardes]
+        examens_gardes = {ex[0] for ex in examens_existants}
+        return ScheduleInstance(
+            [(self.module_ids[m], self.module_noms[m], self.module_dept[m]) for m in modules],
+            inscriptions,
+            list(zip(self.salle_ids, self.salle_noms, self.salle_types, self.salle_capacites.tolist())),
+            list(zip(self.prof_ids, self.prof_dept)),
+            self.jours, self.heures,
+            duree_minutes=self.duree_minutes,
+            examens_existants=examens_existants,
+            salles_existantes=[es for es in self.salles_existantes if es[0] in examens_gardes]
+        )
+
+
+def load_instance(cursor, nb_examens=None, duree_minutes=120, nb_jours=14, date_debut=None,
+                  avec_existants=True):
+    """
+    Charger le problème depuis la base en quelques requêtes.
+    Les modules sans examen actif sont à planifier (nb_examens au plus),
+    les examens actifs existants sont chargés comme affectations fixes.
+    Sans avec_existants, les examens existants sont ignorés (ils seront supprimés
+    avant l'enregistrement): tous les modules sont à planifier.
+    """
+    cursor.execute("""
+        SELECT m.id, m.nom, f.dept_id
+        FROM modules m
+        JOIN formations f ON m.formation_id = f.id
+        WHERE NOT %s OR NOT EXISTS (
+            SELECT 1 FROM examens_planifies ep
+            WHERE ep.module_id = m.id AND ep.statut IN ('PROPOSE', 'VALIDE')
+        )
+        ORDER BY m.id
+        LIMIT %s
+    """, (avec_existants, nb_examens))
+    modules = cursor.fetchall()
+
+    existants = []
+    if avec_existants:
+        cursor.execute("""
+            SELECT ep.id, ep.module_id, ep.prof_id, ep.salle_id, ep.date_heure, ep.duree_minutes,
+                   m.nom, f.dept_id
+            FROM examens_planifies ep
+            JOIN modules m ON ep.module_id = m.id
+            JOIN formations f ON m.formation_id = f.id
+            WHERE ep.statut IN ('PROPOSE', 'VALIDE')
+        """)
+        existants = cursor.fetchall()
+    modules += [(ex[1], ex[6], ex[7]) for ex in existants]
+    examens_existants = [ex[:6] for ex in existants]
+
+    module_ids = [m[0] for m in modules]
+    cursor.execute(
+        "SELECT etudiant_id, module_id FROM inscriptions WHERE module_id = ANY(%s)",
+        (module_ids,)
+    )
+    inscriptions = cursor.fetchall()
+
+    cursor.execute("SELECT id, nom, type, capacite FROM lieu_examen ORDER BY capacite, id")
+    salles = cursor.fetchall()
+
+    salles_existantes = []
+    if avec_existants:
+        cursor.execute("""
+            SELECT es.examen_id, es.salle_id, es.nb_places
+            FROM examens_salles es
+            JOIN examens_planifies ep ON es.examen_id = ep.id
+            WHERE ep.statut IN ('PROPOSE', 'VALIDE')
+            ORDER BY es.examen_id, es.nb_places DESC
+        """)
+        salles_existantes = cursor.fetchall()
+
+    cursor.execute("SELECT id, dept_id FROM professeurs ORDER BY id")
+    professeurs = cursor.fetchall()
+
+    date_debut = date_debut or datetime.now().date() + timedelta(days=1)
+    return ScheduleInstance(
+        modules, inscriptions, salles, professeurs,
+        jours=jours_ouvres(date_debut, nb_jours),
+        heures=heures_pour_duree(duree_minutes),
+        duree_minutes=duree_minutes,
+        examens_existants=examens_existants,
+        salles_existantes=salles_existantes
+    )
+
+
+# ==================== SOLUTION ====================
+
+class Schedule:
+    """
+    Affectation (jour, heure, salle, professeur) de chaque module, -1 si non placé.
+    Un examen réparti a en plus repartition[m] = [(salle, nb_places)], salle principale en tête.
+    """
+
+    def __init__(self, instance):
+        n = instance.nb_modules
+        self.instance = instance
+        self.jour = np.full(n, -1, dtype=np.int32)
+        self.heure = np.full(n, -1, dtype=np.int32)
+        self.salle = np.full(n, -1, dtype=np.int32)
+        self.prof = np.full(n, -1, dtype=np.int32)
+        self.fixe = np.zeros(n, dtype=bool)
+        self.examen_id = [None] * n
+        self.repartition = {}
+        self.non_places = {}
+
+    def copy(self):
+        autre = Schedule.__new__(Schedule)
+        autre.instance = self.instance
+        autre.jour = self.jour.copy()
+        autre.heure = self.heure.copy()
+        autre.salle = self.salle.copy()
+        autre.prof = self.prof.copy()
+        autre.fixe = self.fixe.copy()
+        autre.examen_id = list(self.examen_id)
+        autre.repartition = {m: list(salles) for m, salles in self.repartition.items()}
+        autre.non_places = dict(self.non_places)
+        return autre
+
+    def load_existing(self):
+        """Placer les examens existants de l'instance comme affectations fixes"""
+        inst = self.instance
+        for examen_id, module_id, prof_id, salle_id, date_heure, _ in inst.examens_existants:
+            m = inst.module_index[module_id]
+            self.jour[m] = inst.jour_index[date_heure.date()]
+            self.heure[m] = inst.heure_index[date_heure.strftime('%H:%M')]
+            self.salle[m] = inst.salle_index.get(salle_id, -1)
+            self.prof[m] = inst.prof_index.get(prof_id, -1)
+            self.fixe[m] = True
+            self.examen_id[m] = examen_id
+
+        index = {examen_id: m for m, examen_id in enumerate(self.examen_id) if examen_id is not None}
+        for examen_id, salle_id, nb_places in inst.salles_existantes:
+            m, r = index.get(examen_id), inst.salle_index.get(salle_id)
+            if m is not None and r is not None:
+                self.repartition.setdefault(m, []).append((r, nb_places))
+        for m, salles in self.repartition.items():
+            # Salle principale en tête
+            salles.sort(key=lambda salle: salle[0] != self.salle[m])
+
+    def unplace(self, m, raison):
+        self.jour[m] = self.heure[m] = self.salle[m] = self.prof[m] = -1
+        self.repartition.pop(m, None)
+        self.non_places[m] = raison
+
+    def rooms(self, m):
+        """Indices de toutes les salles de l'examen m"""
+        if m in self.repartition:
+            return [r for r, _ in self.repartition[m]]
+        return [self.salle[m]] if self.salle[m] >= 0 else []
+
+    def is_complete(self, m):
+        return self.jour[m] >= 0 and self.heure[m] >= 0 and self.salle[m] >= 0 and self.prof[m] >= 0
+
+    def to_rows(self, duree_minutes=None):
+        """
+        Lignes (module_id, prof_id, salle_id, date_heure, duree, salles) des nouveaux examens placés,
+        salles = [(salle_id, nb_places)] pour un examen réparti, [] sinon
+        """
+        inst = self.instance
+        duree = duree_minutes or inst.duree_minutes
+        lignes = []
+        for m in range(inst.nb_modules):
+            if self.fixe[m] or not self.is_complete(m):
+                continue
+            lignes.append((
+                inst.module_ids[m],
+                inst.prof_ids[self.prof[m]],
+                inst.salle_ids[self.salle[m]],
+                inst.date_heure(self.jour[m], self.heure[m]),
+                duree,
+                [(inst.salle_ids[r], nb_places) for r, nb_places in self.repartition.get(m, [])]
+            ))
+        return lignes
+
+
+# ==================== OCCUPATION ÉTUDIANTS x JOURS ====================
+
+class StudentDayOccupancy:
+    """
+    Matrice étudiant x jour (uint8) du nombre d'examens de chaque étudiant,
+    équivalent en mémoire de check_etudiant_daily_limit: un module peut aller
+    le jour d si aucun de ses étudiants n'a déjà un examen ce jour-là.
+    """
+
+    def __init__(self, instance, schedule=None):
+        self.instance = instance
+        self.matrice = np.zeros((len(instance.etudiant_ids), instance.nb_jours), dtype=np.uint8)
+        if schedule is not None:
+            for m in np.flatnonzero(schedule.jour >= 0):
+                self.place(m, schedule.jour[m])
+
+    def place(self, m, d):
+        self.matrice[self.instance.etudiants_du_module[m], d] += 1
+
+    def remove(self, m, d):
+        self.matrice[self.instance.etudiants_du_module[m], d] -= 1
+
+    def can_place(self, m, d):
+        """Le module m peut-il aller le jour d (aucun étudiant déjà pris ce jour-là) ?"""
+        return not self.matrice[self.instance.etudiants_du_module[m], d].any()
+
+    def free_days(self, m):
+        """Masque des jours où aucun étudiant du module m n'a d'examen"""
+        return ~self.matrice[self.instance.etudiants_du_module[m]].any(axis=0)
+
+    def students_busy(self, m, d):
+        """Nombre d'étudiants du module m ayant déjà un examen le jour d"""
+        return int(np.count_nonzero(self.matrice[self.instance.etudiants_du_module[m], d]))
+
+
+# ==================== COLORATION DSATUR DES JOURS ====================
+
+def color_days(instance, schedule, rng=None, part_capacite=1.0):
+    """
+    Attribuer un jour à chaque module libre (DSatur): un jour = une couleur,
+    deux modules voisins dans le graphe de conflits ne partagent jamais un jour.
+    On prend d'abord le module le plus saturé (nombre de jours interdits),
+    puis le plus contraint (degré, effectif), et on lui donne le jour autorisé
+    le moins chargé pour étaler la session.
+    Avec un générateur rng, les égalités sont départagées au hasard et la charge
+    des jours est bruitée (jusqu'à 20 %), pour les départs multiples.
+    part_capacite: fraction des places disponible (sous-problème d'un département).
+    """
+    n, nb_jours = instance.nb_modules, instance.nb_jours
+    departage = rng.permutation(n) if rng is not None else np.arange(n)
+    voisins = instance.voisins
+    effectifs = instance.effectifs
+    capacites = instance.salle_capacites
+
+    # Capacité d'accueil par jour, en places utilisables (un gros module
+    # sans amphi libre est réparti sur plusieurs salles, cf. split_rooms)
+    places_max = int(places_utiles(instance.salle_types, capacites).sum() * instance.nb_heures * part_capacite)
+    places_jour = np.zeros(nb_jours, dtype=np.int64)
+
+    # Jours interdits par les voisins (pour l'ordre DSatur); la faisabilité
+    # elle-même est lue dans la matrice d'occupation étudiants x jours
+    occupation = StudentDayOccupancy(instance)
+    bloque = np.zeros((n, nb_jours), dtype=bool)
+    saturation = np.zeros(n, dtype=np.int32)
+
+    def colorer(m, d):
+        schedule.jour[m] = d
+        occupation.place(m, d)
+        places_jour[d] += effectifs[m]
+        for v in voisins[m]:
+            if not bloque[v, d]:
+                bloque[v, d] = True
+                saturation[v] += 1
+
+    for m in range(n):
+        if schedule.jour[m] >= 0:
+            colorer(m, schedule.jour[m])
+
+    a_placer = [m for m in range(n) if schedule.jour[m] < 0 and not schedule.fixe[m]]
+    tas = [(-saturation[m], -len(voisins[m]), -effectifs[m], departage[m], m) for m in a_placer]
+    heapq.heapify(tas)
+    restants = set(a_placer)
+
+    while tas:
+        sat, _, _, _, m = heapq.heappop(tas)
+        if m not in restants:
+            continue
+        if -sat != saturation[m]:
+            # Entrée périmée: la saturation a augmenté depuis
+            heapq.heappush(tas, (-saturation[m], -len(voisins[m]), -effectifs[m], departage[m], m))
+            continue
+        restants.discard(m)
+
+        sans_conflit = occupation.free_days(m)
+        autorises = sans_conflit & (places_jour + effectifs[m] <= places_max)
+        if not autorises.any():
+            if sans_conflit.any():
+                schedule.unplace(m, "Capacité des salles épuisée sur les jours possibles")
+            else:
+                schedule.unplace(m, "Aucun jour sans conflit étudiant")
+            continue
+
+        charge = places_jour if rng is None else places_jour * (1 + 0.2 * rng.random(nb_jours))
+        d = int(np.argmin(np.where(autorises, charge, np.inf)))
+        colorer(m, d)
+        for v in voisins[m]:
+            if v in restants:
+                heapq.heappush(tas, (-saturation[v], -len(voisins[v]), -effectifs[v], departage[v], v))
+
+    return occupation
+
+
+def repair_days(instance, schedule, modules=None):
+    """
+    Réparer les jours déjà attribués: un module non fixe dont un étudiant a un autre
+    examen le même jour, ou placé un jour dont les places sont dépassées, est
+    déplacé vers le jour sans conflit le moins chargé (ou retiré s'il n'y en a pas).
+    modules: modules à examiner (tous les modules non fixes placés par défaut).
+    Retourne la liste des modules déplacés ou retirés.
+    """
+    effectifs = instance.effectifs
+    places_max = int(places_utiles(instance.salle_types, instance.salle_capacites).sum()) * instance.nb_heures
+    occupation = StudentDayOccupancy(instance, schedule)
+    places_jour = np.zeros(instance.nb_jours, dtype=np.int64)
+    places = np.flatnonzero(schedule.jour >= 0)
+    np.add.at(places_jour, schedule.jour[places], effectifs[places])
+
+    if modules is None:
+        modules = [m for m in places if not schedule.fixe[m]]
+    # Les petits modules d'abord: les moins coûteux à déplacer
+    modules = sorted((m for m in modules if schedule.jour[m] >= 0 and not schedule.fixe[m]),
+                     key=lambda m: (effectifs[m], m))
+
+    def replacer(m):
+        d = schedule.jour[m]
+        occupation.remove(m, d)
+        places_jour[d] -= effectifs[m]
+        autorises = occupation.free_days(m) & (places_jour + effectifs[m] <= places_max)
+        autorises[d] = False
+        if not autorises.any():
+            schedule.unplace(m, "Aucun jour sans conflit étudiant")
+            return
+        d = int(np.argmin(np.where(autorises, places_jour, np.iinfo(np.int64).max)))
+        schedule.jour[m] = d
+        schedule.heure[m] = schedule.salle[m] = schedule.prof[m] = -1
+        schedule.repartition.pop(m, None)
+        occupation.place(m, d)
+        places_jour[d] += effectifs[m]
+
+    deplaces = []
+    for m in modules:
+        d = schedule.jour[m]
+        en_conflit = (occupation.matrice[instance.etudiants_du_module[m], d] > 1).any()
+        if en_conflit or places_jour[d] > places_max:
+            replacer(m)
+            deplaces.append(m)
+    return deplaces
+
+
+# ==================== CRÉNEAUX, SALLES, PROFESSEURS ====================
+
+# Pénalité d'un amphi donné à un module qui tiendrait dans une salle normale
+COUT_AMPHI_PETIT_MODULE = 200
+COUT_IMPOSSIBLE = 1e9
+
+
+def room_costs(effectifs, salle_types, salle_capacites):
+    """
+    Coût examen x salle: places perdues (capacite - effectif), plus une pénalité
+    si un amphi accueille un module de 20 étudiants ou moins; COUT_IMPOSSIBLE
+    si la règle de check_salle_capacity n'est pas respectée.
+    """
+    effectifs = np.asarray(effectifs)[:, None]
+    capacites = np.asarray(salle_capacites)[None, :]
+    amphi = np.array([t == 'AMPHI' for t in salle_types])[None, :]
+
+    cout = (capacites - effectifs).astype(np.float64)
+    cout += np.where(amphi & (effectifs <= CAPACITE_MAX_SALLE_NORMALE), COUT_AMPHI_PETIT_MODULE, 0)
+    possible = (effectifs <= capacites) & (amphi | (effectifs <= CAPACITE_MAX_SALLE_NORMALE))
+    return np.where(possible, cout, COUT_IMPOSSIBLE)
+
+
+def min_cost_assignment(cout):
+    """
+    Affectation de coût minimal lignes -> colonnes (algorithme hongrois avec potentiels,
+    boucle interne vectorisée). Retourne la colonne de chaque ligne, -1 si la ligne
+    ne peut être affectée qu'à un coût COUT_IMPOSSIBLE.
+    """
+    nb_lignes, nb_colonnes = cout.shape
+    if nb_lignes == 0:
+        return np.zeros(0, dtype=np.int64)
+    if nb_lignes > nb_colonnes:
+        # Colonnes fictives: les lignes en trop restent non affectées
+        fictives = np.full((nb_lignes, nb_lignes - nb_colonnes), COUT_IMPOSSIBLE)
+        cout = np.hstack([cout, fictives])
+    n, m = cout.shape
+
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    ligne_de = np.zeros(m + 1, dtype=np.int64)   # ligne (1..n) affectée à la colonne j, 0 sinon
+    chemin = np.zeros(m + 1, dtype=np.int64)
+
+    for i in range(1, n + 1):
+        ligne_de[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        utilisee = np.zeros(m + 1, dtype=bool)
+        while True:
+            utilisee[j0] = True
+            i0 = ligne_de[j0]
+            reduit = cout[i0 - 1] - u[i0] - v[1:]
+            libre = ~utilisee[1:]
+            mieux = libre & (reduit < minv[1:])
+            minv[1:][mieux] = reduit[mieux]
+            chemin[1:][mieux] = j0
+            candidats = np.where(libre, minv[1:], np.inf)
+            j1 = int(np.argmin(candidats)) + 1
+            delta = candidats[j1 - 1]
+            colonnes = np.flatnonzero(utilisee)
+            u[ligne_de[colonnes]] += delta
+            v[colonnes] -= delta
+            minv[1:][libre] -= delta
+            j0 = j1
+            if ligne_de[j0] == 0:
+                break
+        while j0:
+            j1 = chemin[j0]
+            ligne_de[j0] = ligne_de[j1]
+            j0 = j1
+
+    affectation = np.full(nb_lignes, -1, dtype=np.int64)
+    for j in range(1, nb_colonnes + 1):
+        i = ligne_de[j]
+        if i and cout[i - 1, j - 1] < COUT_IMPOSSIBLE:
+            affectation[i - 1] = j - 1
+    return affectation
+
+
+def match_rooms(effectifs, salle_types, salle_capacites, libres=None):
+    """
+    Affecter les examens d'un même créneau aux salles libres (couplage de coût minimal):
+    chaque examen reçoit la plus petite salle compatible sans gaspiller d'amphi.
+    Retourne l'indice de salle de chaque examen, -1 si aucune salle ne convient.
+    """
+    nb_salles = len(salle_capacites)
+    libres = np.arange(nb_salles) if libres is None else np.asarray(libres)
+    if not len(effectifs):
+        return np.zeros(0, dtype=np.int64)
+    if not len(libres):
+        return np.full(len(effectifs), -1, dtype=np.int64)
+
+    cout = room_costs(effectifs, [salle_types[r] for r in libres], np.asarray(salle_capacites)[libres])
+    # Colonnes inutiles pour tous les examens: on les retire avant le couplage
+    utiles = (cout < COUT_IMPOSSIBLE).any(axis=0)
+    if not utiles.any():
+        return np.full(len(effectifs), -1, dtype=np.int64)
+    colonnes = libres[utiles]
+    affectation = min_cost_assignment(cout[:, utiles])
+    return np.where(affectation >= 0, colonnes[np.maximum(affectation, 0)], -1)
+
+
+def split_rooms(effectif, salle_types, salle_capacites, libres=None):
+    """
+    Répartir un examen sur plusieurs salles libres d'un même créneau:
+    les plus grandes salles d'abord, la dernière remplacée par la plus petite
+    salle qui suffit pour le reste. Retourne [(salle, nb_places)], [] si impossible.
+    """
+    places = places_utiles(salle_types, salle_capacites)
+    libres = np.arange(len(places)) if libres is None else np.asarray(libres)
+    ordre = libres[np.argsort(-places[libres], kind='stable')]
+    if places[ordre].sum() < effectif:
+        return []
+
+    choisies, reste = [], int(effectif)
+    for i, r in enumerate(ordre):
+        if places[r] >= reste:
+            # Plus petite salle restante qui suffit pour terminer
+            suffisantes = [r2 for r2 in ordre[i:] if places[r2] >= reste]
+            r = min(suffisantes, key=lambda r2: places[r2])
+            choisies.append((int(r), reste))
+            return choisies
+        choisies.append((int(r), int(places[r])))
+        reste -= int(places[r])
+    return []
+
+
+def assign_rooms(instance, schedule, salles_exclues=()):
+    """
+    Étape salles, créneau par créneau:
+    1. répartir les modules de chaque jour sur les heures en équilibrant
+       la demande d'amphis (gros modules) et de salles (petits modules);
+    2. pour chaque créneau, couplage de coût minimal examens -> salles libres
+       (capacité, règle des 20 places hors amphi, plus petite salle adaptée);
+    3. les examens restés sans salle sont tentés sur les autres heures du jour,
+       puis répartis sur plusieurs salles de l'heure la moins remplie.
+    Les salles exclues (indices, salles indisponibles) ne sont jamais attribuées.
+    """
+    nb_jours, nb_heures = instance.nb_jours, instance.nb_heures
+    nb_salles = len(instance.salle_ids)
+    effectifs = instance.effectifs
+    amphi = np.array([t == 'AMPHI' for t in instance.salle_types])
+    occupee = np.zeros((nb_jours, nb_heures, nb_salles), dtype=bool)
+
+    places = places_utiles(instance.salle_types, instance.salle_capacites)
+    occupee[:, :, list(salles_exclues)] = True
+    for m in np.flatnonzero(schedule.salle >= 0):
+        # Toutes les heures couvertes par l'examen, pas seulement celle de son début
+        heures = instance.overlapping_slots(m, schedule.heure[m])
+        occupee[schedule.jour[m], heures[:, None], schedule.rooms(m)] = True
+
+    a_placer = [m for m in range(instance.nb_modules)
+                if schedule.jour[m] >= 0 and schedule.salle[m] < 0 and not schedule.fixe[m]]
+
+    par_jour = {}
+    for m in a_placer:
+        par_jour.setdefault(schedule.jour[m], []).append(m)
+
+    for d, modules in par_jour.items():
+        # 1. Répartition sur les heures
+        amphis_libres = (~occupee[d] & amphi).sum(axis=1)
+        salles_libres = (~occupee[d] & ~amphi).sum(axis=1)
+        par_heure = [[] for _ in range(nb_heures)]
+        for m in sorted(modules, key=lambda m: -effectifs[m]):
+            if effectifs[m] > CAPACITE_MAX_SALLE_NORMALE:
+                h = int(np.argmax(amphis_libres))
+                amphis_libres[h] -= 1
+            else:
+                h = int(np.argmax(salles_libres + amphis_libres))
+                if salles_libres[h] > 0:
+                    salles_libres[h] -= 1
+                else:
+                    amphis_libres[h] -= 1
+            par_heure[h].append(m)
+
+        # 2. Couplage par créneau
+        sans_salle = []
+        for h, modules_h in enumerate(par_heure):
+            if not modules_h:
+                continue
+            salles = match_rooms(effectifs[modules_h], instance.salle_types,
+                                 instance.salle_capacites, np.flatnonzero(~occupee[d, h]))
+            for m, r in zip(modules_h, salles):
+                if r >= 0:
+                    schedule.heure[m], schedule.salle[m] = h, r
+                    occupee[d, h, r] = True
+                else:
+                    sans_salle.append(m)
+
+        # 3. Reprise sur les autres heures du jour
+        for m in sorted(sans_salle, key=lambda m: -effectifs[m]):
+            for h in range(nb_heures):
+                r = match_rooms(effectifs[[m]], instance.salle_types,
+                                instance.salle_capacites, np.flatnonzero(~occupee[d, h]))[0]
+                if r >= 0:
+                    schedule.heure[m], schedule.salle[m] = h, r
+                    occupee[d, h, r] = True
+                    break
+            else:
+                # 4. Répartition sur plusieurs salles
+                places_libres = (~occupee[d] * places).sum(axis=1)
+                h = int(np.argmax(places_libres))
+                salles = split_rooms(effectifs[m], instance.salle_types, instance.salle_capacites,
+                                     np.flatnonzero(~occupee[d, h]))
+                if not salles:
+                    schedule.unplace(m, "Aucune salle assez grande disponible")
+                    continue
+                schedule.heure[m], schedule.salle[m] = h, salles[0][0]
+                schedule.repartition[m] = salles
+                occupee[d, h, [r for r, _ in salles]] = True
+
+    return schedule
+
+
+# ==================== FLOT DE COÛT MINIMAL ====================
+
+class MinCostFlow:
+    """
+    Flot de coût minimal (primal-dual): Dijkstra sur les coûts réduits par
+    des potentiels, puis flot bloquant (Dinic) sur les arcs de coût réduit nul.
+    Coûts entiers positifs; l'arc e a pour arc inverse e ^ 1.
+    """
+
+    def __init__(self, nb_noeuds):
+        self.nb_noeuds = nb_noeuds
+        self.adjacence = [[] for _ in range(nb_noeuds)]
+        self.vers = []
+        self.capacite = []
+        self.cout = []
+
+    def add_edge(self, u, v, capacite, cout):
+        """Ajouter l'arc u -> v et retourner son indice"""
+        e = len(self.vers)
+        self.adjacence[u].append(e)
+        self.adjacence[v].append(e + 1)
+        self.vers += [v, u]
+        self.capacite += [capacite, 0]
+        self.cout += [cout, -cout]
+        return e
+
+    def flow(self, e):
+        """Flot passant par l'arc e"""
+        return self.capacite[e ^ 1]
+
+    def solve(self, source, puits):
+        """Envoyer le flot maximal de coût minimal; retourne (flot, coût)"""
+        n = self.nb_noeuds
+        adjacence, vers, capacite, cout = self.adjacence, self.vers, self.capacite, self.cout
+        potentiel = [0] * n
+        flot_total = cout_total = 0
+        infini = float('inf')
+
+        while True:
+            # 1. Plus courts chemins (coûts réduits >= 0) et mise à jour des potentiels
+            dist = [infini] * n
+            dist[source] = 0
+            tas = [(0, source)]
+            while tas:
+                du, u = heapq.heappop(tas)
+                if du > dist[u]:
+                    continue
+                if u == puits:
+                    break
+                pu = potentiel[u]
+                for e in adjacence[u]:
+                    if capacite[e] > 0:
+                        v = vers[e]
+                        dv = du + cout[e] + pu - potentiel[v]
+                        if dv < dist[v]:
+                            dist[v] = dv
+                            heapq.heappush(tas, (dv, v))
+            d_puits = dist[puits]
+            if d_puits == infini:
+                break
+            for v in range(n):
+                potentiel[v] += min(dist[v], d_puits)
+
+            # 2. Flots bloquants sur le sous-graphe admissible (coût réduit nul)
+            while True:
+                niveau = [-1] * n
+                niveau[source] = 0
+                file = [source]
+                for u in file:
+                    pu = potentiel[u]
+                    for e in adjacence[u]:
+                        v = vers[e]
+                        if capacite[e] > 0 and niveau[v] < 0 and cout[e] + pu == potentiel[v]:
+                            niveau[v] = niveau[u] + 1
+                            file.append(v)
+                if niveau[puits] < 0:
+                    break
+
+                courant = [0] * n
+                while True:
+                    # Chemin augmentant en profondeur (itératif, pointeurs d'arc courant)
+                    chemin, u = [], source
+                    while u != puits:
+                        arcs = adjacence[u]
+                        while courant[u] < len(arcs):
+                            e = arcs[courant[u]]
+                            v = vers[e]
+                            if (capacite[e] > 0 and niveau[v] == niveau[u] + 1
+                                    and cout[e] + potentiel[u] == potentiel[v]):
+                                break
+                            courant[u] += 1
+                        if courant[u] == len(arcs):
+                            # Impasse: retirer u et reculer
+                            niveau[u] = -1
+                            if not chemin:
+                                break
+                            e = chemin.pop()
+                            u = vers[e ^ 1]
+                            courant[u] += 1
+                            continue
+                        chemin.append(e)
+                        u = v
+                    if u != puits:
+                        break
+                    goulot = min(capacite[e] for e in chemin)
+                    for e in chemin:
+                        capacite[e] -= goulot
+                        capacite[e ^ 1] += goulot
+                    flot_total += goulot
+                    cout_total += goulot * (potentiel[puits] - potentiel[source])
+
+        return flot_total, cout_total
+
+
+def invigilator_flow(examens, prof_dept, nb_jours, charge=None, charge_jour=None, occupe=None):
+    """
+    Affecter les surveillants en une passe par flot de coût minimal:
+    source -> groupe (département, jour, heure) -> professeur x créneau
+    -> professeur x jour (3 examens au plus) -> professeur -> puits.
+    Un professeur d'un autre département passe par un arc pénalisé, et le coût
+    marginal 2k-1 du k-ième examen d'un professeur minimise la somme des carrés
+    des charges (donc leur variance).
+
+    examens: [(dept_id, jour, heure)]; charge, charge_jour, occupe: surveillances déjà
+    attribuées (par professeur, professeur x jour, ensemble de (p, jour, heure)).
+    Retourne l'indice de professeur de chaque examen, -1 si aucun n'est disponible.
+    """
+    nb_profs = len(prof_dept)
+    charge = np.zeros(nb_profs, dtype=np.int64) if charge is None else charge
+    charge_jour = np.zeros((nb_profs, nb_jours), dtype=np.int64) if charge_jour is None else charge_jour
+    occupe = occupe or set()
+    affectation = [-1] * len(examens)
+    if not examens or not nb_profs:
+        return affectation
+
+    profs_par_dept = {}
+    for p, dept_id in enumerate(prof_dept):
+        profs_par_dept.setdefault(dept_id, []).append(p)
+
+    # Examens interchangeables: même département, même créneau
+    groupes = {}
+    for i, cle in enumerate(examens):
+        groupes.setdefault(cle, []).append(i)
+
+    noeuds = {}
+
+    def noeud(cle):
+        if cle not in noeuds:
+            noeuds[cle] = len(noeuds)
+        return noeuds[cle]
+
+    source, puits = noeud('source'), noeud('puits')
+    arcs = []  # (u, v, capacite, cout)
+    # Pénalité supérieure à tout gain d'équilibrage: le département prime
+    penalite = 2 * (int(charge.max()) + len(examens)) + 1
+
+    def creneau_prof(p, d, h):
+        """Nœud professeur x créneau, None si le professeur est pris ou au maximum ce jour-là"""
+        if (p, d, h) in occupe or charge_jour[p, d] >= MAX_EXAMENS_PAR_JOUR_PROF:
+            return None
+        cle = ('prof_creneau', p, d, h)
+        if cle not in noeuds:
+            arcs.append((noeud(cle), noeud(('prof_jour', p, d)), 1, 0))
+        return noeuds[cle]
+
+    arcs_groupe = {}
+    for (dept_id, d, h), membres in groupes.items():
+        g = noeud(('groupe', dept_id, d, h))
+        arcs.append((source, g, len(membres), 0))
+        for p in profs_par_dept.get(dept_id, []):
+            v = creneau_prof(p, d, h)
+            if v is not None:
+                arcs_groupe[len(arcs)] = (dept_id, d, h, p)
+                arcs.append((g, v, 1, 0))
+        # Professeurs de tous les départements, via un nœud commun au créneau
+        commun = ('commun', d, h)
+        if commun not in noeuds:
+            c = noeud(commun)
+            for p in range(nb_profs):
+                v = creneau_prof(p, d, h)
+                if v is not None:
+                    arcs_groupe[len(arcs)] = (None, d, h, p)
+                    arcs.append((c, v, 1, 0))
+        arcs_groupe[len(arcs)] = (dept_id, d, h, None)
+        arcs.append((g, noeuds[commun], len(membres), penalite))
+
+    for p in range(nb_profs):
+        libre = 0
+        for d in range(nb_jours):
+            if ('prof_jour', p, d) in noeuds:
+                reste = MAX_EXAMENS_PAR_JOUR_PROF - int(charge_jour[p, d])
+                arcs.append((noeuds[('prof_jour', p, d)], noeud(('prof', p)), reste, 0))
+                libre += reste
+        # Coût marginal convexe de la charge du professeur
+        for k in range(int(charge[p]) + 1, int(charge[p]) + min(libre, len(examens)) + 1):
+            arcs.append((noeuds[('prof', p)], puits, 1, 2 * k - 1))
+
+    flot = MinCostFlow(len(noeuds))
+    indices = [flot.add_edge(*arc) for arc in arcs]
+    flot.solve(source, puits)
+
+    # Décodage: professeurs reçus par chaque groupe (directement, puis via le nœud commun)
+    directs, communs, vers_commun = {}, {}, {}
+    for i, (dept_id, d, h, p) in arcs_groupe.items():
+        if not flot.flow(indices[i]):
+            continue
+        if p is None:
+            vers_commun[(dept_id, d, h)] = flot.flow(indices[i])
+        elif dept_id is None:
+            communs.setdefault((d, h), []).append(p)
+        else:
+            directs.setdefault((dept_id, d, h), []).append(p)
+
+    for cle, membres in groupes.items():
+        _, d, h = cle
+        profs = directs.get(cle, [])
+        reserve = communs.get((d, h), [])
+        for _ in range(vers_commun.get(cle, 0)):
+            profs.append(reserve.pop())
+        for i, p in zip(membres, profs):
+            affectation[i] = p
+
+    return affectation
+
+
+def assign_professors(instance, schedule):
+    """Affecter un surveillant à chaque examen placé (flot de coût minimal, cf. invigilator_flow)"""
+    nb_profs = len(instance.prof_ids)
+    charge = np.zeros(nb_profs, dtype=np.int64)
+    charge_jour = np.zeros((nb_profs, instance.nb_jours), dtype=np.int64)
+    occupe = set()
+
+    for m in np.flatnonzero(schedule.prof >= 0):
+        p, d = schedule.prof[m], schedule.jour[m]
+        charge[p] += 1
+        charge_jour[p, d] += 1
+        occupe.update((p, d, h) for h in instance.overlapping_slots(m, schedule.heure[m]).tolist())
+
+    a_placer = [m for m in range(instance.nb_modules)
+                if schedule.salle[m] >= 0 and schedule.prof[m] < 0 and not schedule.fixe[m]]
+    examens = [(instance.module_dept[m], schedule.jour[m], schedule.heure[m]) for m in a_placer]
+    affectation = invigilator_flow(examens, instance.prof_dept, instance.nb_jours,
+                                   charge, charge_jour, occupe)
+
+    for m, p in zip(a_placer, affectation):
+        if p < 0:
+            schedule.unplace(m, "Aucun professeur disponible")
+        else:
+            schedule.prof[m] = p
+
+    return schedule
+
+
+def build_schedule(instance, seed=None):
+    """
+    Construire un emploi du temps complet sans conflit étudiant.
+    Sans graine la construction est déterministe; une graine donne une variante
+    (ordre DSatur et choix des jours), cf. optimizer.multi_start.
+    """
+    schedule = Schedule(instance)
+    schedule.load_existing()
+    rng = np.random.default_rng(seed) if seed is not None else None
+    color_days(instance, schedule, rng)
+    assign_rooms(instance, schedule)
+    assign_professors(instance, schedule)
+    return schedule
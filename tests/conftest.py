@@ -0,0 +1,57 @@
+"""
+Petites instances aléatoires du problème de planification (sans base de données)
+"""
+
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+import scheduler
+
+DATE_DEBUT = date(2030, 1, 7)
+
+
+def creer_instance(seed=0, nb_modules=12, nb_etudiants=60, nb_salles=5, nb_profs=6,
+                   nb_existants=0, nb_jours=7, duree_minutes=120):
+    """
+    Instance aléatoire: 3 inscriptions par étudiant, 2 amphis et des salles de 20 places,
+    nb_existants examens déjà planifiés (durées de 90 à 180 minutes, conflits possibles)
+    """
+    rng = np.random.default_rng(seed)
+    modules = [(100 + i, f"Module {i}", 1 + i % 3) for i in range(nb_modules)]
+    inscriptions = [(e, 100 + int(i))
+                    for e in range(nb_etudiants)
+                    for i in rng.choice(nb_modules, 3, replace=False)]
+    salles = [(200 + r, f"Salle {r}", 'AMPHI' if r < 2 else 'SALLE', 120 if r < 2 else 20)
+              for r in range(nb_salles)]
+    professeurs = [(300 + p, 1 + p % 3) for p in range(nb_profs)]
+    jours = scheduler.jours_ouvres(DATE_DEBUT, nb_jours)
+    heures = scheduler.heures_pour_duree(duree_minutes)
+
+    existants = []
+    for k, i in enumerate(rng.choice(nb_modules, nb_existants, replace=False)):
+        jour = jours[int(rng.integers(len(jours)))]
+        heure = heures[int(rng.integers(len(heures)))]
+        existants.append((1000 + k, 100 + int(i), 300 + int(rng.integers(nb_profs)),
+                          200 + int(rng.integers(nb_salles)),
+                          datetime.combine(jour, datetime.strptime(heure, '%H:%M').time()),
+                          int(rng.choice([90, 120, 180]))))
+
+    return scheduler.ScheduleInstance(modules, inscriptions, salles, professeurs, jours, heures,
+                                      duree_minutes, existants)
+
+
+def placer_au_hasard(instance, schedule, rng):
+    """Placer les modules libres n'importe où (solution avec conflits)"""
+    for m in np.flatnonzero(~schedule.fixe).tolist():
+        schedule.jour[m] = rng.integers(instance.nb_jours)
+        schedule.heure[m] = rng.integers(instance.nb_heures)
+        schedule.salle[m] = rng.integers(len(instance.salle_ids))
+        schedule.prof[m] = rng.integers(len(instance.prof_ids))
+    return schedule
+
+
+@pytest.fixture
+def instance():
+    return creer_instance(seed=1, nb_existants=4)
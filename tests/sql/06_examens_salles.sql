@@ -0,0 +1,58 @@
+-- ============================================
+-- FICHIER: tests/sql/06_examens_salles.sql
+-- DESCRIPTION: Examens répartis sur plusieurs salles (06_examens_salles.sql)
+-- ============================================
+
+BEGIN;
+\ir donnees.sql
+
+-- Examen 9101 du module 4 (25 étudiants) en salle 2, réparti sur deux salles
+CREATE FUNCTION pg_temp.examen_reparti(p_debut TEXT)
+RETURNS TEXT AS $$
+    SELECT format('INSERT INTO examens_planifies (id, module_id, prof_id, salle_id, date_heure, duree_minutes, mode_generation, nb_salles) '
+                  'VALUES (9101, 4, 2, 2, %L, 120, ''MANUEL'', 2)', p_debut);
+$$ LANGUAGE sql;
+
+-- -------------------------------------------------
+-- 1. COHÉRENCE DES SALLES (trigger différé)
+-- -------------------------------------------------
+
+SELECT pg_temp.accepte('examen réparti et répartition des étudiants',
+    pg_temp.examen_reparti('2030-01-08 09:00'),
+    $$INSERT INTO examens_salles (examen_id, salle_id, nb_places) VALUES (9101, 2, 15), (9101, 4, 10)$$,
+    $$SELECT pg_temp.affirmer(repartir_etudiants(9101) = 25, 'tous les inscrits répartis')$$,
+    $$SELECT pg_temp.affirmer((SELECT COUNT(*) FROM repartition_etudiants
+                               WHERE examen_id = 9101 AND salle_id = 4) = 10, '10 étudiants au labo 4')$$);
+
+SELECT pg_temp.rejete('places insuffisantes', 'places',
+    pg_temp.examen_reparti('2030-01-08 09:00'),
+    $$INSERT INTO examens_salles (examen_id, salle_id, nb_places) VALUES (9101, 2, 15), (9101, 4, 5)$$);
+
+SELECT pg_temp.rejete('plus de 20 places hors amphithéâtre', 'accueillir',
+    pg_temp.examen_reparti('2030-01-08 09:00'),
+    $$INSERT INTO examens_salles (examen_id, salle_id, nb_places) VALUES (9101, 2, 21), (9101, 4, 4)$$);
+
+SELECT pg_temp.rejete('salle principale absente des salles de l''examen', 'salle principale',
+    pg_temp.examen_reparti('2030-01-08 09:00'),
+    $$INSERT INTO examens_salles (examen_id, salle_id, nb_places) VALUES (9101, 1, 15), (9101, 4, 10)$$);
+
+-- -------------------------------------------------
+-- 2. DISPONIBILITÉ DES SALLES SUPPLÉMENTAIRES
+-- -------------------------------------------------
+
+SELECT pg_temp.rejete('salle supplémentaire occupée par un autre examen', 'occup',
+    pg_temp.examen_reparti('2030-01-07 09:00'),
+    $$INSERT INTO examens_salles (examen_id, salle_id, nb_places) VALUES (9101, 2, 15), (9101, 1, 10)$$);
+
+SELECT pg_temp.accepte('examen réparti déplacé sur un créneau libre',
+    pg_temp.examen_reparti('2030-01-08 09:00'),
+    $$INSERT INTO examens_salles (examen_id, salle_id, nb_places) VALUES (9101, 2, 15), (9101, 4, 10)$$,
+    $$UPDATE examens_planifies SET date_heure = '2030-01-08 14:00' WHERE id = 9101$$);
+
+SELECT pg_temp.rejete('examen réparti déplacé sur une salle supplémentaire occupée', 'occup',
+    pg_temp.examen_reparti('2030-01-08 09:00'),
+    $$INSERT INTO examens_salles (examen_id, salle_id, nb_places) VALUES (9101, 2, 15), (9101, 4, 10)$$,
+    pg_temp.inserer(3, 1, 4, '2030-01-08 14:00'),
+    $$UPDATE examens_planifies SET date_heure = '2030-01-08 14:00' WHERE id = 9101$$);
+
+ROLLBACK;
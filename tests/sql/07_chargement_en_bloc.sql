@@ -0,0 +1,51 @@
+-- ============================================
+-- FICHIER: tests/sql/07_chargement_en_bloc.sql
+-- DESCRIPTION: Chargement en bloc validé au COMMIT (07_chargement_en_bloc.sql)
+-- Mêmes examens acceptés et rejetés que cas_communs.sql, triggers de ligne sautés
+-- ============================================
+
+BEGIN;
+\ir donnees.sql
+
+SELECT pg_temp.accepte('lot valide',
+    'SELECT debut_chargement_en_bloc()',
+    pg_temp.inserer(3, 2, 2, '2030-01-07 09:00'),
+    pg_temp.inserer(4, 2, 1, '2030-01-08 09:00'),
+    $$SELECT pg_temp.affirmer((SELECT COUNT(*) FROM examens_du_lot()) = 2, 'deux examens dans le lot')$$,
+    $$SELECT pg_temp.affirmer(NOT EXISTS (SELECT 1 FROM valider_examens_lot()), 'aucune violation')$$);
+
+SELECT pg_temp.accepte('hors chargement, le lot est vide',
+    pg_temp.inserer(3, 2, 2, '2030-01-07 09:00'),
+    $$SELECT pg_temp.affirmer(NOT EXISTS (SELECT 1 FROM examens_du_lot()), 'lot vide')$$);
+
+SELECT pg_temp.rejete('lot: deux examens le même jour pour des étudiants communs', '[ée]tudiant',
+    'SELECT debut_chargement_en_bloc()',
+    pg_temp.inserer(2, 2, 2, '2030-01-07 14:00'));
+
+SELECT pg_temp.rejete('lot: salle occupée', 'salle',
+    'SELECT debut_chargement_en_bloc()',
+    pg_temp.inserer(3, 2, 1, '2030-01-07 10:00'));
+
+SELECT pg_temp.rejete('lot: quatrième examen du jour d''un professeur', 'professeur',
+    'SELECT debut_chargement_en_bloc()',
+    pg_temp.inserer(8, 3, 4, '2030-01-09 16:00'));
+
+SELECT pg_temp.rejete('lot: 15 étudiants dans une salle de 10 places', 'capacit',
+    'SELECT debut_chargement_en_bloc()',
+    pg_temp.inserer(3, 2, 3, '2030-01-08 09:00'));
+
+-- Comme check_salle_capacity: plus de 20 étudiants hors amphithéâtre n'est pas une violation
+SELECT pg_temp.accepte('lot: 25 étudiants dans une salle de 20 places',
+    'SELECT debut_chargement_en_bloc()',
+    pg_temp.inserer(4, 2, 2, '2030-01-08 09:00'));
+
+SELECT pg_temp.rejete('lot: second examen actif d''un module', 'module',
+    'SELECT debut_chargement_en_bloc()',
+    pg_temp.inserer(1, 2, 2, '2030-01-08 09:00'));
+
+SELECT pg_temp.rejete('lot: deux examens du lot dans la même salle', 'salle',
+    'SELECT debut_chargement_en_bloc()',
+    pg_temp.inserer(3, 2, 4, '2030-01-08 09:00'),
+    pg_temp.inserer(4, 1, 4, '2030-01-08 10:00'));
+
+ROLLBACK;
@@ -0,0 +1,43 @@
+-- ============================================
+-- FICHIER: tests/sql/08_triggers_instruction.sql
+-- DESCRIPTION: Triggers par instruction (08_triggers_instruction.sql)
+-- ============================================
+
+BEGIN;
+\ir donnees.sql
+
+SELECT pg_temp.affirmer(NOT EXISTS (
+    SELECT 1 FROM pg_trigger
+    WHERE tgrelid = 'examens_planifies'::regclass
+    AND tgname IN ('trg_check_etudiant_daily_limit', 'trg_check_professeur_daily_limit',
+                   'trg_check_salle_capacity', 'trg_check_professeur_departement',
+                   'trg_check_salle_disponibilite', 'trg_check_equite_surveillance',
+                   'trg_check_duree_creneau', 'trg_check_module_unique_examen')
+), 'triggers de ligne trg_check_* supprimés');
+
+-- Une ligne invalide annule toute l'instruction
+SELECT pg_temp.rejete('insertion de plusieurs lignes dont une invalide', 'module',
+    $$INSERT INTO examens_planifies (module_id, prof_id, salle_id, date_heure, duree_minutes, mode_generation)
+      VALUES (3, 2, 2, '2030-01-08 09:00', 120, 'MANUEL'), (3, 2, 4, '2030-01-10 09:00', 120, 'MANUEL')$$);
+
+-- Validé sur l'état final de l'instruction: les triggers de ligne refusaient
+-- l'état intermédiaire (première salle déplacée encore occupée)
+SELECT pg_temp.accepte('échange des salles de deux examens simultanés',
+    pg_temp.inserer(8, 1, 4, '2030-01-09 08:30', 90),
+    $$UPDATE examens_planifies SET salle_id = CASE salle_id WHEN 2 THEN 4 ELSE 2 END
+      WHERE date_heure = '2030-01-09 08:30'$$,
+    $$SELECT pg_temp.affirmer((SELECT salle_id FROM examens_planifies WHERE id = 9002) = 4, 'examen 9002 en salle 4')$$);
+
+SELECT pg_temp.accepte('trois examens d''un professeur décalés d''un jour',
+    $$UPDATE examens_planifies SET date_heure = date_heure + INTERVAL '1 day' WHERE prof_id = 3$$);
+
+SELECT pg_temp.rejete('examen déplacé vers un jour complet du professeur', 'professeur',
+    pg_temp.inserer(8, 3, 4, '2030-01-10 09:00'),
+    $$UPDATE examens_planifies SET date_heure = '2030-01-09 16:00' WHERE module_id = 8$$);
+
+-- Avertissements seulement (département, équité, plus de 20 étudiants hors amphithéâtre)
+SELECT pg_temp.accepte('avertissements',
+    pg_temp.inserer(4, 1, 2, '2030-01-08 09:00'),
+    $$SELECT avertir_examens(ARRAY(SELECT id FROM examens_planifies))$$);
+
+ROLLBACK;
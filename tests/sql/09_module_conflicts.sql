@@ -0,0 +1,73 @@
+-- ============================================
+-- FICHIER: tests/sql/09_module_conflicts.sql
+-- DESCRIPTION: Table module_conflicts tenue à jour par triggers (09_module_conflicts.sql)
+-- ============================================
+
+BEGIN;
+\ir donnees.sql
+
+-- module_conflicts égale à l'auto-jointure de inscriptions (reconstruire_module_conflicts)
+CREATE FUNCTION pg_temp.module_conflicts_a_jour()
+RETURNS BOOLEAN AS $$
+    WITH attendu AS (
+        SELECT i1.module_id AS module_a, i2.module_id AS module_b, COUNT(*)::INTEGER AS shared_students
+        FROM inscriptions i1
+        JOIN inscriptions i2 ON i2.etudiant_id = i1.etudiant_id AND i2.module_id != i1.module_id
+        GROUP BY i1.module_id, i2.module_id
+    )
+    SELECT NOT EXISTS (
+        (SELECT * FROM attendu EXCEPT SELECT module_a, module_b, shared_students FROM module_conflicts)
+        UNION ALL
+        (SELECT module_a, module_b, shared_students FROM module_conflicts EXCEPT SELECT * FROM attendu)
+    );
+$$ LANGUAGE sql;
+
+SELECT pg_temp.affirmer((SELECT shared_students FROM module_conflicts WHERE module_a = 1 AND module_b = 2) = 6
+                        AND pg_temp.module_conflicts_a_jour(), 'données initiales: 6 étudiants communs aux modules 1 et 2');
+
+-- -------------------------------------------------
+-- 1. MISE À JOUR INCRÉMENTALE
+-- -------------------------------------------------
+
+SELECT pg_temp.accepte('inscriptions ajoutées',
+    'INSERT INTO inscriptions (etudiant_id, module_id) VALUES (71, 1), (72, 1), (21, 5)',
+    $$SELECT pg_temp.affirmer(pg_temp.module_conflicts_a_jour(), 'à jour')$$);
+
+SELECT pg_temp.accepte('inscription supprimée',
+    'DELETE FROM inscriptions WHERE etudiant_id = 5 AND module_id = 1',
+    $$SELECT pg_temp.affirmer(pg_temp.module_conflicts_a_jour(), 'à jour')$$);
+
+SELECT pg_temp.accepte('plus aucun étudiant commun',
+    'DELETE FROM inscriptions WHERE module_id = 2',
+    $$SELECT pg_temp.affirmer(NOT EXISTS (SELECT 1 FROM module_conflicts WHERE 2 IN (module_a, module_b))
+                              AND pg_temp.module_conflicts_a_jour(), 'paires du module 2 supprimées')$$);
+
+SELECT pg_temp.accepte('inscription déplacée vers un autre module',
+    'UPDATE inscriptions SET module_id = 3 WHERE etudiant_id = 6 AND module_id = 1',
+    $$SELECT pg_temp.affirmer(pg_temp.module_conflicts_a_jour(), 'à jour')$$);
+
+SELECT pg_temp.accepte('saisie de notes',
+    'UPDATE inscriptions SET note = 12 WHERE module_id = 1',
+    $$SELECT pg_temp.affirmer(pg_temp.module_conflicts_a_jour(), 'à jour')$$);
+
+SELECT pg_temp.accepte('inscriptions vidées',
+    'TRUNCATE inscriptions',
+    $$SELECT pg_temp.affirmer(NOT EXISTS (SELECT 1 FROM module_conflicts), 'table vide')$$);
+
+SELECT pg_temp.accepte('reconstruction complète',
+    'SELECT reconstruire_module_conflicts()',
+    $$SELECT pg_temp.affirmer(pg_temp.module_conflicts_a_jour(), 'reconstruction identique')$$);
+
+-- -------------------------------------------------
+-- 2. VÉRIFICATIONS PAR LECTURE DE LA TABLE
+-- -------------------------------------------------
+
+SELECT pg_temp.rejete('nouvel étudiant commun avec un examen du même jour', '[ée]tudiant',
+    'INSERT INTO inscriptions (etudiant_id, module_id) VALUES (21, 1)',
+    pg_temp.inserer(3, 2, 2, '2030-01-07 14:00'));
+
+SELECT pg_temp.accepte('plus d''étudiant commun avec l''examen du même jour',
+    'DELETE FROM inscriptions WHERE module_id = 2 AND etudiant_id BETWEEN 5 AND 10',
+    pg_temp.inserer(2, 2, 2, '2030-01-07 14:00'));
+
+ROLLBACK;
@@ -0,0 +1,73 @@
+-- ============================================
+-- FICHIER: tests/sql/10_conflits_actifs.sql
+-- DESCRIPTION: Table conflits_actifs tenue à jour par triggers (10_conflits_actifs.sql)
+-- Les triggers de contraintes laissent passer deux cas de conflit: un professeur sur deux
+-- examens simultanés, et un étudiant inscrit après la planification
+-- ============================================
+
+BEGIN;
+\ir donnees.sql
+
+-- conflits_actifs égale au recalcul sur tous les examens actifs (reconstruire_conflits_actifs)
+CREATE FUNCTION pg_temp.conflits_a_jour()
+RETURNS BOOLEAN AS $$
+    WITH attendu AS (
+        SELECT DISTINCT *
+        FROM conflits_des_examens(ARRAY(SELECT id FROM examens_planifies WHERE statut IN ('PROPOSE', 'VALIDE')))
+    )
+    SELECT NOT EXISTS (
+        (SELECT * FROM attendu
+         EXCEPT
+         SELECT type_conflit, ressource_id, examen1, examen2, nb_etudiants FROM conflits_actifs)
+        UNION ALL
+        (SELECT type_conflit, ressource_id, examen1, examen2, nb_etudiants FROM conflits_actifs
+         EXCEPT
+         SELECT * FROM attendu)
+    );
+$$ LANGUAGE sql;
+
+CREATE FUNCTION pg_temp.nb_conflits(p_type TEXT)
+RETURNS BIGINT AS $$
+    SELECT COUNT(*) FROM conflits_actifs WHERE type_conflit = p_type;
+$$ LANGUAGE sql;
+
+SELECT pg_temp.affirmer(NOT EXISTS (SELECT 1 FROM conflits_actifs), 'données initiales sans conflit');
+
+-- -------------------------------------------------
+-- 1. EXAMENS
+-- -------------------------------------------------
+
+SELECT pg_temp.accepte('professeur sur deux examens simultanés',
+    pg_temp.inserer(3, 1, 2, '2030-01-07 10:00'),
+    $$SELECT pg_temp.affirmer(pg_temp.nb_conflits('professeur') = 1
+                              AND pg_temp.conflits_a_jour(), 'conflit professeur enregistré')$$,
+    $$UPDATE examens_planifies SET date_heure = '2030-01-07 14:00' WHERE module_id = 3$$,
+    $$SELECT pg_temp.affirmer(NOT EXISTS (SELECT 1 FROM conflits_actifs), 'conflit résolu par le déplacement')$$);
+
+SELECT pg_temp.accepte('examen annulé',
+    pg_temp.inserer(3, 1, 2, '2030-01-07 10:00'),
+    $$UPDATE examens_planifies SET statut = 'ANNULE' WHERE module_id = 3$$,
+    $$SELECT pg_temp.affirmer(NOT EXISTS (SELECT 1 FROM conflits_actifs), 'plus de conflit')$$);
+
+-- -------------------------------------------------
+-- 2. INSCRIPTIONS (module_conflicts)
+-- -------------------------------------------------
+
+SELECT pg_temp.accepte('étudiant inscrit après la planification',
+    pg_temp.inserer(3, 2, 2, '2030-01-07 14:00'),
+    'INSERT INTO inscriptions (etudiant_id, module_id) VALUES (21, 1), (22, 1)',
+    $$SELECT pg_temp.affirmer((SELECT nb_etudiants FROM conflits_actifs WHERE type_conflit = 'etudiant') = 2
+                              AND pg_temp.conflits_a_jour(), 'conflit étudiant de 2 étudiants')$$,
+    'DELETE FROM inscriptions WHERE etudiant_id = 21 AND module_id = 1',
+    $$SELECT pg_temp.affirmer((SELECT nb_etudiants FROM conflits_actifs WHERE type_conflit = 'etudiant') = 1
+                              AND pg_temp.conflits_a_jour(), 'conflit étudiant de 1 étudiant')$$,
+    'DELETE FROM inscriptions WHERE etudiant_id = 22 AND module_id = 1',
+    $$SELECT pg_temp.affirmer(pg_temp.nb_conflits('etudiant') = 0, 'conflit étudiant supprimé')$$);
+
+SELECT pg_temp.accepte('reconstruction complète',
+    pg_temp.inserer(3, 1, 2, '2030-01-07 10:00'),
+    'INSERT INTO inscriptions (etudiant_id, module_id) VALUES (21, 1)',
+    $$SELECT pg_temp.affirmer(reconstruire_conflits_actifs() = 2, 'conflits professeur et étudiant')$$,
+    $$SELECT pg_temp.affirmer(pg_temp.conflits_a_jour(), 'reconstruction identique')$$);
+
+ROLLBACK;
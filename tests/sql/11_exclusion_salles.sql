@@ -0,0 +1,58 @@
+-- ============================================
+-- FICHIER: tests/sql/11_exclusion_salles.sql
+-- DESCRIPTION: Contrainte d'exclusion des salles principales (11_exclusion_salles.sql)
+-- ============================================
+
+BEGIN;
+\ir donnees.sql
+
+SELECT pg_temp.affirmer(EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'excl_salle_periode'),
+                        'contrainte excl_salle_periode installée');
+
+-- Avec 08, les salles supplémentaires sont vérifiées par les triggers par instruction
+SELECT pg_temp.affirmer(NOT EXISTS (SELECT 1 FROM pg_trigger
+                                    WHERE tgname = 'trg_check_salle_disponibilite'
+                                    AND tgrelid = 'examens_planifies'::regclass),
+                        'pas de trigger de ligne trg_check_salle_disponibilite avec 08');
+
+SELECT pg_temp.affirmer((SELECT periode FROM examens_planifies WHERE id = 9001)
+                        = tsrange('2030-01-07 09:00', '2030-01-07 11:00'), 'période [début, fin[ de l''examen 9001');
+
+SELECT pg_temp.rejete('salle principale occupée', 'excl_salle_periode',
+    pg_temp.inserer(3, 2, 1, '2030-01-07 10:00'));
+
+-- Sans 08 (trigger de ligne recréé par 11): la salle principale est vérifiée par la
+-- contrainte, les salles supplémentaires par check_salle_disponibilite
+CREATE FUNCTION pg_temp.sans_08()
+RETURNS VOID AS $$
+BEGIN
+    DROP TRIGGER trg_verifier_examens_insert ON examens_planifies;
+    DROP TRIGGER trg_verifier_examens_update ON examens_planifies;
+    CREATE TRIGGER trg_check_salle_disponibilite
+    BEFORE INSERT OR UPDATE ON examens_planifies
+    FOR EACH ROW
+    WHEN (NEW.statut IN ('PROPOSE', 'VALIDE') AND NOT chargement_en_bloc())
+    EXECUTE FUNCTION check_salle_disponibilite();
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT pg_temp.rejete('sans 08: salle principale occupée', 'excl_salle_periode',
+    'SELECT pg_temp.sans_08()',
+    pg_temp.inserer(3, 2, 1, '2030-01-07 10:00'));
+
+SELECT pg_temp.rejete('sans 08: examen réparti déplacé sur une salle supplémentaire occupée', 'occupée',
+    'SELECT pg_temp.sans_08()',
+    $$INSERT INTO examens_planifies (id, module_id, prof_id, salle_id, date_heure, duree_minutes, mode_generation, nb_salles)
+      VALUES (9101, 4, 2, 2, '2030-01-08 09:00', 120, 'MANUEL', 2)$$,
+    $$INSERT INTO examens_salles (examen_id, salle_id, nb_places) VALUES (9101, 2, 15), (9101, 4, 10)$$,
+    pg_temp.inserer(3, 1, 4, '2030-01-08 14:00'),
+    $$UPDATE examens_planifies SET date_heure = '2030-01-08 14:00' WHERE id = 9101$$);
+
+SELECT pg_temp.accepte('sans 08: examen réparti déplacé sur un créneau libre',
+    'SELECT pg_temp.sans_08()',
+    $$INSERT INTO examens_planifies (id, module_id, prof_id, salle_id, date_heure, duree_minutes, mode_generation, nb_salles)
+      VALUES (9101, 4, 2, 2, '2030-01-08 09:00', 120, 'MANUEL', 2)$$,
+    $$INSERT INTO examens_salles (examen_id, salle_id, nb_places) VALUES (9101, 2, 15), (9101, 4, 10)$$,
+    $$UPDATE examens_planifies SET date_heure = '2030-01-08 14:00' WHERE id = 9101$$);
+
+ROLLBACK;
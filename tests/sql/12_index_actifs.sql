@@ -0,0 +1,30 @@
+-- ============================================
+-- FICHIER: tests/sql/12_index_actifs.sql
+-- DESCRIPTION: Index partiels sur les examens actifs (12_index_actifs.sql)
+-- CREATE INDEX CONCURRENTLY: un index invalide (construction interrompue) est ignoré
+-- par le planificateur mais reste présent; IF NOT EXISTS ne le reconstruit pas
+-- ============================================
+
+BEGIN;
+\ir donnees.sql
+
+SELECT pg_temp.affirmer((
+    SELECT COUNT(*)
+    FROM pg_index x
+    JOIN pg_class i ON i.oid = x.indexrelid
+    WHERE x.indrelid = 'examens_planifies'::regclass
+    AND i.relname IN ('idx_examens_actifs_salle_date', 'idx_examens_actifs_prof_jour',
+                      'idx_examens_actifs_module', 'idx_examens_actifs_date')
+    AND x.indisvalid
+    AND pg_get_expr(x.indpred, x.indrelid) LIKE '%PROPOSE%VALIDE%'
+) = 4, 'quatre index partiels valides sur les examens actifs');
+
+-- Les index ne changent pas les contraintes: cas_communs.sql est rejoué après 12
+SELECT pg_temp.accepte('examens décalés d''une semaine',
+    $$UPDATE examens_planifies SET date_heure = date_heure + INTERVAL '7 days'$$,
+    $$SELECT pg_temp.affirmer((SELECT COUNT(*) FROM examens_planifies
+                               WHERE statut IN ('PROPOSE', 'VALIDE')
+                               AND date_heure >= '2030-01-14' AND date_heure < '2030-01-19') = 4,
+                              'examens actifs relus par plage de dates')$$);
+
+ROLLBACK;
@@ -0,0 +1,37 @@
+-- ============================================
+-- FICHIER: tests/sql/13_vues_kpi.sql
+-- DESCRIPTION: Vues matérialisées des tableaux de bord (13_vues_kpi.sql)
+-- ============================================
+
+BEGIN;
+\ir donnees.sql
+
+SELECT pg_temp.accepte('rafraîchissement après planification',
+    'SELECT rafraichir_vues_kpi()',
+    $$SELECT pg_temp.affirmer((SELECT nb_examens FROM mv_occupation_salles WHERE salle_id = 2) = 3
+                              AND (SELECT nb_examens FROM mv_occupation_salles WHERE salle_id = 3) = 0,
+                              'occupation des salles')$$,
+    $$SELECT pg_temp.affirmer((SELECT nb_examens FROM mv_charge_professeurs WHERE prof_id = 3) = 3
+                              AND NOT EXISTS (SELECT 1 FROM mv_charge_professeurs WHERE prof_id = 2),
+                              'charge des professeurs')$$,
+    $$SELECT pg_temp.affirmer((SELECT nb_examens FROM mv_examens_par_jour
+                               WHERE dept_id = 1 AND jour = '2030-01-09') = 3, 'examens par jour')$$,
+    $$SELECT pg_temp.affirmer((SELECT SUM(nb_examens) FROM mv_distribution_horaire) = 4, 'distribution horaire')$$,
+    $$SELECT pg_temp.affirmer((SELECT COUNT(*) FROM kpi_fraicheur WHERE rafraichi_le >= now()) = 5,
+                              'cinq vues rafraîchies dans la transaction')$$);
+
+SELECT pg_temp.accepte('examen annulé',
+    $$UPDATE examens_planifies SET statut = 'ANNULE' WHERE id = 9001$$,
+    'SELECT rafraichir_vues_kpi()',
+    $$SELECT pg_temp.affirmer((SELECT nb_examens FROM mv_occupation_salles WHERE salle_id = 1) = 0,
+                              'examen annulé retiré après rafraîchissement')$$);
+
+-- Conflit professeur (10_conflits_actifs.sql) entre un module du département 1 et un du département 2
+SELECT pg_temp.accepte('conflits par département',
+    pg_temp.inserer(3, 1, 2, '2030-01-07 10:00'),
+    'SELECT rafraichir_vues_kpi()',
+    $$SELECT pg_temp.affirmer((SELECT COUNT(*) FROM mv_conflits_par_departement
+                               WHERE nb_conflits = 1 AND examens_en_conflit = 1) = 2,
+                              'un conflit dans chaque département')$$);
+
+ROLLBACK;
@@ -0,0 +1,81 @@
+-- ============================================
+-- FICHIER: tests/sql/cas_communs.sql
+-- DESCRIPTION: Examens acceptés et rejetés par les contraintes de 02_constraints_triggers_v2.sql
+-- Exécuté après 02 puis après chaque migration: les triggers de ligne, les triggers
+-- par instruction (08), module_conflicts (09) et la contrainte d'exclusion (11)
+-- doivent accepter et rejeter les mêmes examens
+-- ============================================
+
+BEGIN;
+\ir donnees.sql
+
+-- -------------------------------------------------
+-- 1. ÉTUDIANTS
+-- -------------------------------------------------
+
+SELECT pg_temp.accepte('même jour, autre salle, aucun étudiant commun',
+    pg_temp.inserer(3, 2, 2, '2030-01-07 09:00'));
+
+SELECT pg_temp.rejete('deux examens le même jour pour des étudiants communs', '[ée]tudiant',
+    pg_temp.inserer(2, 2, 2, '2030-01-07 14:00'));
+
+-- -------------------------------------------------
+-- 2. SALLES
+-- -------------------------------------------------
+
+SELECT pg_temp.rejete('salle occupée', 'salle',
+    pg_temp.inserer(3, 2, 1, '2030-01-07 10:00'));
+
+SELECT pg_temp.accepte('salle libérée à la fin de l''examen précédent',
+    pg_temp.inserer(3, 2, 1, '2030-01-07 11:00'));
+
+SELECT pg_temp.accepte('salle d''un examen annulé',
+    $$UPDATE examens_planifies SET statut = 'ANNULE' WHERE id = 9001$$,
+    pg_temp.inserer(3, 2, 1, '2030-01-07 09:00'));
+
+SELECT pg_temp.accepte('examen déplacé sur une partie de son propre créneau',
+    $$UPDATE examens_planifies SET date_heure = '2030-01-07 09:30' WHERE id = 9001$$);
+
+SELECT pg_temp.rejete('examen déplacé dans une salle occupée', 'salle',
+    $$UPDATE examens_planifies SET date_heure = '2030-01-09 09:00' WHERE id = 9003$$);
+
+-- -------------------------------------------------
+-- 3. CAPACITÉ
+-- -------------------------------------------------
+
+SELECT pg_temp.rejete('15 étudiants dans une salle de 10 places', 'capacit',
+    pg_temp.inserer(3, 2, 3, '2030-01-08 09:00'));
+
+-- Plus de 20 étudiants hors amphithéâtre: avertissement seulement
+SELECT pg_temp.accepte('25 étudiants dans une salle de 20 places',
+    pg_temp.inserer(4, 2, 2, '2030-01-08 09:00'));
+
+SELECT pg_temp.accepte('25 étudiants à l''amphithéâtre',
+    pg_temp.inserer(4, 2, 1, '2030-01-08 09:00'));
+
+-- -------------------------------------------------
+-- 4. PROFESSEURS, MODULES, CRÉNEAUX
+-- -------------------------------------------------
+
+SELECT pg_temp.rejete('quatrième examen du jour d''un professeur', 'professeur',
+    pg_temp.inserer(8, 3, 4, '2030-01-09 16:00'));
+
+SELECT pg_temp.accepte('un examen annulé ne compte pas dans les examens du jour',
+    $$UPDATE examens_planifies SET statut = 'ANNULE' WHERE id = 9004$$,
+    pg_temp.inserer(8, 3, 4, '2030-01-09 16:00'));
+
+SELECT pg_temp.rejete('second examen actif d''un module', 'module',
+    pg_temp.inserer(1, 2, 2, '2030-01-08 09:00'));
+
+SELECT pg_temp.rejete('durée supérieure au créneau', 'dur',
+    $$INSERT INTO examens_planifies (module_id, prof_id, salle_id, creneau_id, date_heure, duree_minutes, mode_generation)
+      VALUES (3, 2, 2, 1, '2030-01-10 08:30', 180, 'AUTO')$$);
+
+SELECT pg_temp.accepte('durée égale au créneau',
+    $$INSERT INTO examens_planifies (module_id, prof_id, salle_id, creneau_id, date_heure, duree_minutes, mode_generation)
+      VALUES (3, 2, 2, 1, '2030-01-10 08:30', 120, 'AUTO')$$);
+
+SELECT pg_temp.accepte('modification sans effet sur les contraintes',
+    $$UPDATE examens_planifies SET priorite = 2 WHERE id = 9001$$);
+
+ROLLBACK;
@@ -0,0 +1,133 @@
+-- ============================================
+-- FICHIER: tests/sql/donnees.sql
+-- DESCRIPTION: Données minimales et fonctions de vérification des tests de fumée
+-- Inclus (\ir) après le BEGIN de chaque script de tests/sql; le script se termine
+-- par ROLLBACK: la base de test reste vide entre deux scripts
+-- ============================================
+
+-- -------------------------------------------------
+-- 1. FONCTIONS DE VÉRIFICATION
+-- -------------------------------------------------
+
+-- Message d'erreur des instructions exécutées dans l'ordre, NULL si elles sont acceptées.
+-- La sous-transaction est toujours annulée: chaque cas part des mêmes données. Les triggers
+-- différés (06, 07) sont déclenchés comme au COMMIT (SET CONSTRAINTS ALL IMMEDIATE)
+CREATE FUNCTION pg_temp.erreur(p_instructions TEXT[])
+RETURNS TEXT AS $$
+DECLARE
+    v_instruction TEXT;
+BEGIN
+    FOREACH v_instruction IN ARRAY p_instructions LOOP
+        EXECUTE v_instruction;
+    END LOOP;
+    SET CONSTRAINTS ALL IMMEDIATE;
+    RAISE SQLSTATE 'ZZ000';
+EXCEPTION
+    WHEN SQLSTATE 'ZZ000' THEN
+        RETURN NULL;
+    WHEN OTHERS THEN
+        RETURN SQLERRM;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION pg_temp.accepte(p_cas TEXT, VARIADIC p_instructions TEXT[])
+RETURNS VOID AS $$
+DECLARE
+    v_erreur TEXT := pg_temp.erreur(p_instructions);
+BEGIN
+    IF v_erreur IS NOT NULL THEN
+        RAISE EXCEPTION 'ÉCHEC (%): rejeté: %', p_cas, v_erreur;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- p_motif: expression régulière (insensible à la casse) attendue dans le message d'erreur
+CREATE FUNCTION pg_temp.rejete(p_cas TEXT, p_motif TEXT, VARIADIC p_instructions TEXT[])
+RETURNS VOID AS $$
+DECLARE
+    v_erreur TEXT := pg_temp.erreur(p_instructions);
+BEGIN
+    IF v_erreur IS NULL THEN
+        RAISE EXCEPTION 'ÉCHEC (%): accepté', p_cas;
+    ELSIF v_erreur !~* p_motif THEN
+        RAISE EXCEPTION 'ÉCHEC (%): rejeté pour une autre raison: %', p_cas, v_erreur;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Vérification dans un cas (SELECT pg_temp.affirmer(...)) ou directement dans le script
+CREATE FUNCTION pg_temp.affirmer(p_condition BOOLEAN, p_message TEXT)
+RETURNS VOID AS $$
+BEGIN
+    IF p_condition IS NOT TRUE THEN
+        RAISE EXCEPTION 'ÉCHEC: %', p_message;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- INSERT d'un examen manuel proposé
+CREATE FUNCTION pg_temp.inserer(p_module INTEGER, p_prof INTEGER, p_salle INTEGER, p_debut TEXT,
+                                p_duree INTEGER DEFAULT 120)
+RETURNS TEXT AS $$
+    SELECT format('INSERT INTO examens_planifies (module_id, prof_id, salle_id, date_heure, duree_minutes, mode_generation) '
+                  'VALUES (%s, %s, %s, %L, %s, ''MANUEL'')', p_module, p_prof, p_salle, p_debut, p_duree);
+$$ LANGUAGE sql;
+
+-- -------------------------------------------------
+-- 2. DONNÉES
+-- -------------------------------------------------
+
+INSERT INTO departements (id, nom) VALUES (1, 'Informatique'), (2, 'Chimie');
+
+INSERT INTO formations (id, nom, dept_id, nb_modules) VALUES
+    (1, 'Licence Informatique', 1, 6),
+    (2, 'Licence Chimie', 2, 6);
+
+-- Modules 1 à 8: 1 et 2 ont 6 étudiants communs (5 à 10), les autres aucun;
+-- module 3: 15 étudiants, module 4: 25 étudiants, modules 5 à 8: 2 étudiants
+INSERT INTO modules (id, nom, credits, formation_id) VALUES
+    (1, 'Algèbre', 4, 1),
+    (2, 'Analyse', 4, 1),
+    (3, 'Chimie organique', 4, 2),
+    (4, 'Chimie générale', 4, 2),
+    (5, 'Réseaux', 3, 1),
+    (6, 'Systèmes', 3, 1),
+    (7, 'Compilation', 3, 1),
+    (8, 'Bases de données', 3, 1);
+
+INSERT INTO etudiants (id, nom, prenom, formation_id, promo)
+SELECT g, 'Nom ' || g, 'Prénom ' || g, CASE WHEN g BETWEEN 21 AND 65 THEN 2 ELSE 1 END, 'L3'
+FROM generate_series(1, 80) g;
+
+INSERT INTO inscriptions (etudiant_id, module_id)
+SELECT g, 1 FROM generate_series(1, 10) g
+UNION ALL
+SELECT g, 2 FROM generate_series(5, 12) g
+UNION ALL
+SELECT g, 3 FROM generate_series(21, 35) g
+UNION ALL
+SELECT g, 4 FROM generate_series(41, 65) g
+UNION ALL
+SELECT 71 + 2 * (m - 5) + k, m FROM generate_series(5, 8) m, generate_series(0, 1) k;
+
+INSERT INTO professeurs (id, nom, prenom, dept_id) VALUES
+    (1, 'Martin', 'Alice', 1),
+    (2, 'Bernard', 'Paul', 2),
+    (3, 'Petit', 'Claire', 1);
+
+INSERT INTO lieu_examen (id, nom, capacite, type) VALUES
+    (1, 'Amphi A', 100, 'AMPHI'),
+    (2, 'Salle 20', 20, 'SALLE'),
+    (3, 'Salle 10', 10, 'SALLE'),
+    (4, 'Labo 20', 20, 'LABO');
+
+INSERT INTO creneaux_horaires (id, date_creneau, heure_debut, heure_fin, periode) VALUES
+    (1, '2030-01-10', '08:30', '10:30', 'MATIN');
+
+-- 9001: module 1 à l'amphi le lundi 7 de 9h à 11h
+-- 9002 à 9004: trois examens du professeur 3 en salle 2 le mercredi 9 (maximum atteint)
+INSERT INTO examens_planifies (id, module_id, prof_id, salle_id, date_heure, duree_minutes, mode_generation) VALUES
+    (9001, 1, 1, 1, '2030-01-07 09:00', 120, 'MANUEL'),
+    (9002, 5, 3, 2, '2030-01-09 08:30', 90, 'MANUEL'),
+    (9003, 6, 3, 2, '2030-01-09 11:00', 90, 'MANUEL'),
+    (9004, 7, 3, 2, '2030-01-09 14:00', 90, 'MANUEL');
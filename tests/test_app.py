@@ -0,0 +1,164 @@
+import time
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip('streamlit')
+pytest.importorskip('plotly')
+pytest.importorskip('psycopg2')
+import app
+
+
+def plateforme():
+    """ExamPlatform sans connexion: les méthodes testées passent par des doublures"""
+    platform = object.__new__(app.ExamPlatform)
+    platform.conn = platform.cursor = None
+    platform.version, platform.memo, platform.relations_absentes = 42, {'instantane': None}, None
+    return platform
+
+
+class FauxCurseur:
+    """Curseur enregistrant les requêtes et renvoyant les lignes prévues, dans l'ordre"""
+
+    def __init__(self, *lignes):
+        self.lignes = list(lignes)
+        self.requetes = []
+
+    def execute(self, requete, params=None):
+        self.requetes.append((' '.join(requete.split()), params))
+
+    def fetchone(self):
+        return self.lignes.pop(0)
+
+
+# ==================== ÉCRITURE DES MODIFICATIONS ====================
+
+def test_write_schedule_diff_repasse_les_rejets():
+    platform = plateforme()
+    en_base = []
+
+    def update_exam(examen_id, prof_id, salle_id, date_heure, salles):
+        # L'examen 2 prend la place libérée par l'examen 1; l'examen 3 est toujours rejeté
+        if examen_id == 3 or (examen_id == 2 and 1 not in en_base):
+            return False, f"Conflit examen {examen_id}"
+        en_base.append(examen_id)
+        return True, None
+
+    platform.update_exam = update_exam
+    date_heure = datetime(2030, 1, 7, 9, 0)
+    diff = [(examen_id, 300, 200, date_heure, []) for examen_id in (2, 1, 3)]
+
+    ecrits, erreurs = platform.write_schedule_diff(diff)
+    assert ecrits == 2
+    assert en_base == [1, 2]
+    assert erreurs == {3: "Conflit examen 3"}
+    assert platform.version is None and not platform.memo
+
+
+# ==================== VERSION DE L'EMPLOI DU TEMPS ====================
+
+def test_version_lue_une_fois_par_execution():
+    platform = plateforme()
+    platform.version = None
+    platform.cursor = FauxCurseur((10, 42, datetime(2030, 1, 7), 2, 5), (11, 43, datetime(2030, 1, 7), 2, 5))
+
+    assert platform.get_schedule_version() == platform.get_schedule_version() == (10, 42, datetime(2030, 1, 7), 2, 5)
+    assert len(platform.cursor.requetes) == 1
+    assert 'inscriptions' not in platform.cursor.requetes[0][0]
+
+    platform.invalidate_snapshot()
+    assert platform.get_schedule_version() == (11, 43, datetime(2030, 1, 7), 2, 5)
+
+
+# ==================== INSERTION EN BLOC ====================
+
+@pytest.mark.parametrize('installe', [True, False])
+def test_insert_schedule_bulk_selon_chargement_en_bloc(monkeypatch, installe):
+    platform = plateforme()
+    platform.cursor = FauxCurseur()
+    monkeypatch.setattr(app, 'load_bulk_load_available', lambda cursor: installe)
+    monkeypatch.setattr(app.psycopg2.extras, 'execute_values',
+                        lambda cursor, requete, valeurs, **options: [(v[0], 1000 + i) for i, v in enumerate(valeurs)])
+    date_heure = datetime(2030, 1, 7, 9, 0)
+    lignes = [(100, 300, 200, date_heure, 120, []), (101, 301, 201, date_heure, 120, [])]
+
+    assert platform.insert_schedule_bulk(lignes) == (True, None)
+    requetes = [requete for requete, _ in platform.cursor.requetes]
+    assert requetes[0] == "BEGIN" and requetes[-1] == "COMMIT"
+    assert ("SELECT debut_chargement_en_bloc()" in requetes) == installe
+
+
+# ==================== POOL DE CONNEXIONS ====================
+
+class FauxPool:
+    """Pool dont getconn échoue (pool plein) tant qu'il reste des refus"""
+
+    def __init__(self, connexion, refus=0):
+        self.connexion, self.refus = connexion, refus
+        self.closed, self.maxconn = False, 2
+        self.rendues = []
+
+    def getconn(self):
+        if self.refus:
+            self.refus -= 1
+            raise app.psycopg2.pool.PoolError("connection pool exhausted")
+        return self.connexion
+
+    def putconn(self, conn, close=False):
+        self.rendues.append((conn, close))
+
+
+class FausseConnexion:
+    def __init__(self, statut=app.psycopg2.extensions.TRANSACTION_STATUS_IDLE, vivante=True, rendue_le=None):
+        self.closed, self.vivante, self.rendue_le = False, vivante, rendue_le
+        self.info = type('Info', (), {'transaction_status': statut})()
+        self.annulations = 0
+
+    def rollback(self):
+        self.annulations += 1
+
+    def cursor(self):
+        connexion = self
+
+        class Curseur:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, requete):
+                if not connexion.vivante:
+                    raise app.psycopg2.OperationalError("server closed the connection unexpectedly")
+
+        return Curseur()
+
+
+def test_attente_d_une_connexion_rendue(monkeypatch):
+    monkeypatch.setattr(app, 'DB_POOL_INTERVALLE_SECONDES', 0)
+    connexion = FausseConnexion()
+    assert app._attendre_connexion(FauxPool(connexion, refus=3)) is connexion
+
+    monkeypatch.setattr(app, 'DB_POOL_ATTENTE_SECONDES', 0.05)
+    with pytest.raises(app.psycopg2.pool.PoolError, match="DB_POOL_MAX"):
+        app._attendre_connexion(FauxPool(connexion, refus=10 ** 9))
+
+
+def test_verification_des_connexions_endormies():
+    assert app._connection_ok(FausseConnexion())
+    assert app._connection_ok(FausseConnexion(vivante=False, rendue_le=time.time()))
+    assert not app._connection_ok(FausseConnexion(vivante=False, rendue_le=time.time() - 3600))
+    fermee = FausseConnexion()
+    fermee.closed = True
+    assert not app._connection_ok(fermee)
+
+
+def test_release_connection_annule_la_transaction_interrompue(monkeypatch):
+    connexion = FausseConnexion(statut=app.psycopg2.extensions.TRANSACTION_STATUS_INTRANS)
+    pool = FauxPool(connexion)
+    monkeypatch.setattr(app, 'get_connection_pool', lambda: pool)
+
+    app.release_connection(connexion)
+    assert connexion.annulations == 1
+    assert connexion.rendue_le is not None
+    assert pool.rendues == [(connexion, False)]
@@ -0,0 +1,41 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import bounds
+import scheduler
+from conftest import creer_instance
+
+
+def clique_force_brute(voisins):
+    n = len(voisins)
+    for taille in range(n, 0, -1):
+        for sommets in itertools.combinations(range(n), taille):
+            if all(b in voisins[a] for a, b in itertools.combinations(sommets, 2)):
+                return taille
+    return 0
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_max_clique_egal_force_brute(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 11))
+    voisins = [set() for _ in range(n)]
+    for a, b in itertools.combinations(range(n), 2):
+        if rng.random() < 0.5:
+            voisins[a].add(b)
+            voisins[b].add(a)
+
+    clique = bounds.max_clique(voisins)
+    assert all(b in voisins[a] for a, b in itertools.combinations(clique, 2))
+    assert len(clique) == clique_force_brute(voisins)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_borne_jours_sous_les_jours_utilises(seed):
+    instance = creer_instance(seed=seed, nb_modules=15, nb_etudiants=30, nb_jours=14)
+    schedule = scheduler.build_schedule(instance, seed=seed)
+    assert not schedule.non_places
+    ecart = bounds.gap(instance, schedule, bounds.lower_bounds(instance))
+    assert ecart['ecart_jours'] == ecart['jours_utilises'] - ecart['jours_min'] >= 0
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import conflicts
+import scheduler
+from conftest import creer_instance, placer_au_hasard
+
+
+def paires_force_brute(intervalles):
+    """Paires qui se chevauchent, comparaison de tous les couples O(n²)"""
+    paires = {}
+    for i, (debut1, fin1, cle1) in enumerate(intervalles):
+        for debut2, fin2, cle2 in intervalles[i + 1:]:
+            if debut1 < fin2 and debut2 < fin1:
+                paires[frozenset((cle1, cle2))] = (max(debut1, debut2), min(fin1, fin2))
+    return paires
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_sweep_egal_force_brute(seed):
+    rng = np.random.default_rng(seed)
+    origine = datetime(2030, 1, 7, 8, 0)
+    intervalles = []
+    for cle in range(int(rng.integers(1, 25))):
+        debut = origine + timedelta(minutes=15 * int(rng.integers(0, 40)))
+        intervalles.append((debut, debut + timedelta(minutes=15 * int(rng.integers(1, 12))), cle))
+
+    paires = {frozenset((cle1, cle2)): (debut, fin)
+              for cle1, cle2, debut, fin in conflicts.sweep(intervalles)}
+    assert len(paires) == len(list(conflicts.sweep(intervalles)))
+    assert paires == paires_force_brute(intervalles)
+
+
+def test_intervalles_adjacents_sans_conflit():
+    debut = datetime(2030, 1, 7, 8, 30)
+    milieu = debut + timedelta(minutes=120)
+    assert list(conflicts.sweep([(debut, milieu, 'a'), (milieu, milieu + timedelta(hours=2), 'b')])) == []
+
+
+def conflits_force_brute(instance, schedule):
+    """(type, ressource, m1, m2) de tous les couples d'examens placés"""
+    intervalles = conflicts.exam_intervals(instance, schedule)
+
+    attendus = set()
+    modules = sorted(intervalles)
+    for i, a in enumerate(modules):
+        for b in modules[i + 1:]:
+            (debut_a, fin_a), (debut_b, fin_b) = intervalles[a], intervalles[b]
+            chevauche = debut_a < fin_b and debut_b < fin_a
+            for r in set(schedule.rooms(a)) & set(schedule.rooms(b)):
+                if chevauche:
+                    attendus.add(('salle', instance.salle_ids[r], a, b))
+            if chevauche and schedule.prof[a] == schedule.prof[b]:
+                attendus.add(('professeur', instance.prof_ids[schedule.prof[a]], a, b))
+            if schedule.jour[a] == schedule.jour[b] and b in instance.voisins[a]:
+                attendus.add(('etudiant', debut_a.date(), a, b))
+
+    return attendus
+
+
+def conflits_detectes(instance, schedule):
+    return {(c.type, c.ressource, instance.module_index[c.module1], instance.module_index[c.module2])
+            for c in conflicts.detect_conflicts(instance, schedule)}
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_detect_conflicts_egal_force_brute(seed):
+    instance = creer_instance(seed=seed, nb_existants=4)
+    schedule = scheduler.Schedule(instance)
+    schedule.load_existing()
+    placer_au_hasard(instance, schedule, np.random.default_rng(seed))
+    assert conflits_detectes(instance, schedule) == conflits_force_brute(instance, schedule)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_detect_conflicts_solution_partielle(seed):
+    # Jours colorés mais une partie des examens sans heure ni salle (avant assign_rooms)
+    rng = np.random.default_rng(seed)
+    instance = creer_instance(seed=seed, nb_existants=4)
+    schedule = scheduler.Schedule(instance)
+    schedule.load_existing()
+    placer_au_hasard(instance, schedule, rng)
+    sans_heure = np.flatnonzero(~schedule.fixe & (rng.random(instance.nb_modules) < 0.4))
+    schedule.heure[sans_heure] = schedule.salle[sans_heure] = schedule.prof[sans_heure] = -1
+    assert len(sans_heure)
+    assert conflits_detectes(instance, schedule) == conflits_force_brute(instance, schedule)
+
+
+def test_conflicting_exams_examens_distincts_en_conflit_de_salle():
+    debut = datetime(2030, 1, 7, 8, 30)
+    fin = debut + timedelta(hours=2)
+    liste = [
+        conflicts.Conflit('salle', 200, 1, 2, 10, 20, debut, fin, 0),
+        conflicts.Conflit('salle', 201, 1, 3, 10, 30, debut, fin, 0),
+        conflicts.Conflit('professeur', 300, 4, 5, 40, 50, debut, fin, 0),
+    ]
+    assert conflicts.conflicting_exams(liste) == {1, 2, 3}
+    assert conflicts.conflicting_exams(liste, types=conflicts.TYPES_CONFLITS) == {1, 2, 3, 4, 5}
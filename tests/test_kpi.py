@@ -0,0 +1,61 @@
+import kpi
+
+
+class FauxCurseur:
+    """Curseur enregistrant les requêtes et renvoyant les lignes prévues"""
+
+    def __init__(self, ligne=None, lignes=()):
+        self.ligne, self.lignes = ligne, list(lignes)
+        self.requetes = []
+
+    def execute(self, requete, params=None):
+        self.requetes.append((requete, params))
+
+    def fetchone(self):
+        return self.ligne
+
+    def fetchall(self):
+        return self.lignes
+
+
+def test_missing_relations():
+    cursor = FauxCurseur(lignes=[('kpi_fraicheur',)])
+    assert kpi.missing_relations(cursor, ('conflits_actifs', 'kpi_fraicheur')) == {'kpi_fraicheur'}
+    assert cursor.requetes == [(kpi.SQL_RELATIONS_ABSENTES, (['conflits_actifs', 'kpi_fraicheur'],))]
+
+
+def test_view_source_vue_ou_requete():
+    assert kpi.view_source('mv_distribution_horaire') == 'mv_distribution_horaire'
+    source = kpi.view_source('mv_distribution_horaire', {'mv_distribution_horaire'})
+    assert source == f"({kpi.REQUETES_VUES_KPI['mv_distribution_horaire']}) AS mv_distribution_horaire"
+
+
+def test_kpi_academiques_lit_conflits_actifs_ou_le_nombre_donne():
+    ligne = (40, 300, 20, 10, 4, 80, 5, 16, 12, 28)
+    cursor = FauxCurseur(ligne)
+    kpis = kpi.kpi_academiques(cursor)
+    requete, params = cursor.requetes[0]
+    assert 'conflits_actifs' in requete and params is None
+    assert kpis.taux_conflits == 10
+    assert kpis.taux_salles_utilisees == 50
+    assert kpis.charge_moyenne_par_prof == 5
+    assert isinstance(kpis.total_heures_surveillance, float)
+
+    cursor = FauxCurseur(ligne)
+    kpi.kpi_academiques(cursor, conflits=4)
+    requete, params = cursor.requetes[0]
+    assert 'conflits_actifs' not in requete and params == (4,)
+
+
+def test_kpi_academiques_sans_examen():
+    kpis = kpi.kpi_academiques(FauxCurseur((0, 0, 0, 0, 0, 0, 0, 0, 0, 0)), conflits=0)
+    assert kpis.taux_conflits == kpis.taux_salles_utilisees == kpis.charge_moyenne_par_prof == 0
+
+
+def test_occupation_strategique_listes_vides():
+    cursor = FauxCurseur(([['AMPHI', 3, '6.0', 2]], None, None))
+    occupation = kpi.occupation_strategique(cursor, {'mv_distribution_horaire'})
+    assert 'FROM mv_distribution_horaire' not in cursor.requetes[0][0]
+    assert occupation.occupation_par_type['Heures'].tolist() == [6.0]
+    assert occupation.distribution_par_heure.empty
+    assert list(occupation.reussite_planification.columns) == ['Mode', 'Examens', 'Durée moyenne']
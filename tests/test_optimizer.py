@@ -0,0 +1,199 @@
+import time
+
+import numpy as np
+import pytest
+
+import optimizer
+import scheduler
+from conftest import creer_instance, placer_au_hasard
+
+
+def mouvement_au_hasard(instance, rng):
+    return (int(rng.integers(instance.nb_modules)), int(rng.integers(instance.nb_jours)),
+            int(rng.integers(instance.nb_heures)), int(rng.integers(len(instance.salle_ids))),
+            int(rng.integers(len(instance.prof_ids))))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_delta_egal_difference_evaluate(seed):
+    rng = np.random.default_rng(seed)
+    instance = creer_instance(seed=seed, nb_existants=3)
+    schedule = scheduler.Schedule(instance)
+    schedule.load_existing()
+    placer_au_hasard(instance, schedule, rng)
+    cout = optimizer.CostModel(instance, schedule)
+    assert cout.total == optimizer.evaluate(instance, schedule)['total']
+
+    for _ in range(300):
+        mouvement = mouvement_au_hasard(instance, rng)
+        avant = optimizer.evaluate(instance, schedule)['total']
+        delta = cout.delta(*mouvement)
+        cout.move(*mouvement)
+        apres = optimizer.evaluate(instance, schedule)['total']
+        assert delta == apres - avant
+        assert cout.total == apres
+
+
+def test_move_many_puis_inverse(instance):
+    rng = np.random.default_rng(3)
+    schedule = scheduler.Schedule(instance)
+    schedule.load_existing()
+    placer_au_hasard(instance, schedule, rng)
+    cout = optimizer.CostModel(instance, schedule)
+    initial = cout.total
+
+    mouvements = {}
+    for _ in range(4):
+        m, *position = mouvement_au_hasard(instance, rng)
+        mouvements[m] = (m, *position)
+    inverses = cout.move_many(list(mouvements.values()))
+    assert cout.total == optimizer.evaluate(instance, schedule)['total']
+
+    cout.move_many(inverses)
+    assert cout.total == initial == optimizer.evaluate(instance, schedule)['total']
+
+
+# ==================== DÉPARTS MULTIPLES ====================
+
+def test_multi_start_garde_le_meilleur_depart():
+    instance = creer_instance(seed=2, nb_modules=10, nb_etudiants=40, nb_jours=10)
+    schedule, info = optimizer.multi_start(instance, nb_departs=3, budget_secondes=0.2,
+                                           max_workers=2, seed=0)
+    assert schedule.instance is instance
+    assert len(info['scores']) == 3
+    assert optimizer.score(instance, schedule) == info['scores'][0]
+    assert (info['non_places'], info['violations'], info['ecart_type_charge']) == info['scores'][0]
+
+
+# ==================== DÉCOMPOSITION PAR DÉPARTEMENT ====================
+
+def test_solve_by_department_sans_conflit_etudiant():
+    instance = creer_instance(seed=4, nb_modules=15, nb_etudiants=60, nb_jours=10, nb_existants=2)
+    schedule, info = optimizer.solve_by_department(instance, max_workers=2)
+    assert info['departements'] == 3
+    for m, voisins in enumerate(instance.voisins):
+        if m in schedule.non_places:
+            continue
+        assert schedule.is_complete(m)
+        assert all(schedule.jour[v] != schedule.jour[m] for v in voisins)
+
+
+# ==================== RECUIT SIMULÉ ====================
+
+@pytest.mark.parametrize('seed', range(3))
+def test_anneal_n_empire_pas_et_respecte_les_examens_figes(seed):
+    rng = np.random.default_rng(seed)
+    instance = creer_instance(seed=seed, nb_existants=3)
+    schedule = scheduler.Schedule(instance)
+    schedule.load_existing()
+    placer_au_hasard(instance, schedule, rng)
+    initiale = schedule.copy()
+    avant = optimizer.evaluate(instance, schedule)['total']
+
+    meilleure, resultat = optimizer.anneal(instance, schedule, budget_secondes=0.3, seed=seed)
+    assert resultat['total'] == optimizer.evaluate(instance, meilleure)['total'] <= avant
+    assert resultat['iterations'] > 0
+    figes = initiale.fixe
+    for tableau in ('jour', 'heure', 'salle', 'prof'):
+        assert np.array_equal(getattr(meilleure, tableau)[figes], getattr(initiale, tableau)[figes])
+
+
+# ==================== MOUVEMENTS COMPOSÉS ====================
+
+@pytest.mark.parametrize('seed', range(5))
+def test_kempe_move_echange_les_jours_sans_conflit_etudiant(seed):
+    rng = np.random.default_rng(seed)
+    instance = creer_instance(seed=seed)
+    schedule = placer_au_hasard(instance, scheduler.Schedule(instance), rng)
+    cout = optimizer.CostModel(instance, schedule)
+    deplacable = np.ones(instance.nb_modules, dtype=bool)
+    possibles = optimizer.salles_possibles(instance)
+
+    for _ in range(30):
+        m, d2 = int(rng.integers(instance.nb_modules)), int(rng.integers(instance.nb_jours))
+        d1 = schedule.jour[m]
+        if d1 == d2:
+            continue
+        avant = optimizer.evaluate(instance, schedule)['etudiants']
+        chaine = optimizer.kempe_chain(instance, schedule, m, d2)
+        jours = {a: schedule.jour[a] for a in chaine}
+        cout.move_many(optimizer.kempe_move(instance, cout, m, d2, deplacable, possibles))
+        assert all(schedule.jour[a] == d1 + d2 - jours[a] for a in chaine)
+        assert optimizer.evaluate(instance, schedule)['etudiants'] == avant
+        assert cout.total == optimizer.evaluate(instance, schedule)['total']
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_slot_swap_move_garde_une_solution_sans_conflit_etudiant(seed):
+    rng = np.random.default_rng(seed)
+    instance = creer_instance(seed=seed, nb_jours=10)
+    schedule = scheduler.build_schedule(instance, seed=seed)
+    assert optimizer.evaluate(instance, schedule)['etudiants'] == 0
+    cout = optimizer.CostModel(instance, schedule)
+    deplacable = ~schedule.fixe & (schedule.salle >= 0)
+
+    echanges = 0
+    for _ in range(50):
+        d1, d2 = rng.integers(instance.nb_jours, size=2)
+        h1, h2 = rng.integers(instance.nb_heures, size=2)
+        mouvements = optimizer.slot_swap_move(cout, d1, h1, d2, h2, deplacable)
+        if mouvements is None:
+            continue
+        cout.move_many(mouvements)
+        echanges += 1
+        assert optimizer.evaluate(instance, schedule)['etudiants'] == 0
+        assert cout.total == optimizer.evaluate(instance, schedule)['total']
+    assert echanges
+
+
+# ==================== MODE ANYTIME ====================
+
+@pytest.mark.parametrize('seed', range(3))
+def test_anytime_meilleur_score_monotone_et_arret(seed):
+    instance = creer_instance(seed=seed, nb_modules=15, nb_jours=5)
+    budget = 0.5
+    debut = time.time()
+    precedent = None
+    for meilleure, progression in optimizer.anytime(instance, budget_secondes=budget, seed=seed,
+                                                     budget_recuit=0.1):
+        actuel = (progression['non_places'], progression['violations'], progression['ecart_type_charge'])
+        assert actuel == optimizer.score(instance, meilleure)
+        assert precedent is None or actuel <= precedent
+        assert progression['ameliore'] == (precedent is None or actuel < precedent)
+        precedent = actuel
+    assert progression['borne_atteinte'] or time.time() - debut >= budget
+    assert progression['borne_atteinte'] == (actuel <= progression['borne'])
+
+
+# ==================== RÉPARATION LOCALE ====================
+
+def positions(schedule):
+    return list(zip(schedule.jour.tolist(), schedule.heure.tolist(),
+                    schedule.salle.tolist(), schedule.prof.tolist()))
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_repair_ne_bouge_que_le_voisinage(seed):
+    instance = creer_instance(seed=seed, nb_existants=12, nb_jours=5)
+    schedule = scheduler.Schedule(instance)
+    schedule.load_existing()
+    initiale = positions(schedule)
+    m = max(range(instance.nb_modules), key=lambda a: len(instance.voisins[a]))
+    voisins = optimizer.neighbourhood(instance, schedule, [m])
+
+    reparee, resultat = optimizer.repair(instance, schedule, modules=[m], budget_secondes=0.2, seed=seed)
+    assert positions(schedule) == initiale
+    assert np.array_equal(reparee.fixe, schedule.fixe)
+    assert resultat['total'] == optimizer.evaluate(instance, reparee)['total'] \
+        <= optimizer.evaluate(instance, schedule)['total']
+    bouges = {a for a, (avant, apres) in enumerate(zip(initiale, positions(reparee))) if avant != apres}
+    assert bouges <= voisins - {m}
+
+    diff = optimizer.schedule_diff(schedule, reparee)
+    assert sorted(ligne[0] for ligne in diff) == sorted(reparee.examen_id[a] for a in bouges)
+    for examen_id, prof_id, salle_id, date_heure, salles in diff:
+        a = reparee.examen_id.index(examen_id)
+        assert prof_id == instance.prof_ids[reparee.prof[a]]
+        assert salle_id == instance.salle_ids[reparee.salle[a]]
+        assert date_heure == instance.date_heure(reparee.jour[a], reparee.heure[a])
+        assert salles == [(instance.salle_ids[r], n) for r, n in reparee.repartition.get(a, [])]
@@ -0,0 +1,65 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import conflicts
+import precheck
+import scheduler
+from conftest import creer_instance
+
+
+def avec_examen(instance, examen):
+    """Même instance, avec un examen existant de plus (l'insertion)"""
+    modules = list(zip(instance.module_ids, instance.module_noms, instance.module_dept))
+    inscriptions = [(int(instance.etudiant_ids[e]), instance.module_ids[m])
+                    for e, m in zip(instance.insc_etudiant, instance.insc_module)]
+    salles = list(zip(instance.salle_ids, instance.salle_noms, instance.salle_types,
+                      instance.salle_capacites.tolist()))
+    professeurs = list(zip(instance.prof_ids, instance.prof_dept))
+    return scheduler.ScheduleInstance(modules, inscriptions, salles, professeurs, instance.jours,
+                                      instance.heures, instance.duree_minutes,
+                                      instance.examens_existants + [examen])
+
+
+@pytest.mark.parametrize('seed', range(25))
+def test_check_egal_detect_conflicts_apres_insertion(seed):
+    rng = np.random.default_rng(seed)
+    instance = creer_instance(seed=seed, nb_existants=8, nb_salles=3, nb_profs=3, nb_jours=4)
+    checker = precheck.ConstraintChecker(instance)
+
+    libres = [module_id for module_id in instance.module_ids if module_id not in checker.modules_planifies]
+    module_id = libres[int(rng.integers(len(libres)))]
+    prof_id = instance.prof_ids[int(rng.integers(len(instance.prof_ids)))]
+    salle_id = instance.salle_ids[int(rng.integers(len(instance.salle_ids)))]
+    jour = instance.jours[int(rng.integers(instance.nb_jours))]
+    heure = instance.heures[int(rng.integers(instance.nb_heures))]
+    date_heure = datetime.combine(jour, datetime.strptime(heure, '%H:%M').time())
+    duree = int(rng.choice([90, 120, 180]))
+
+    violations = checker.check(module_id, prof_id, salle_id, date_heure, duree)
+    signales = {v['contrainte'] for v in violations if v['contrainte'] in ('salle', 'etudiants')}
+    if any(v['contrainte'] == 'professeur' and not v['bloquant'] for v in violations):
+        signales.add('professeur')
+
+    examen_id = 9999
+    apres = avec_examen(instance, (examen_id, module_id, prof_id, salle_id, date_heure, duree))
+    schedule = scheduler.Schedule(apres)
+    schedule.load_existing()
+    types = {'salle': 'salle', 'professeur': 'professeur', 'etudiant': 'etudiants'}
+    detectes = {types[c.type] for c in conflicts.detect_conflicts(apres, schedule)
+                if examen_id in (c.examen1, c.examen2)}
+
+    assert signales == detectes
+
+
+def test_add_remove_retrouve_l_index(instance):
+    checker = precheck.ConstraintChecker(instance)
+    module_id = next(iter(checker.modules_planifies))
+    avant = checker.occupation.matrice.copy()
+
+    prof_id, salles, date_heure, duree = checker.remove(module_id)
+    assert module_id not in checker.modules_planifies
+    checker.add(module_id, prof_id, salles, date_heure, duree)
+    assert np.array_equal(checker.occupation.matrice, avant)
+    assert checker.check(module_id, prof_id, min(salles), date_heure, duree)[0]['contrainte'] == 'module'
@@ -0,0 +1,175 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import scheduler
+from conftest import creer_instance
+from scheduler import COUT_IMPOSSIBLE
+
+
+# ==================== AFFECTATION (HONGROIS) ====================
+
+def affectation_force_brute(cout):
+    """Coût minimal et nombre de lignes affectées à un coût possible, sur toutes les permutations"""
+    nb_lignes, nb_colonnes = cout.shape
+    meilleur = None
+    for colonnes in itertools.permutations(range(max(nb_lignes, nb_colonnes)), nb_lignes):
+        valeurs = [cout[i, j] if j < nb_colonnes else COUT_IMPOSSIBLE for i, j in enumerate(colonnes)]
+        affectees = sum(v < COUT_IMPOSSIBLE for v in valeurs)
+        cle = (-affectees, sum(v for v in valeurs if v < COUT_IMPOSSIBLE))
+        if meilleur is None or cle < meilleur:
+            meilleur = cle
+    return -meilleur[0], meilleur[1]
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_affectation_egale_force_brute(seed):
+    rng = np.random.default_rng(seed)
+    nb_lignes, nb_colonnes = int(rng.integers(1, 6)), int(rng.integers(1, 6))
+    cout = rng.integers(0, 20, size=(nb_lignes, nb_colonnes)).astype(np.float64)
+    cout[rng.random(cout.shape) < 0.25] = COUT_IMPOSSIBLE
+
+    affectation = scheduler.min_cost_assignment(cout)
+    affectees = [(i, j) for i, j in enumerate(affectation.tolist()) if j >= 0]
+    colonnes = [j for _, j in affectees]
+    assert len(set(colonnes)) == len(colonnes)
+    assert all(cout[i, j] < COUT_IMPOSSIBLE for i, j in affectees)
+    assert (len(affectees), sum(cout[i, j] for i, j in affectees)) == affectation_force_brute(cout)
+
+
+def test_affectation_vide():
+    assert len(scheduler.min_cost_assignment(np.zeros((0, 3)))) == 0
+
+
+# ==================== FLOT DE COÛT MINIMAL ====================
+
+def flot_force_brute(nb_noeuds, arcs, source, puits):
+    """(flot maximal, coût minimal de ce flot) en énumérant le flot de chaque arc"""
+    meilleur = (0, 0)
+    for flots in itertools.product(*[range(capacite + 1) for _, _, capacite, _ in arcs]):
+        bilan = [0] * nb_noeuds
+        for (u, v, _, _), f in zip(arcs, flots):
+            bilan[u] -= f
+            bilan[v] += f
+        if any(bilan[x] for x in range(nb_noeuds) if x not in (source, puits)):
+            continue
+        cle = (bilan[puits], -sum(f * cout for (_, _, _, cout), f in zip(arcs, flots)))
+        if cle > (meilleur[0], -meilleur[1]):
+            meilleur = (cle[0], -cle[1])
+    return meilleur
+
+
+@pytest.mark.parametrize('seed', range(25))
+def test_flot_egal_force_brute(seed):
+    rng = np.random.default_rng(seed)
+    nb_noeuds = 5
+    arcs = []
+    for _ in range(7):
+        u, v = sorted(rng.choice(nb_noeuds, 2, replace=False).tolist())
+        arcs.append((u, v, int(rng.integers(1, 3)), int(rng.integers(0, 6))))
+
+    reseau = scheduler.MinCostFlow(nb_noeuds)
+    indices = [reseau.add_edge(u, v, capacite, cout) for u, v, capacite, cout in arcs]
+    flot, cout = reseau.solve(0, nb_noeuds - 1)
+
+    assert (flot, cout) == flot_force_brute(nb_noeuds, arcs, 0, nb_noeuds - 1)
+    assert all(0 <= reseau.flow(e) <= capacite for e, (_, _, capacite, _) in zip(indices, arcs))
+    assert sum(reseau.flow(e) * c for e, (_, _, _, c) in zip(indices, arcs)) == cout
+
+
+# ==================== COLORATION DES JOURS (DSATUR) ====================
+
+@pytest.mark.parametrize('seed', range(5))
+def test_construction_sans_conflit_etudiant(seed):
+    instance = creer_instance(seed=seed, nb_modules=15, nb_jours=14)
+    schedule = scheduler.build_schedule(instance, seed=seed)
+    for m, voisins in enumerate(instance.voisins):
+        if schedule.jour[m] < 0:
+            continue
+        assert all(schedule.jour[v] != schedule.jour[m] for v in voisins)
+
+
+# ==================== OCCUPATION ÉTUDIANT x JOUR ====================
+
+@pytest.mark.parametrize('seed', range(5))
+def test_occupation_egale_comptage_des_inscriptions(seed):
+    rng = np.random.default_rng(seed)
+    instance = creer_instance(seed=seed)
+    schedule = scheduler.Schedule(instance)
+    places = rng.random(instance.nb_modules) < 0.6
+    schedule.jour[places] = rng.integers(instance.nb_jours, size=int(places.sum()))
+    occupation = scheduler.StudentDayOccupancy(instance, schedule)
+
+    for m in range(instance.nb_modules):
+        for d in range(instance.nb_jours):
+            occupes = {int(e) for e, a in zip(instance.insc_etudiant, instance.insc_module)
+                       if schedule.jour[a] == d}
+            pris = len(occupes & set(instance.etudiants_du_module[m].tolist()))
+            assert occupation.students_busy(m, d) == pris
+            assert occupation.can_place(m, d) == (pris == 0) == occupation.free_days(m)[d]
+
+    for m in np.flatnonzero(places):
+        occupation.remove(m, schedule.jour[m])
+    assert not occupation.matrice.any()
+
+
+# ==================== RÉPARTITION SUR PLUSIEURS SALLES ====================
+
+@pytest.mark.parametrize('seed', range(30))
+def test_split_rooms_couvre_l_effectif(seed):
+    rng = np.random.default_rng(seed)
+    nb_salles = int(rng.integers(1, 7))
+    salle_types = ['AMPHI' if rng.random() < 0.3 else 'SALLE' for _ in range(nb_salles)]
+    salle_capacites = rng.integers(10, 150, size=nb_salles)
+    libres = np.flatnonzero(rng.random(nb_salles) < 0.8)
+    effectif = int(rng.integers(1, 300))
+    places = scheduler.places_utiles(salle_types, salle_capacites)
+
+    salles = scheduler.split_rooms(effectif, salle_types, salle_capacites, libres)
+    if places[libres].sum() < effectif:
+        assert salles == []
+        return
+    assert sum(nb for _, nb in salles) == effectif
+    assert len({r for r, _ in salles}) == len(salles)
+    assert all(r in libres and 0 < nb <= places[r] for r, nb in salles)
+
+
+def test_gros_module_reparti_sans_conflit_de_salle():
+    # 4 modules de 150 étudiants environ: plus grands que le plus grand amphi (120 places)
+    instance = creer_instance(seed=0, nb_modules=4, nb_etudiants=200, nb_salles=8, nb_jours=4)
+    schedule = scheduler.build_schedule(instance, seed=0)
+    assert schedule.repartition
+    for m, salles in schedule.repartition.items():
+        assert sum(nb for _, nb in salles) == instance.effectifs[m]
+    occupees = [(schedule.jour[m], schedule.heure[m], r)
+                for m in np.flatnonzero(schedule.salle >= 0) for r in schedule.rooms(m)]
+    assert len(set(occupees)) == len(occupees)
+
+
+# ==================== SURVEILLANTS ====================
+
+@pytest.mark.parametrize('seed', range(10))
+def test_surveillants_limite_journaliere_et_departement(seed):
+    rng = np.random.default_rng(seed)
+    prof_dept = [1, 1, 1, 2, 2, 2]
+    examens = [(int(rng.integers(1, 3)), int(rng.integers(2)), int(rng.integers(4))) for _ in range(24)]
+
+    affectation = scheduler.invigilator_flow(examens, prof_dept, nb_jours=2)
+    par_jour, par_creneau = {}, set()
+    for (_, d, h), p in zip(examens, affectation):
+        if p >= 0:
+            assert (p, d, h) not in par_creneau
+            par_creneau.add((p, d, h))
+            par_jour[(p, d)] = par_jour.get((p, d), 0) + 1
+    assert max(par_jour.values()) <= scheduler.MAX_EXAMENS_PAR_JOUR_PROF
+
+    def pris(q, d, h):
+        return (q, d, h) in par_creneau or par_jour.get((q, d), 0) == scheduler.MAX_EXAMENS_PAR_JOUR_PROF
+
+    for (dept_id, d, h), p in zip(examens, affectation):
+        # Sans surveillant: tous les professeurs sont pris; d'un autre département: tous ceux du sien
+        if p < 0:
+            assert all(pris(q, d, h) for q in range(len(prof_dept)))
+        elif prof_dept[p] != dept_id:
+            assert all(pris(q, d, h) for q, dept_q in enumerate(prof_dept) if dept_q == dept_id)
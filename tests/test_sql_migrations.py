@@ -0,0 +1,68 @@
+"""
+Tests de fumée des scripts SQL (psql) sur une base jetable: EXAM_TEST_DATABASE
+(nom ou chaîne de connexion; hôte et utilisateur par les variables PG*) est vidée,
+reçoit le schéma 01 puis 02 et les migrations dans l'ordre de 05_deployment_setup.sh.
+Après chaque étape, tests/sql/cas_communs.sql (mêmes examens acceptés et rejetés
+qu'avec 02) et les scripts tests/sql/NN_*.sql des migrations déjà installées
+"""
+
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+RACINE = Path(__file__).resolve().parent.parent
+SCRIPTS = Path(__file__).resolve().parent / 'sql'
+BASE = os.environ.get('EXAM_TEST_DATABASE')
+
+pytestmark = pytest.mark.skipif(not BASE or shutil.which('psql') is None,
+                                reason="EXAM_TEST_DATABASE (base jetable) et psql requis")
+
+# (script, transaction unique), comme 05_deployment_setup.sh
+ETAPES = [
+    ('02_constraints_triggers_v2.sql', True),
+    ('06_examens_salles.sql', True),
+    ('07_chargement_en_bloc.sql', True),
+    ('08_triggers_instruction.sql', True),
+    ('09_module_conflicts.sql', True),
+    ('10_conflits_actifs.sql', True),
+    ('11_exclusion_salles.sql', True),
+    ('12_index_actifs.sql', False),
+    ('13_vues_kpi.sql', True),
+]
+
+
+def psql(*arguments):
+    resultat = subprocess.run(['psql', '-X', '-q', '-v', 'ON_ERROR_STOP=1', '-d', BASE, *arguments],
+                              cwd=RACINE, capture_output=True, text=True)
+    assert resultat.returncode == 0, resultat.stderr
+    return resultat
+
+
+def numero(script):
+    return int(Path(script).name[:2])
+
+
+def numero_etape(script):
+    return [nom for nom, _ in ETAPES].index(script)
+
+
+@pytest.fixture(scope='module')
+def installes():
+    """Base vide avec le schéma 01; étapes installées (un test installe aussi les précédentes)"""
+    psql('-c', 'DROP SCHEMA public CASCADE', '-c', 'CREATE SCHEMA public')
+    psql('--single-transaction', '-f', '01_schema_base_v2.sql')
+    return []
+
+
+@pytest.mark.parametrize('script', [script for script, _ in ETAPES])
+def test_etape(installes, script):
+    for precedent, transaction in ETAPES[:numero_etape(script) + 1]:
+        if precedent not in installes:
+            psql(*(['--single-transaction'] if transaction else []), '-f', precedent)
+            installes.append(precedent)
+    fumee = [chemin for chemin in sorted(SCRIPTS.glob('[0-9][0-9]_*.sql')) if numero(chemin) <= numero(script)]
+    for chemin in [SCRIPTS / 'cas_communs.sql'] + fumee:
+        psql('-f', str(chemin))